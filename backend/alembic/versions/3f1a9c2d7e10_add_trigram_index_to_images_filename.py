@@ -0,0 +1,45 @@
+"""Add trigram index to images.filename
+
+Revision ID: 3f1a9c2d7e10
+Revises: 0c9e5a7d2b18
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a9c2d7e10"
+down_revision: Union[str, Sequence[str], None] = "0c9e5a7d2b18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY keeps images writable while the index builds on large tables
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_images_filename_trgm",
+            "images",
+            ["filename"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_images_filename_trgm",
+            table_name="images",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
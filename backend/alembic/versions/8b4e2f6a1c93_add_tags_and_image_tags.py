@@ -0,0 +1,49 @@
+"""Add tags and image_tags
+
+Revision ID: 8b4e2f6a1c93
+Revises: 3f1a9c2d7e10
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b4e2f6a1c93"
+down_revision: Union[str, Sequence[str], None] = "3f1a9c2d7e10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("image_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_tags")),
+        sa.UniqueConstraint("name", name=op.f("uq_tags_name")),
+    )
+    op.create_table(
+        "image_tags",
+        sa.Column("image_id", sa.Uuid(), nullable=False),
+        sa.Column("tag_id", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["image_id"], ["images.id"], name=op.f("fk_image_tags_image_id_images"), ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["tag_id"], ["tags.id"], name=op.f("fk_image_tags_tag_id_tags"), ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("image_id", "tag_id", name=op.f("pk_image_tags")),
+    )
+    op.create_index("ix_image_tags_tag_id_image_id", "image_tags", ["tag_id", "image_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_image_tags_tag_id_image_id", table_name="image_tags")
+    op.drop_table("image_tags")
+    op.drop_table("tags")
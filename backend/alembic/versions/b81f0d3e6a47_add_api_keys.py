@@ -0,0 +1,63 @@
+"""Add api_keys for headless mode, notify key changes
+
+Revision ID: b81f0d3e6a47
+Revises: d4b19e7a3c60
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b81f0d3e6a47"
+down_revision: Union[str, Sequence[str], None] = "d4b19e7a3c60"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "api_keys",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("key_hash", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("scopes", postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+        sa.UniqueConstraint("key_hash"),
+    )
+
+    # Workers keep keys in memory and reload them on this notification (including manual SQL revocation)
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_api_key_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('api_key_changed', COALESCE(NEW.name, OLD.name));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER api_keys_notify_changed
+        AFTER INSERT OR UPDATE OR DELETE ON api_keys
+        FOR EACH ROW EXECUTE FUNCTION notify_api_key_changed()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS api_keys_notify_changed ON api_keys")
+    op.execute("DROP FUNCTION IF EXISTS notify_api_key_changed()")
+    op.drop_table("api_keys")
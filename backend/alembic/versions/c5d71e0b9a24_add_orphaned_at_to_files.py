@@ -0,0 +1,38 @@
+"""Add orphaned_at to files
+
+Revision ID: c5d71e0b9a24
+Revises: 8b4e2f6a1c93
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d71e0b9a24"
+down_revision: Union[str, Sequence[str], None] = "8b4e2f6a1c93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("files", sa.Column("orphaned_at", sa.DateTime(timezone=True), nullable=True))
+    # Files already unreferenced become GC candidates right away
+    op.execute("UPDATE files SET orphaned_at = now() WHERE ref_count <= 0")
+    op.create_index(
+        "ix_files_orphaned_at",
+        "files",
+        ["orphaned_at"],
+        unique=False,
+        postgresql_where=sa.text("orphaned_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_files_orphaned_at", table_name="files", postgresql_where=sa.text("orphaned_at IS NOT NULL"))
+    op.drop_column("files", "orphaned_at")
@@ -0,0 +1,45 @@
+"""Store refresh tokens as SHA-256 digests, index expires_at
+
+Revision ID: d4b19e7a3c60
+Revises: a7c3e91f0b52
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b19e7a3c60"
+down_revision: Union[str, Sequence[str], None] = "a7c3e91f0b52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Expired rows are garbage anyway; the rest are hashed in place, so live sessions survive
+    op.execute("DELETE FROM refresh_tokens WHERE expires_at < now()")
+    op.execute("UPDATE refresh_tokens SET token = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+
+    op.drop_index("ix_refresh_tokens_token", table_name="refresh_tokens")
+    op.alter_column(
+        "refresh_tokens", "token", new_column_name="token_hash", type_=sa.String(64), existing_nullable=False
+    )
+    op.create_index("ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], unique=True)
+    op.create_index("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Digests can't be turned back into tokens: all sessions have to log in again
+    op.execute("DELETE FROM refresh_tokens")
+
+    op.drop_index("ix_refresh_tokens_expires_at", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    op.alter_column(
+        "refresh_tokens", "token_hash", new_column_name="token", type_=sa.String(), existing_nullable=False
+    )
+    op.create_index("ix_refresh_tokens_token", "refresh_tokens", ["token"], unique=True)
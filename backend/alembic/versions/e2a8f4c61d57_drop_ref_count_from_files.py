@@ -0,0 +1,32 @@
+"""Drop ref_count from files
+
+Revision ID: e2a8f4c61d57
+Revises: c5d71e0b9a24
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a8f4c61d57"
+down_revision: Union[str, Sequence[str], None] = "c5d71e0b9a24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_column("files", "ref_count")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column("files", sa.Column("ref_count", sa.Integer(), server_default="0", nullable=False))
+    op.execute(
+        "UPDATE files SET ref_count = (SELECT count(*) FROM images WHERE images.file_hash = files.hash)"
+    )
+    op.alter_column("files", "ref_count", server_default=None)
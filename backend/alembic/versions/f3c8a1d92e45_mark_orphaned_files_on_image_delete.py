@@ -0,0 +1,55 @@
+"""Mark orphaned files on image delete
+
+Revision ID: f3c8a1d92e45
+Revises: b81f0d3e6a47
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c8a1d92e45"
+down_revision: Union[str, Sequence[str], None] = "b81f0d3e6a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Files are flagged as they lose their last image, instead of by a periodic anti-join over all files.
+    # Locking the files in hash order serializes concurrent deletes of one file's last images.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION mark_orphaned_files() RETURNS trigger AS $$
+        BEGIN
+            PERFORM 1 FROM files WHERE hash IN (SELECT file_hash FROM deleted_images) ORDER BY hash FOR NO KEY UPDATE;
+            UPDATE files SET orphaned_at = now()
+            WHERE hash IN (SELECT file_hash FROM deleted_images)
+              AND orphaned_at IS NULL
+              AND NOT EXISTS (SELECT 1 FROM images WHERE images.file_hash = files.hash);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER images_mark_orphaned_files
+        AFTER DELETE ON images
+        REFERENCING OLD TABLE AS deleted_images
+        FOR EACH STATEMENT EXECUTE FUNCTION mark_orphaned_files()
+        """
+    )
+    # Last full pass: files already unreferenced become GC candidates
+    op.execute(
+        "UPDATE files SET orphaned_at = now() WHERE orphaned_at IS NULL "
+        "AND NOT EXISTS (SELECT 1 FROM images WHERE images.file_hash = files.hash)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS images_mark_orphaned_files ON images")
+    op.execute("DROP FUNCTION IF EXISTS mark_orphaned_files()")
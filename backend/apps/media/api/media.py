@@ -1,3 +1,4 @@
+from typing import Literal
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, Query, UploadFile, status
@@ -5,11 +6,19 @@ from fastapi import Path as PathParam
 from fastapi.responses import FileResponse
 from loguru import logger
 
-from backend.apps.media.schemas.media import ImageRead
+from backend.apps.media.schemas.media import (
+    BatchDeleteResult,
+    ImageBatchDelete,
+    ImagePage,
+    ImageRead,
+    TagRead,
+    TagsUpdate,
+)
 from backend.apps.media.services.media_service import MediaService
-from backend.database.models import User
-from backend.dependencies.auth import get_current_user
-from backend.dependencies.media import get_media_service
+from backend.apps.media.storage import MediaStorage
+from backend.core.exceptions import AuthException
+from backend.dependencies.auth import Principal, get_current_principal, get_current_principal_optional
+from backend.dependencies.media import get_media_service, get_media_storage
 
 router = APIRouter()
 
@@ -17,7 +26,7 @@ router = APIRouter()
 @router.post("/upload", response_model=ImageRead, status_code=status.HTTP_201_CREATED)
 async def upload_file(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal("media:write")),
     service: MediaService = Depends(get_media_service),
 ) -> ImageRead:
     """
@@ -30,13 +39,16 @@ async def upload_file(
         f"MediaRouter | action=upload_request "
         f"user_id={current_user.id} filename={file.filename}"
     )
-    return await service.upload_image(user_id=current_user.id, file=file)
+    image = await service.upload_image(user_id=current_user.id, file=file)
+    return image
 
 
 @router.get("/feed", response_model=list[ImageRead])
 async def get_feed(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    tags: list[str] | None = Query(None, max_length=20, description="Filter by tag names"),
+    tag_mode: Literal["any", "all"] = Query("any", description="any = OR, all = AND"),
     service: MediaService = Depends(get_media_service),
 ) -> list[ImageRead]:
     """
@@ -45,15 +57,18 @@ async def get_feed(
     Returns:
         list[ImageRead]: List of public images.
     """
-    logger.info(f"MediaRouter | action=feed_request limit={limit} offset={offset}")
-    return await service.get_feed(limit=limit, offset=offset)
+    logger.info(f"MediaRouter | action=feed_request limit={limit} offset={offset} tags={tags} mode={tag_mode}")
+    images = await service.get_feed(limit=limit, offset=offset, tags=tags, match_all=tag_mode == "all")
+    return images
 
 
 @router.get("/my", response_model=list[ImageRead])
 async def get_my_gallery(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal("media:read")),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    tags: list[str] | None = Query(None, max_length=20, description="Filter by tag names"),
+    tag_mode: Literal["any", "all"] = Query("any", description="any = OR, all = AND"),
     service: MediaService = Depends(get_media_service),
 ) -> list[ImageRead]:
     """
@@ -64,15 +79,118 @@ async def get_my_gallery(
     """
     logger.info(
         f"MediaRouter | action=my_gallery_request "
-        f"user_id={current_user.id} limit={limit} offset={offset}"
+        f"user_id={current_user.id} limit={limit} offset={offset} tags={tags} mode={tag_mode}"
     )
-    return await service.get_user_gallery(user_id=current_user.id, limit=limit, offset=offset)
+    images = await service.get_user_gallery(
+        user_id=current_user.id,
+        limit=limit,
+        offset=offset,
+        tags=tags,
+        match_all=tag_mode == "all",
+    )
+    return images
+
+
+@router.get("/tags", response_model=list[TagRead])
+async def get_tags(
+    limit: int = Query(50, ge=1, le=200),
+    service: MediaService = Depends(get_media_service),
+) -> list[TagRead]:
+    """
+    Get most used tags with image counts (facets for feed filtering).
+
+    Returns:
+        list[TagRead]: Tags ordered by popularity.
+    """
+    logger.info(f"MediaRouter | action=tags_request limit={limit}")
+    return await service.get_tag_facets(limit=limit)
+
+
+@router.post("/tags/attach", response_model=list[TagRead])
+async def attach_tags(
+    data: TagsUpdate,
+    current_user: Principal = Depends(get_current_principal("media:write")),
+    service: MediaService = Depends(get_media_service),
+) -> list[TagRead]:
+    """
+    Attach tags to a batch of own images.
+
+    Returns:
+        list[TagRead]: Requested tags with updated counts.
+    """
+    logger.info(
+        f"MediaRouter | action=tags_attach_request "
+        f"user_id={current_user.id} images={len(data.image_ids)} tags={data.tags}"
+    )
+    return await service.attach_tags(user_id=current_user.id, data=data)
+
+
+@router.post("/tags/detach", response_model=list[TagRead])
+async def detach_tags(
+    data: TagsUpdate,
+    current_user: Principal = Depends(get_current_principal("media:write")),
+    service: MediaService = Depends(get_media_service),
+) -> list[TagRead]:
+    """
+    Detach tags from a batch of own images.
+
+    Returns:
+        list[TagRead]: Requested tags with updated counts.
+    """
+    logger.info(
+        f"MediaRouter | action=tags_detach_request "
+        f"user_id={current_user.id} images={len(data.image_ids)} tags={data.tags}"
+    )
+    return await service.detach_tags(user_id=current_user.id, data=data)
+
+
+@router.get("/search", response_model=ImagePage)
+async def search_images(
+    q: str = Query(..., min_length=3, max_length=100, description="Substring of the filename"),
+    scope: Literal["my", "public"] = Query("my"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
+    current_user: Principal | None = Depends(get_current_principal_optional("media:read")),
+    service: MediaService = Depends(get_media_service),
+) -> ImagePage:
+    """
+    Search images by filename (own gallery or public feed).
+
+    Returns:
+        ImagePage: Matching images, newest first, with a cursor for the next page.
+    """
+    if scope == "my" and current_user is None:
+        raise AuthException(detail="Not authenticated")
+
+    user_id = current_user.id if scope == "my" and current_user else None
+    logger.info(f"MediaRouter | action=search_request scope={scope} user_id={user_id} limit={limit}")
+    page = await service.search_images(query=q, user_id=user_id, limit=limit, cursor=cursor)
+    return page
+
+
+@router.post("/delete/batch", response_model=BatchDeleteResult)
+async def delete_images(
+    data: ImageBatchDelete,
+    current_user: Principal = Depends(get_current_principal("media:write")),
+    service: MediaService = Depends(get_media_service),
+) -> BatchDeleteResult:
+    """
+    Delete many of your images at once.
+
+    Returns:
+        BatchDeleteResult: Number of deleted images.
+    """
+    logger.info(
+        f"MediaRouter | action=batch_delete_request user_id={current_user.id} images={len(data.image_ids)}"
+    )
+    result = await service.delete_images(user_id=current_user.id, data=data)
+    return result
 
 
 @router.delete("/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_image(
     image_id: UUID = PathParam(...),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal("media:write")),
     service: MediaService = Depends(get_media_service),
 ) -> None:
     """
@@ -83,31 +201,32 @@ async def delete_image(
 
 
 # --- Serving Files (Dev Mode / Fallback) ---
+# Paths are resolved from the hash alone: these routes never check out a DB connection.
+
+FILE_HASH_PATTERN = r"^[0-9a-f]{64}$"
 
 
 @router.get("/{file_hash}", response_class=FileResponse)
 async def get_file(
-    file_hash: str = PathParam(..., min_length=64, max_length=64),
-    service: MediaService = Depends(get_media_service),
+    file_hash: str = PathParam(..., pattern=FILE_HASH_PATTERN),
+    storage: MediaStorage = Depends(get_media_storage),
 ) -> FileResponse:
     """
     Serve original file by hash.
     """
-    # Use public service method to resolve path
-    path = service.get_original_file(file_hash)
+    path = await storage.find_original(file_hash)
     logger.debug(f"MediaRouter | action=serve_file hash={file_hash}")
     return FileResponse(path)
 
 
 @router.get("/{file_hash}/thumb", response_class=FileResponse)
 async def get_thumbnail(
-    file_hash: str = PathParam(..., min_length=64, max_length=64),
-    service: MediaService = Depends(get_media_service),
+    file_hash: str = PathParam(..., pattern=FILE_HASH_PATTERN),
+    storage: MediaStorage = Depends(get_media_storage),
 ) -> FileResponse:
     """
     Serve thumbnail by hash.
     """
-    # Use public service method to resolve path
-    path = service.get_thumbnail_file(file_hash)
+    path = await storage.find_thumbnail(file_hash)
     logger.debug(f"MediaRouter | action=serve_thumb hash={file_hash}")
     return FileResponse(path)
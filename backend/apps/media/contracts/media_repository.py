@@ -1,15 +1,28 @@
+from collections.abc import Sequence
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
 from typing import Protocol
 from uuid import UUID
 
 from backend.database.models import File, Image
+from backend.database.models.media import ImageRow, TagRow
 
 
 class IMediaRepository(Protocol):
     """
     Interface for Media Repository (Protocol).
     Handles operations for both physical Files (CAS) and user Images.
+
+    Image rows: id, filename, created_at, hash, size_bytes, mime_type, file_created_at.
+    Tag rows: name, image_count. The service maps them to response schemas.
     """
 
+    def detached(self) -> AbstractAsyncContextManager["IMediaRepository"]:
+        """
+        A repository on its own session and transaction, independent of the request's.
+        """
+        ...
+
     # --- File Operations (CAS) ---
     async def get_file_by_hash(self, file_hash: str) -> File | None:
         """
@@ -17,28 +30,63 @@ class IMediaRepository(Protocol):
         """
         ...
 
-    async def create_file(self, file_hash: str, size_bytes: int, mime_type: str, path: str) -> File:
+    async def lock_file_hash(self, file_hash: str) -> None:
+        """
+        Take a transaction-scoped advisory lock on the hash (cross-worker dedup).
+        """
+        ...
+
+    async def save_file(self, file_hash: str, size_bytes: int, mime_type: str, path: str) -> None:
+        """
+        Upsert the files record of a stored blob, flagged orphaned until the first image is registered.
+        """
+        ...
+
+    async def try_lock_gc(self) -> bool:
+        """
+        Try to take the GC lock for the current transaction (one sweeper across workers).
+        """
+        ...
+
+    async def unmark_referenced_files(self, limit: int) -> int:
         """
-        Register a new physical file in the database.
+        GC mark phase, one batch: unflag files that are referenced again.
+        Returns the number of unflagged files.
         """
         ...
 
-    async def delete_file(self, file_hash: str) -> None:
+    async def delete_orphaned_files(self, older_than: datetime, limit: int) -> list[tuple[str, str]]:
         """
-        Delete physical file record (used by GC).
+        Delete one batch of files orphaned before `older_than` (used by GC).
+        Returns (hash, mime_type) of the deleted records.
         """
         ...
 
-    async def get_usage_count(self, file_hash: str) -> int:
+    async def lock_absent_files(self, hashes: list[str]) -> set[str]:
         """
-        Count how many images reference this file hash.
+        Lock the hashes (until commit) and return those without a files record (used by GC).
         """
         ...
 
     # --- Image Operations (User Assets) ---
-    async def create_image(self, user_id: UUID, file_hash: str, filename: str) -> Image:
+    async def register_image(
+        self,
+        user_id: UUID,
+        file_hash: str,
+        filename: str,
+        size_bytes: int,
+        mime_type: str,
+        path: str,
+    ) -> ImageRow:
+        """
+        Upsert a new (or orphaned) File and link a new Image to it in one statement.
         """
-        Link a user to a file (create an asset).
+        ...
+
+    async def link_image(self, user_id: UUID, file_hash: str, filename: str) -> ImageRow | None:
+        """
+        Link a new Image to an already stored File without writing the files row.
+        Returns None if the file does not exist.
         """
         ...
 
@@ -48,15 +96,43 @@ class IMediaRepository(Protocol):
         """
         ...
 
-    async def get_public_images(self, limit: int, offset: int) -> list[Image]:
+    async def get_public_images(
+        self,
+        limit: int,
+        offset: int,
+        tags: list[str] | None = None,
+        match_all: bool = False,
+    ) -> Sequence[ImageRow]:
         """
-        Get gallery for public feed.
+        Get gallery for public feed (image rows, no ORM hydration).
+        Optionally filtered by tags (any of them, or all if match_all).
         """
         ...
 
-    async def get_images_by_user(self, user_id: UUID, limit: int, offset: int) -> list[Image]:
+    async def get_images_by_user(
+        self,
+        user_id: UUID,
+        limit: int,
+        offset: int,
+        tags: list[str] | None = None,
+        match_all: bool = False,
+    ) -> Sequence[ImageRow]:
+        """
+        Get gallery for a specific user (image rows, no ORM hydration).
+        Optionally filtered by tags (any of them, or all if match_all).
         """
-        Get gallery for a specific user.
+        ...
+
+    async def search_images(
+        self,
+        query: str,
+        user_id: UUID | None,
+        limit: int,
+        after: tuple[datetime, UUID] | None = None,
+    ) -> Sequence[ImageRow]:
+        """
+        Search images by filename substring, newest first.
+        Scoped to user_id if given, otherwise across the public feed.
         """
         ...
 
@@ -66,6 +142,37 @@ class IMediaRepository(Protocol):
         """
         ...
 
+    async def delete_images(self, user_id: UUID, image_ids: list[UUID]) -> None:
+        """
+        Delete many user images at once (set-based counter updates).
+        """
+        ...
+
+    async def count_owned_images(self, user_id: UUID, image_ids: list[UUID]) -> int:
+        """
+        Count how many of the given images belong to the user.
+        """
+        ...
+
+    # --- Tag Operations ---
+    async def attach_tags(self, image_ids: list[UUID], tags: list[str]) -> Sequence[TagRow]:
+        """
+        Attach tags to images, creating missing tags and updating facet counts.
+        """
+        ...
+
+    async def detach_tags(self, image_ids: list[UUID], tags: list[str]) -> Sequence[TagRow]:
+        """
+        Detach tags from images, updating facet counts.
+        """
+        ...
+
+    async def get_tag_facets(self, limit: int) -> Sequence[TagRow]:
+        """
+        Get most used tags with their image counts.
+        """
+        ...
+
     async def commit(self) -> None:
         """
         Commit the current transaction.
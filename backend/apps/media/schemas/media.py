@@ -1,10 +1,33 @@
 from datetime import datetime
+from typing import Any
 from uuid import UUID
 
-from pydantic import computed_field
+from pydantic import Field, computed_field, field_validator
 
 from backend.core.config import settings
-from backend.core.schemas.base import BaseResponse
+from backend.core.schemas.base import BaseRequest, BaseResponse
+
+# Map mime_type to extension for storage paths and URL generation
+MIME_EXTENSIONS: dict[str, str] = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+# Built once per process: SITE_URL does not change after startup
+STORAGE_URL_PREFIX = f"{settings.SITE_URL}/media/storage"
+
+TAG_MAX_LENGTH = 50
+
+
+def normalize_tags(names: list[str]) -> list[str]:
+    """
+    Normalize tag names (trim, lowercase, collapse spaces) and drop empties/duplicates.
+    Order is preserved.
+    """
+    normalized = (" ".join(name.split()).lower() for name in names)
+    return list(dict.fromkeys(name for name in normalized if name))
 
 
 class FileRead(BaseResponse):
@@ -28,6 +51,25 @@ class ImageRead(BaseResponse):
     created_at: datetime
     file: FileRead
 
+    @classmethod
+    def from_row(cls, row: Any) -> "ImageRead":
+        """
+        Build from a projection row (see MediaRepository) without ORM hydration.
+        Values come straight from the DB, so validation is skipped.
+        """
+        file = FileRead.model_construct(
+            hash=row.hash,
+            size_bytes=row.size_bytes,
+            mime_type=row.mime_type,
+            created_at=row.file_created_at,
+        )
+        return cls.model_construct(
+            id=row.id,
+            filename=row.filename,
+            created_at=row.created_at,
+            file=file,
+        )
+
     @computed_field
     def url(self) -> str:
         """
@@ -35,19 +77,10 @@ class ImageRead(BaseResponse):
         Format: {SITE_URL}/media/storage/ab/cd/hash.ext
         """
         h = self.file.hash
-        
-        # Map mime_type to extension for URL generation
-        # This must match ALLOWED_MIME_TYPES in MediaService
-        mime_map = {
-            "image/jpeg": ".jpg",
-            "image/png": ".png",
-            "image/gif": ".gif",
-            "image/webp": ".webp",
-        }
-        ext = mime_map.get(self.file.mime_type, "")
-        
+        ext = MIME_EXTENSIONS.get(self.file.mime_type, "")
+
         # Sharding logic: first 2 chars, next 2 chars
-        return f"{settings.SITE_URL}/media/storage/{h[:2]}/{h[2:4]}/{h}{ext}"
+        return f"{STORAGE_URL_PREFIX}/{h[:2]}/{h[2:4]}/{h}{ext}"
 
     @computed_field
     def src(self) -> str:
@@ -56,4 +89,60 @@ class ImageRead(BaseResponse):
         Format: {SITE_URL}/media/storage/ab/cd/hash_thumb.jpg
         """
         h = self.file.hash
-        return f"{settings.SITE_URL}/media/storage/{h[:2]}/{h[2:4]}/{h}_thumb.jpg"
+        return f"{STORAGE_URL_PREFIX}/{h[:2]}/{h[2:4]}/{h}_thumb.jpg"
+
+
+class ImagePage(BaseResponse):
+    """
+    Keyset-paginated list of images.
+    Pass next_cursor back as `cursor` to get the following page (None on the last page).
+    """
+
+    items: list[ImageRead]
+    next_cursor: str | None = None
+
+
+class ImageBatchDelete(BaseRequest):
+    """
+    Schema for deleting many of the user's images at once.
+    """
+
+    image_ids: list[UUID] = Field(..., min_length=1, max_length=500)
+
+
+class BatchDeleteResult(BaseResponse):
+    """
+    Result of a batch delete.
+    """
+
+    deleted: int
+
+
+class TagRead(BaseResponse):
+    """
+    Schema for reading a Tag with its facet count.
+    """
+
+    name: str
+    image_count: int
+
+
+class TagsUpdate(BaseRequest):
+    """
+    Schema for bulk attaching/detaching tags to the user's images.
+    """
+
+    image_ids: list[UUID] = Field(..., min_length=1, max_length=500)
+    tags: list[str] = Field(..., min_length=1, max_length=20)
+
+    @field_validator("tags")
+    def validate_tags(cls, v: list[str]) -> list[str]:
+        """
+        Normalize tag names and enforce length limits.
+        """
+        tags = normalize_tags(v)
+        if not tags:
+            raise ValueError("At least one non-empty tag is required")
+        if any(len(tag) > TAG_MAX_LENGTH for tag in tags):
+            raise ValueError(f"Tag names must be at most {TAG_MAX_LENGTH} characters")
+        return tags
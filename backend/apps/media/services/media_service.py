@@ -1,8 +1,12 @@
+import asyncio
 import hashlib
-import os
 import shutil
 import uuid
+from collections.abc import Callable
+from concurrent.futures import Executor
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import TypeVar
 from uuid import UUID
 
 import aiofiles
@@ -14,13 +18,32 @@ from PIL import Image as PILImage
 from starlette.concurrency import run_in_threadpool
 
 from backend.apps.media.contracts.media_repository import IMediaRepository
-from backend.apps.media.schemas.media import ImageRead
+from backend.apps.media.schemas.media import (
+    MIME_EXTENSIONS,
+    BatchDeleteResult,
+    ImageBatchDelete,
+    ImagePage,
+    ImageRead,
+    TagRead,
+    TagsUpdate,
+    normalize_tags,
+)
+from backend.apps.media.storage import MediaStorage, open_storage
 from backend.core.config import settings
 from backend.core.exceptions import (
     NotFoundException,
     PermissionDeniedException,
     ValidationException,
 )
+from backend.core.metrics import GC_FILES_TOTAL, UPLOAD_STAGE_SECONDS, UPLOADS_TOTAL
+from backend.core.pagination import decode_cursor, encode_cursor
+from backend.core.singleflight import SingleFlight
+from backend.core.timing import span
+
+# Process-wide: in-flight blob stores keyed by file hash
+_blob_flight: SingleFlight[str] = SingleFlight()
+
+T = TypeVar("T")
 
 
 class MediaService:
@@ -29,24 +52,20 @@ class MediaService:
     Handles file validation, CAS storage, deduplication, and image management.
     """
 
-    ALLOWED_MIME_TYPES = {
-        "image/jpeg": ".jpg",
-        "image/png": ".png",
-        "image/gif": ".gif",
-        "image/webp": ".webp",
-    }
+    ALLOWED_MIME_TYPES = MIME_EXTENSIONS
 
-    def __init__(self, repository: IMediaRepository):
+    def __init__(
+        self,
+        repository: IMediaRepository,
+        storage: MediaStorage | None = None,
+        imaging_pool: Executor | None = None,
+    ):
         self.repository = repository
+        self.storage = storage or open_storage(settings.UPLOAD_DIR)
+        self.imaging_pool = imaging_pool
         self.chunk_size = 64 * 1024  # 64KB
         self.max_upload_size = settings.MAX_UPLOAD_SIZE
 
-        self.temp_dir = settings.UPLOAD_DIR / "temp"
-        self.storage_dir = settings.UPLOAD_DIR / "storage"
-
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
-        self.storage_dir.mkdir(parents=True, exist_ok=True)
-
     async def upload_image(self, user_id: UUID, file: UploadFile) -> ImageRead:
         """
         Main entry point for image upload.
@@ -57,68 +76,64 @@ class MediaService:
         logger.info(f"MediaService | action=upload_start user_id={user_id} filename={file.filename}")
 
         temp_filename = f"upload_{uuid.uuid4()}.tmp"
-        temp_path = self.temp_dir / temp_filename
+        temp_path = self.storage.temp_dir / temp_filename
 
         try:
             # Stream to temp + Hash calculation
-            file_hash, size_bytes = await self._process_stream_to_temp(file, temp_path)
+            with UPLOAD_STAGE_SECONDS.labels("stream").time():
+                file_hash, size_bytes = await self._process_stream_to_temp(file, temp_path)
             logger.debug(
                 f"MediaService | action=file_processed "
                 f"hash={file_hash} size={size_bytes}"
             )
 
             # Magic Bytes validation
-            mime_type = await self._validate_file_type(temp_path)
+            with UPLOAD_STAGE_SECONDS.labels("validate").time():
+                mime_type = await self._validate_file_type(temp_path)
             logger.debug(f"MediaService | action=magic_bytes_ok mime={mime_type}")
 
-            # Deduplication check
-            existing_file = await self.repository.get_file_by_hash(file_hash)
+            # Deduplication check (fast path, no lock).
+            # Orphaned files may be mid-sweep, so they take the locked path.
+            with UPLOAD_STAGE_SECONDS.labels("db_lookup").time():
+                existing_file = await self.repository.get_file_by_hash(file_hash)
+            image = None
 
-            if existing_file:
+            if existing_file and existing_file.orphaned_at is None:
                 logger.info(f"MediaService | action=deduplication_hit hash={file_hash}")
-                await self._remove_file(temp_path)
+                UPLOADS_TOTAL.labels("hit").inc()
+                with UPLOAD_STAGE_SECONDS.labels("db_write").time():
+                    row = await self.repository.link_image(
+                        user_id=user_id, file_hash=file_hash, filename=file.filename or "unknown"
+                    )
+                image = ImageRead.from_row(row) if row else None
 
-                image = await self.repository.create_image(
-                    user_id=user_id,
-                    file_hash=file_hash,
-                    filename=file.filename or "unknown",
+            if image is None:
+                # Concurrent uploads of the same new file in this process share one store
+                path, shared = await _blob_flight.do(
+                    file_hash, lambda: self._store_blob(file_hash, temp_path, mime_type, size_bytes)
                 )
-                await self.repository.commit()
-                return ImageRead.model_validate(image)
-
-            else:
-                logger.info(f"MediaService | action=deduplication_miss hash={file_hash}")
-                
-                # Determine extension
-                ext = self.ALLOWED_MIME_TYPES.get(mime_type, "")
-                target_path = self._get_storage_path(file_hash, ext)
-
-                # Atomic Move: temp -> storage
-                await run_in_threadpool(shutil.move, str(temp_path), str(target_path))
-
-                try:
-                    await self._generate_thumbnail(target_path, file_hash)
-                except Exception as e:
-                    logger.error(
-                        f"MediaService | action=thumbnail_failed "
-                        f"hash={file_hash} error={e}", exc_info=True
+                if shared:
+                    logger.info(f"MediaService | action=deduplication_shared hash={file_hash}")
+                    UPLOADS_TOTAL.labels("hit").inc()
+
+                # DB Registration (File upsert + Image insert in one statement)
+                with UPLOAD_STAGE_SECONDS.labels("db_write").time():
+                    row = await self.repository.register_image(
+                        user_id=user_id,
+                        file_hash=file_hash,
+                        filename=file.filename or "unknown",
+                        size_bytes=size_bytes,
+                        mime_type=mime_type,
+                        path=path,
                     )
+                image = ImageRead.from_row(row)
 
-                # DB Registration
-                await self.repository.create_file(
-                    file_hash=file_hash,
-                    size_bytes=size_bytes,
-                    mime_type=mime_type,
-                    path=str(target_path),
-                )
+            # Leftover temp if the blob was already stored
+            await self._remove_file(temp_path)
 
-                image = await self.repository.create_image(
-                    user_id=user_id,
-                    file_hash=file_hash,
-                    filename=file.filename or "unknown",
-                )
+            with UPLOAD_STAGE_SECONDS.labels("commit").time():
                 await self.repository.commit()
-                return ImageRead.model_validate(image)
+            return image
 
         except Exception as e:
             logger.error(f"MediaService | action=upload_failed error={e}", exc_info=True)
@@ -126,31 +141,122 @@ class MediaService:
                 await self._remove_file(temp_path)
             raise e
 
-    async def get_feed(self, limit: int = 20, offset: int = 0) -> list[ImageRead]:
+    async def get_feed(
+        self,
+        limit: int = 20,
+        offset: int = 0,
+        tags: list[str] | None = None,
+        match_all: bool = False,
+    ) -> list[ImageRead]:
         """
         Get public feed of images.
+        Optionally filtered by tags (any of them, or all if match_all).
 
         Returns:
             list[ImageRead]: List of public images.
         """
-        images = await self.repository.get_public_images(limit=limit, offset=offset)
-        return [ImageRead.model_validate(img) for img in images]
-
-    async def get_user_gallery(self, user_id: UUID, limit: int = 20, offset: int = 0) -> list[ImageRead]:
+        rows = await self.repository.get_public_images(
+            limit=limit,
+            offset=offset,
+            tags=normalize_tags(tags) if tags else None,
+            match_all=match_all,
+        )
+        return [ImageRead.from_row(row) for row in rows]
+
+    async def get_user_gallery(
+        self,
+        user_id: UUID,
+        limit: int = 20,
+        offset: int = 0,
+        tags: list[str] | None = None,
+        match_all: bool = False,
+    ) -> list[ImageRead]:
         """
         Get images for a specific user.
+        Optionally filtered by tags (any of them, or all if match_all).
 
         Returns:
             list[ImageRead]: List of user's images.
         """
-        images = await self.repository.get_images_by_user(user_id=user_id, limit=limit, offset=offset)
-        return [ImageRead.model_validate(img) for img in images]
+        rows = await self.repository.get_images_by_user(
+            user_id=user_id,
+            limit=limit,
+            offset=offset,
+            tags=normalize_tags(tags) if tags else None,
+            match_all=match_all,
+        )
+        return [ImageRead.from_row(row) for row in rows]
+
+    async def search_images(
+        self,
+        query: str,
+        user_id: UUID | None = None,
+        limit: int = 20,
+        cursor: str | None = None,
+    ) -> ImagePage:
+        """
+        Search images by filename.
+        Scoped to user_id if given, otherwise searches the public feed.
+
+        Returns:
+            ImagePage: Matching images and the cursor for the next page.
+        """
+        after = decode_cursor(cursor) if cursor else None
+
+        # Fetch one extra row to know whether another page exists
+        rows = await self.repository.search_images(query=query, user_id=user_id, limit=limit + 1, after=after)
+        images = [ImageRead.from_row(row) for row in rows]
+
+        next_cursor = None
+        if len(images) > limit:
+            images = images[:limit]
+            next_cursor = encode_cursor(images[-1].created_at, images[-1].id)
+
+        return ImagePage(items=images, next_cursor=next_cursor)
+
+    async def attach_tags(self, user_id: UUID, data: TagsUpdate) -> list[TagRead]:
+        """
+        Attach tags to a batch of the user's images.
+
+        Returns:
+            list[TagRead]: Requested tags with updated facet counts.
+        """
+        image_ids = await self._get_owned_image_ids(user_id, data.image_ids)
+        rows = await self.repository.attach_tags(image_ids=image_ids, tags=data.tags)
+        await self.repository.commit()
+
+        logger.info(f"MediaService | action=tags_attached user_id={user_id} images={len(image_ids)} tags={data.tags}")
+        return [TagRead.model_validate(row) for row in rows]
+
+    async def detach_tags(self, user_id: UUID, data: TagsUpdate) -> list[TagRead]:
+        """
+        Detach tags from a batch of the user's images.
+
+        Returns:
+            list[TagRead]: Requested tags with updated facet counts.
+        """
+        image_ids = await self._get_owned_image_ids(user_id, data.image_ids)
+        rows = await self.repository.detach_tags(image_ids=image_ids, tags=data.tags)
+        await self.repository.commit()
+
+        logger.info(f"MediaService | action=tags_detached user_id={user_id} images={len(image_ids)} tags={data.tags}")
+        return [TagRead.model_validate(row) for row in rows]
+
+    async def get_tag_facets(self, limit: int = 50) -> list[TagRead]:
+        """
+        Get most used tags with image counts (for feed filters).
+
+        Returns:
+            list[TagRead]: Tags ordered by popularity.
+        """
+        rows = await self.repository.get_tag_facets(limit=limit)
+        return [TagRead.model_validate(row) for row in rows]
 
     async def delete_image(self, user_id: UUID, image_id: UUID) -> None:
         """
         Delete an image.
         Checks ownership before deletion.
-        Implements Garbage Collection (GC) for physical files.
+        Physical files are not touched here: they are collected by collect_garbage after a grace period.
         """
         image = await self.repository.get_image_by_id(image_id)
         if not image:
@@ -164,81 +270,130 @@ class MediaService:
             )
             raise PermissionDeniedException(detail="You do not own this image")
 
-        file_hash = image.file_hash
-        
-        # We need to know the path to delete the file. 
-        # Assuming we can get it from the file relation or reconstruct it.
-        # For now, let's try to find it with extension or without.
-        # Ideally, we should fetch 'file' relation with 'path'.
-        
-        # Since we don't have the file object here easily without extra query (unless image.file is loaded),
-        # we will try to resolve path.
-        # But wait, image.file should be loaded if we use joinedload in repo.
-        
-        # Let's assume image.file is available or we query it.
-        # For simplicity in this fix, I will try to find the file on disk.
-        
-        # Remove user link
+        # Only unlinks the asset; the blob is collected later by the sweeper
         await self.repository.delete_image(image_id)
+        await self.repository.commit()
+        logger.info(f"MediaService | action=delete_success image_id={image_id} user_id={user_id}")
+
+    async def delete_images(self, user_id: UUID, data: ImageBatchDelete) -> BatchDeleteResult:
+        """
+        Delete many images at once.
+        Files left without images are flagged orphaned in the same transaction (images trigger)
+        and collected by collect_garbage after the grace period.
+        """
+        image_ids = await self._get_owned_image_ids(user_id, data.image_ids)
+
+        await self.repository.delete_images(user_id=user_id, image_ids=image_ids)
+        await self.repository.commit()
 
-        # Garbage Collection Check
-        usage_count = await self.repository.get_usage_count(file_hash)
-
-        if usage_count == 0:
-            logger.info(f"MediaService | action=gc_start hash={file_hash}")
-
-            await self.repository.delete_file(file_hash)
-            
-            # Try to find file with extension
-            found = False
-            for ext in [""] + list(self.ALLOWED_MIME_TYPES.values()):
-                path = self._get_storage_path(file_hash, ext)
-                if path.exists():
-                    await self._remove_file(path)
-                    found = True
-            
-            thumb_path = self._get_thumbnail_path(file_hash)
-            await self._remove_file(thumb_path)
-            
-            if found:
-                logger.info(f"MediaService | action=gc_success hash={file_hash}")
-            else:
-                logger.warning(f"MediaService | action=gc_warn reason=file_not_found_on_disk hash={file_hash}")
+        logger.info(f"MediaService | action=batch_delete_success user_id={user_id} deleted={len(image_ids)}")
+        return BatchDeleteResult(deleted=len(image_ids))
 
+    async def mark_garbage(self, batch_size: int) -> int:
+        """
+        GC mark phase, one batch: unflag flagged files that got referenced again.
+        Files are flagged as they lose their last image (images trigger), so only flagged files are scanned.
+
+        Returns:
+            int: Number of unflagged files (0 once the flagged files are settled).
+        """
+        unmarked = await self.repository.unmark_referenced_files(limit=batch_size)
         await self.repository.commit()
-        logger.info(f"MediaService | action=delete_success image_id={image_id} user_id={user_id}")
+        if unmarked:
+            logger.info(f"MediaService | action=gc_mark revived={unmarked}")
+            GC_FILES_TOTAL.labels("revived").inc(unmarked)
+        return unmarked
 
-    def get_original_file(self, file_hash: str) -> Path:
+    async def collect_garbage(self, grace_period: timedelta, batch_size: int) -> int:
         """
-        Get path to original file.
-        Used for fallback serving via Python.
+        GC sweep phase: collect one batch of files flagged by mark_garbage more than grace_period ago.
+        Until then a re-upload of the same file revives it (undo window).
+
+        Returns:
+            int: Number of collected files.
         """
-        # Try without extension first (legacy)
-        path = self._get_storage_path(file_hash)
-        if path.exists():
-            return path
-            
-        # Try with extensions
-        for ext in self.ALLOWED_MIME_TYPES.values():
-            path = self._get_storage_path(file_hash, ext)
-            if path.exists():
-                return path
-                
-        logger.warning(f"MediaService | action=get_file_failed reason=not_found hash={file_hash}")
-        raise NotFoundException(detail="File not found")
-
-    def get_thumbnail_file(self, file_hash: str) -> Path:
-        """
-        Get path to thumbnail file.
-        """
-        path = self._get_thumbnail_path(file_hash)
-        if not path.exists():
-            logger.warning(f"MediaService | action=get_thumb_failed reason=not_found hash={file_hash}")
-            raise NotFoundException(detail="Thumbnail not found")
-        return path
+        orphans = await self.repository.delete_orphaned_files(
+            older_than=datetime.now(UTC) - grace_period, limit=batch_size
+        )
+
+        # Records go first: a crash before the unlink leaves stray blobs, never records without blobs
+        await self.repository.commit()
+
+        if orphans:
+            # An upload may have stored the same file again since the commit: its blob stays
+            absent = await self.repository.lock_absent_files([file_hash for file_hash, _ in orphans])
+            await self._remove_blobs([orphan for orphan in orphans if orphan[0] in absent])
+            await self.repository.commit()
+
+            logger.info(f"MediaService | action=gc_success files={len(orphans)}")
+            GC_FILES_TOTAL.labels("collected").inc(len(orphans))
+        return len(orphans)
 
     # --- Private Helpers ---
 
+    async def _store_blob(self, file_hash: str, temp_path: Path, mime_type: str, size_bytes: int) -> str:
+        """
+        Move a new file into CAS storage, generate its thumbnail and save its files record.
+        Runs once per hash in this process (single-flight), on a session of its own: the requests that share it
+        only wait for the result, and it finishes even if the request that started it is cancelled.
+        The advisory lock on the hash serializes the store across workers and against the GC sweeper;
+        it is held until the files record is committed, so the sweeper never removes a blob that has a live record.
+        An orphaned file is stored again: its blob may already be swept, and the bytes are identical.
+        Returns: storage path of the blob.
+        """
+        async with self.repository.detached() as repository:
+            with UPLOAD_STAGE_SECONDS.labels("blob_lock").time():
+                await repository.lock_file_hash(file_hash)
+                existing_file = await repository.get_file_by_hash(file_hash)
+
+            if existing_file and existing_file.orphaned_at is None:
+                logger.info(f"MediaService | action=deduplication_hit hash={file_hash} after=lock")
+                UPLOADS_TOTAL.labels("hit").inc()
+                return existing_file.path
+
+            logger.info(f"MediaService | action=deduplication_miss hash={file_hash}")
+            UPLOADS_TOTAL.labels("miss").inc()
+
+            # Determine extension
+            ext = self.ALLOWED_MIME_TYPES.get(mime_type, "")
+            target_path = self._get_storage_path(file_hash, ext)
+
+            # Atomic Move: temp -> storage
+            with UPLOAD_STAGE_SECONDS.labels("store").time():
+                await run_in_threadpool(shutil.move, str(temp_path), str(target_path))
+
+            try:
+                with UPLOAD_STAGE_SECONDS.labels("thumbnail").time():
+                    await self._generate_thumbnail(target_path, file_hash)
+            except Exception as e:
+                logger.error(
+                    f"MediaService | action=thumbnail_failed "
+                    f"hash={file_hash} error={e}", exc_info=True
+                )
+
+            await repository.save_file(
+                file_hash=file_hash, size_bytes=size_bytes, mime_type=mime_type, path=str(target_path)
+            )
+            await repository.commit()
+            return str(target_path)
+
+    async def _get_owned_image_ids(self, user_id: UUID, image_ids: list[UUID]) -> list[UUID]:
+        """
+        Deduplicate image IDs and check that all of them belong to the user.
+        Raises PermissionDeniedException otherwise.
+        """
+        unique_ids = list(dict.fromkeys(image_ids))
+        owned = await self.repository.count_owned_images(user_id=user_id, image_ids=unique_ids)
+
+        if owned != len(unique_ids):
+            logger.warning(
+                f"MediaService | action=bulk_failed reason=permission_denied "
+                f"user_id={user_id} requested={len(unique_ids)} owned={owned}"
+            )
+            raise PermissionDeniedException(detail="Some images do not exist or are not yours")
+
+        return unique_ids
+
     async def _process_stream_to_temp(self, upload_file: UploadFile, temp_path: Path) -> tuple[str, int]:
         """
         Reads UploadFile stream, calculates SHA256, and writes to temp_path simultaneously.
@@ -277,7 +432,7 @@ class MediaService:
         def _get_mime() -> str:
             return str(magic.from_file(str(path), mime=True))
 
-        detected_mime = await run_in_threadpool(_get_mime)
+        detected_mime = await self._run_imaging(_get_mime)
 
         if detected_mime not in self.ALLOWED_MIME_TYPES:
             logger.warning(
@@ -292,29 +447,18 @@ class MediaService:
 
     def _get_storage_path(self, file_hash: str, ext: str = "") -> Path:
         """
-        Generate sharded path: root/storage/a1/b2/a1b2c3d4...ext
-        Creates directories if needed.
+        Sharded path for a new blob: root/storage/a1/b2/a1b2c3d4...ext
+        Creates the shard directory (write path only).
         """
-        # Sharding: a1/b2
-        shard = self.storage_dir / file_hash[:2] / file_hash[2:4]
-        os.makedirs(shard, exist_ok=True)
-        return shard / f"{file_hash}{ext}"
-
-    def _get_thumbnail_path(self, file_hash: str) -> Path:
-        """
-        Generate path for thumbnail: root/storage/a1/b2/a1b2c3d4..._thumb.jpg
-        """
-        # Thumbnails are always jpg and stored alongside original
-        # We use _get_storage_path just to get the dir, but we construct filename manually
-        shard = self.storage_dir / file_hash[:2] / file_hash[2:4]
-        return shard / f"{file_hash}_thumb.jpg"
+        self.storage.shard_dir(file_hash).mkdir(parents=True, exist_ok=True)
+        return self.storage.original_path(file_hash, ext)
 
     async def _generate_thumbnail(self, original_path: Path, file_hash: str) -> None:
         """
         Generates a thumbnail for the image using Pillow.
         Runs in a threadpool to avoid blocking the event loop.
         """
-        thumb_path = self._get_thumbnail_path(file_hash)
+        thumb_path = self.storage.thumbnail_path(file_hash)
 
         def _process() -> None:
             with PILImage.open(original_path) as img:
@@ -324,9 +468,34 @@ class MediaService:
                 img.thumbnail((300, 300))
                 img.save(thumb_path, "JPEG", quality=85)
 
-        await run_in_threadpool(_process)
+        await self._run_imaging(_process)
         logger.debug(f"MediaService | action=thumbnail_generated hash={file_hash}")
 
+    async def _run_imaging(self, fn: Callable[[], T]) -> T:
+        """
+        Run CPU-bound image work on the app's imaging pool (shared threadpool if none is given).
+        """
+        with span("imaging"):
+            if self.imaging_pool is None:
+                return await run_in_threadpool(fn)
+            return await asyncio.get_running_loop().run_in_executor(self.imaging_pool, fn)
+
+    async def _remove_blobs(self, files: list[tuple[str, str]]) -> None:
+        """
+        Remove originals and thumbnails of collected files in one threadpool hop.
+        Paths are built from the stored mime type, so no existence probing is needed.
+        """
+        paths = []
+        for file_hash, mime_type in files:
+            paths.append(self.storage.original_path(file_hash, self.ALLOWED_MIME_TYPES.get(mime_type, "")))
+            paths.append(self.storage.thumbnail_path(file_hash))
+
+        def _unlink_all() -> None:
+            for path in paths:
+                path.unlink(missing_ok=True)
+
+        await run_in_threadpool(_unlink_all)
+
     @staticmethod
     async def _remove_file(path: Path) -> None:
         """
@@ -0,0 +1,85 @@
+from functools import lru_cache
+from pathlib import Path
+
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from backend.apps.media.schemas.media import MIME_EXTENSIONS
+from backend.core.exceptions import NotFoundException
+
+
+class MediaStorage:
+    """
+    On-disk layout of the CAS storage (originals, thumbnails, temp uploads).
+    Resolves paths from the file hash alone: no DB access, no filesystem setup per call.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.temp_dir = root / "temp"
+        self.storage_dir = root / "storage"
+
+    def ensure_dirs(self) -> None:
+        """
+        Create the temp and storage roots. Called once per process.
+        """
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+
+    def shard_dir(self, file_hash: str) -> Path:
+        """
+        Sharded directory of a hash: root/storage/a1/b2
+        """
+        return self.storage_dir / file_hash[:2] / file_hash[2:4]
+
+    def original_path(self, file_hash: str, ext: str = "") -> Path:
+        """
+        Path of the original: root/storage/a1/b2/a1b2c3d4...ext
+        """
+        return self.shard_dir(file_hash) / f"{file_hash}{ext}"
+
+    def thumbnail_path(self, file_hash: str) -> Path:
+        """
+        Path of the thumbnail: root/storage/a1/b2/a1b2c3d4..._thumb.jpg
+        """
+        return self.shard_dir(file_hash) / f"{file_hash}_thumb.jpg"
+
+    async def find_original(self, file_hash: str) -> Path:
+        """
+        Locate the original on disk (used for fallback serving via Python).
+        Current blobs carry an extension, so those are probed before the legacy extensionless name.
+        All probes run in one threadpool hop, off the event loop.
+        """
+
+        def _probe() -> Path | None:
+            for ext in (*MIME_EXTENSIONS.values(), ""):
+                path = self.original_path(file_hash, ext)
+                if path.is_file():
+                    return path
+            return None
+
+        found = await run_in_threadpool(_probe)
+        if found is None:
+            logger.warning(f"MediaStorage | action=get_file_failed reason=not_found hash={file_hash}")
+            raise NotFoundException(detail="File not found")
+        return found
+
+    async def find_thumbnail(self, file_hash: str) -> Path:
+        """
+        Locate the thumbnail on disk (probed off the event loop).
+        """
+        path = self.thumbnail_path(file_hash)
+        if not await run_in_threadpool(path.is_file):
+            logger.warning(f"MediaStorage | action=get_thumb_failed reason=not_found hash={file_hash}")
+            raise NotFoundException(detail="Thumbnail not found")
+        return path
+
+
+@lru_cache(maxsize=None)
+def open_storage(root: Path) -> MediaStorage:
+    """
+    Process-wide storage for a root directory; its directories are created on first use only.
+    """
+    storage = MediaStorage(root)
+    storage.ensure_dirs()
+    return storage
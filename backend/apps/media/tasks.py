@@ -0,0 +1,66 @@
+import asyncio
+from datetime import timedelta
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.apps.media.services.media_service import MediaService
+from backend.apps.media.storage import MediaStorage
+from backend.core.config import settings
+from backend.core.metrics import GC_SWEEPS_TOTAL
+from backend.database.repositories.media_repository import MediaRepository
+
+
+async def sweep_orphaned_files(
+    session_factory: async_sessionmaker[AsyncSession], storage: MediaStorage | None = None
+) -> int:
+    """
+    Run the GC mark phase, then collect all files orphaned longer than the grace period,
+    one batch per transaction. Only one worker sweeps at a time: the others skip the round.
+
+    Returns:
+        int: Number of collected files.
+    """
+    grace_period = timedelta(seconds=settings.GC_GRACE_PERIOD_SECONDS)
+    total = 0
+
+    # The GC lock lives in this session's transaction, open until the sweep is done
+    async with session_factory() as lock_session:
+        if not await MediaRepository(session=lock_session).try_lock_gc():
+            logger.debug("FileSweeper | action=sweep_skipped reason=locked")
+            return 0
+
+        while True:
+            async with session_factory() as session:
+                service = MediaService(MediaRepository(session=session), storage=storage)
+                if not await service.mark_garbage(batch_size=settings.GC_BATCH_SIZE):
+                    break
+
+        while True:
+            async with session_factory() as session:
+                service = MediaService(MediaRepository(session=session), storage=storage)
+                collected = await service.collect_garbage(grace_period=grace_period, batch_size=settings.GC_BATCH_SIZE)
+
+            total += collected
+            if collected < settings.GC_BATCH_SIZE:
+                return total
+
+
+async def run_file_sweeper(
+    session_factory: async_sessionmaker[AsyncSession], storage: MediaStorage | None = None
+) -> None:
+    """
+    Background loop started from the app lifespan. Runs until cancelled.
+    """
+    logger.info(f"FileSweeper | action=start interval={settings.GC_INTERVAL_SECONDS}s")
+
+    while True:
+        try:
+            collected = await sweep_orphaned_files(session_factory, storage)
+            logger.debug(f"FileSweeper | action=sweep_done collected={collected}")
+            GC_SWEEPS_TOTAL.labels("ok").inc()
+        except Exception as e:
+            logger.error(f"FileSweeper | action=sweep_failed error={e}", exc_info=True)
+            GC_SWEEPS_TOTAL.labels("error").inc()
+
+        await asyncio.sleep(settings.GC_INTERVAL_SECONDS)
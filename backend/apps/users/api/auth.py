@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from loguru import logger
 
@@ -27,6 +27,7 @@ async def register_new_user(
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     auth_service: AuthService = Depends(get_auth_service),
 ) -> Token:
@@ -38,7 +39,8 @@ async def login_for_access_token(
     """
     logger.info(f"AuthRouter | action=login_request email={form_data.username}")
 
-    user = await auth_service.authenticate_user(form_data.username, form_data.password)
+    client_ip = request.client.host if request.client else None
+    user = await auth_service.authenticate_user(form_data.username, form_data.password, client_ip=client_ip)
     if not user:
         logger.warning(
             f"AuthRouter | action=login_failed "
@@ -0,0 +1,58 @@
+"""
+API key management (keys are never exposed over HTTP).
+
+Usage:
+    python -m backend.apps.users.cli issue-key --name shop-cdn --owner cdn@shop.example \\
+        --scope media:read --scope media:write
+    python -m backend.apps.users.cli revoke-key --name shop-cdn
+
+Running workers pick up the change through the api_key_changed notification.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from backend.apps.users.schemas.api_key import API_KEY_SCOPES
+from backend.apps.users.services.api_key_service import ApiKeyService
+from backend.core.database import async_engine, async_session_factory
+from backend.core.exceptions import BaseAPIException
+from backend.database.repositories.api_key_repository import ApiKeyRepository
+from backend.database.repositories.user_repository import UserRepository
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        async with async_session_factory() as session:
+            service = ApiKeyService(ApiKeyRepository(session=session), UserRepository(session=session))
+            if args.command == "issue-key":
+                api_key = await service.issue_key(name=args.name, owner_email=args.owner, scopes=args.scope)
+                print(f"{args.name}: {api_key}")
+                print("Store it now: only its SHA-256 digest is kept.", file=sys.stderr)
+            else:
+                await service.revoke_key(name=args.name)
+                print(f"{args.name}: revoked")
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    issue = commands.add_parser("issue-key", help="Create a key; a missing owner becomes a service account")
+    issue.add_argument("--name", required=True, help="Unique service name")
+    issue.add_argument("--owner", required=True, help="Email of the user the key acts for")
+    issue.add_argument("--scope", action="append", required=True, choices=API_KEY_SCOPES)
+
+    revoke = commands.add_parser("revoke-key", help="Deactivate a key")
+    revoke.add_argument("--name", required=True)
+
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except BaseAPIException as e:
+        sys.exit(f"Error: {e.detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import uuid
+from typing import Protocol
+
+from backend.apps.users.schemas.api_key import ApiKeyPrincipal
+
+
+class IApiKeyRepository(Protocol):
+    """
+    Interface for API Key Repository.
+    Defines the contract for data access operations related to API keys.
+    """
+
+    async def list_active(self) -> dict[str, ApiKeyPrincipal]:
+        """
+        Load all usable keys: active keys of active owners.
+
+        Returns:
+            Mapping of key hash to key principal.
+        """
+        ...
+
+    async def create(self, name: str, key_hash: str, user_id: uuid.UUID, scopes: list[str]) -> None:
+        """
+        Store a new API key.
+
+        Args:
+            name: Unique service name.
+            key_hash: SHA-256 digest of the key.
+            user_id: Owner the key acts on behalf of.
+            scopes: Granted scopes.
+        """
+        ...
+
+    async def deactivate(self, name: str) -> bool:
+        """
+        Revoke an API key by name.
+
+        Args:
+            name: Service name of the key.
+
+        Returns:
+            True if an active key was revoked.
+        """
+        ...
+
+    async def commit(self) -> None:
+        """
+        Commit the current transaction.
+        """
+        ...
@@ -2,27 +2,33 @@ import uuid
 from datetime import datetime
 from typing import Protocol
 
-from backend.database.models import RefreshToken
+from backend.apps.users.schemas.token import TokenRotation
 
 
 class ITokenRepository(Protocol):
     """
     Interface for Refresh Token Repository.
+    Tokens are stored and looked up by their SHA-256 digest only.
     """
 
-    async def create(self, user_id: uuid.UUID, token: str, expires_at: datetime) -> RefreshToken:
+    async def create(self, user_id: uuid.UUID, token_hash: str, expires_at: datetime) -> None:
         """
-        Save a new refresh token.
+        Save a new refresh token digest.
         """
         ...
 
-    async def get_by_token(self, token: str) -> RefreshToken | None:
+    async def rotate(
+        self, token_hash: str, new_token_hash: str, new_expires_at: datetime, now: datetime
+    ) -> TokenRotation | None:
         """
-        Find a refresh token by its value.
+        Atomically delete a token and, if it was unexpired and its user active, insert its successor.
+
+        Returns:
+            Rotation outcome, or None if the token does not exist (already used or revoked).
         """
         ...
 
-    async def delete(self, token: str) -> None:
+    async def delete(self, token_hash: str) -> None:
         """
         Delete a specific token (logout/rotation).
         """
@@ -34,6 +40,15 @@ class ITokenRepository(Protocol):
         """
         ...
 
+    async def delete_expired(self, now: datetime, limit: int) -> int:
+        """
+        Delete one batch of tokens that expired before now.
+
+        Returns:
+            Number of deleted tokens.
+        """
+        ...
+
     async def commit(self) -> None:
         """
         Commit the current transaction.
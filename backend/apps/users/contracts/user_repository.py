@@ -11,12 +11,13 @@ class IUserRepository(Protocol):
     Defines the contract for data access operations related to Users.
     """
 
-    async def get_by_id(self, user_id: uuid.UUID) -> User | None:
+    async def get_by_id(self, user_id: uuid.UUID, primary: bool = False) -> User | None:
         """
         Retrieve a user by their unique ID.
 
         Args:
             user_id: The UUID of the user.
+            primary: Read the primary even if a replica is configured.
 
         Returns:
             User object if found, None otherwise.
@@ -47,6 +48,16 @@ class IUserRepository(Protocol):
         """
         ...
 
+    async def update_password_hash(self, user_id: uuid.UUID, hashed_password: str) -> None:
+        """
+        Replace the stored password hash of a user.
+
+        Args:
+            user_id: The UUID of the user.
+            hashed_password: The new, already hashed password.
+        """
+        ...
+
     async def commit(self) -> None:
         """
         Commit the current transaction.
@@ -0,0 +1,22 @@
+import uuid
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+# media:read — own gallery and search; media:write — upload, tagging, deletion
+ApiKeyScope = Literal["media:read", "media:write"]
+API_KEY_SCOPES: tuple[ApiKeyScope, ...] = ("media:read", "media:write")
+
+
+class ApiKeyPrincipal(BaseModel):
+    """
+    Immutable snapshot of an active API key, as held by the in-memory key index.
+    `id` is the owner's user id, so routes treat it like CurrentUser.id.
+    """
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: uuid.UUID
+    key_id: uuid.UUID
+    name: str
+    scopes: frozenset[str]
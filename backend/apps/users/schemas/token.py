@@ -1,3 +1,5 @@
+import uuid
+
 from pydantic import BaseModel
 
 from backend.core.schemas.base import BaseRequest, BaseResponse
@@ -23,6 +25,18 @@ class TokenPayload(BaseModel):
     exp: int | None = None
 
 
+class TokenRotation(BaseModel):
+    """
+    Outcome of a refresh token rotation (repository -> service).
+    Internal use only.
+    """
+
+    user_id: uuid.UUID
+    expired: bool
+    is_active: bool
+    rotated: bool
+
+
 class RefreshTokenRequest(BaseRequest):
     """
     Schema for Refresh Token request.
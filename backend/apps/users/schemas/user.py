@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from backend.core.schemas.base import BaseRequest, BaseResponse
 
@@ -42,3 +42,12 @@ class UserResponse(UserBase, BaseResponse):
     is_active: bool
     is_superuser: bool
     created_at: datetime
+
+
+class CurrentUser(UserResponse):
+    """
+    Immutable snapshot of the authenticated user.
+    Shared between requests through the user cache, so it must not be mutated.
+    """
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
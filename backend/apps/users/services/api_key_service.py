@@ -0,0 +1,100 @@
+import secrets
+import uuid
+
+from loguru import logger
+from sqlalchemy.exc import IntegrityError
+
+from backend.apps.users.contracts.api_key_repository import IApiKeyRepository
+from backend.apps.users.contracts.user_repository import IUserRepository
+from backend.apps.users.schemas.api_key import API_KEY_SCOPES, ApiKeyPrincipal
+from backend.apps.users.schemas.user import UserCreate
+from backend.core.exceptions import BusinessLogicException, NotFoundException, ValidationException
+from backend.core.security import get_password_hash, hash_token
+
+API_KEY_PREFIX = "pl_"
+
+
+class ApiKeyIndex:
+    """
+    In-memory index of usable API keys (digest -> principal), one per process.
+    Authenticating a key costs one SHA-256 and a dict lookup: no JWT decode, no DB round trip.
+    The whole index is swapped on reload, so readers never see a partial state.
+    """
+
+    def __init__(self) -> None:
+        self._keys: dict[str, ApiKeyPrincipal] = {}
+        self._owners: frozenset[uuid.UUID] = frozenset()
+
+    def replace(self, keys: dict[str, ApiKeyPrincipal]) -> None:
+        self._keys = keys
+        self._owners = frozenset(principal.id for principal in keys.values())
+
+    def lookup(self, api_key: str) -> ApiKeyPrincipal | None:
+        return self._keys.get(hash_token(api_key))
+
+    def has_owner(self, user_id: uuid.UUID) -> bool:
+        """
+        Whether a user change (e.g. deactivation) can affect any indexed key.
+        """
+        return user_id in self._owners
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class ApiKeyService:
+    """
+    Service responsible for API keys: issuing, revoking and loading the key index.
+    """
+
+    def __init__(self, api_key_repository: IApiKeyRepository, user_repository: IUserRepository):
+        self.api_key_repository = api_key_repository
+        self.user_repository = user_repository
+
+    async def issue_key(self, name: str, owner_email: str, scopes: list[str]) -> str:
+        """
+        Create a key for a service. A missing owner is created as a service account
+        with a random password (it can't log in).
+
+        Returns:
+            str: The plain key. It is shown only once: just its digest is stored.
+        """
+        unknown = set(scopes) - set(API_KEY_SCOPES)
+        if not scopes or unknown:
+            raise ValidationException(detail=f"Scopes must be a non-empty subset of {list(API_KEY_SCOPES)}")
+
+        owner = await self.user_repository.get_by_email(owner_email)
+        if owner is None:
+            owner = await self.user_repository.create(
+                UserCreate(email=owner_email, password=get_password_hash(secrets.token_urlsafe(32)))
+            )
+            logger.info(f"ApiKeyService | action=service_account_created user_id={owner.id}")
+
+        api_key = API_KEY_PREFIX + secrets.token_urlsafe(32)
+        try:
+            await self.api_key_repository.create(
+                name=name, key_hash=hash_token(api_key), user_id=owner.id, scopes=sorted(set(scopes))
+            )
+            await self.api_key_repository.commit()
+        except IntegrityError:
+            logger.warning(f"ApiKeyService | action=issue_failed reason=name_exists name={name}")
+            raise BusinessLogicException(detail="API key with this name already exists") from None
+
+        logger.info(f"ApiKeyService | action=key_issued name={name} user_id={owner.id} scopes={sorted(scopes)}")
+        return api_key
+
+    async def revoke_key(self, name: str) -> None:
+        """
+        Deactivate a key. Workers drop it from their index on the api_key_changed notification.
+        """
+        if not await self.api_key_repository.deactivate(name):
+            raise NotFoundException(detail="Active API key not found")
+        await self.api_key_repository.commit()
+        logger.info(f"ApiKeyService | action=key_revoked name={name}")
+
+    async def load_index(self, index: ApiKeyIndex) -> None:
+        """
+        Replace the index contents with the current set of usable keys.
+        """
+        index.replace(await self.api_key_repository.list_active())
+        logger.debug(f"ApiKeyService | action=index_loaded keys={len(index)}")
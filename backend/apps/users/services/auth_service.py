@@ -1,20 +1,32 @@
+import asyncio
+import math
 import secrets
+from collections.abc import Callable
+from concurrent.futures import Executor
 from datetime import UTC, datetime, timedelta
+from typing import TypeVar
+from uuid import UUID
 
 from loguru import logger
 from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 
 from backend.apps.users.contracts.token_repository import ITokenRepository
 from backend.apps.users.contracts.user_repository import IUserRepository
 from backend.apps.users.schemas.token import Token
 from backend.apps.users.schemas.user import UserCreate, UserResponse
 from backend.core.config import settings
-from backend.core.exceptions import AuthException, BusinessLogicException
+from backend.core.exceptions import AuthException, BusinessLogicException, TooManyRequestsException
+from backend.core.ratelimit import LoginThrottle
 from backend.core.security import (
     create_access_token,
     get_password_hash,
-    verify_password,
+    hash_token,
+    verify_and_update_password,
 )
+from backend.core.timing import span
+
+T = TypeVar("T")
 
 
 class AuthService:
@@ -23,9 +35,17 @@ class AuthService:
     Handles registration, login, and token management.
     """
 
-    def __init__(self, user_repository: IUserRepository, token_repository: ITokenRepository):
+    def __init__(
+        self,
+        user_repository: IUserRepository,
+        token_repository: ITokenRepository,
+        hashing_pool: Executor | None = None,
+        throttle: LoginThrottle | None = None,
+    ):
         self.user_repository = user_repository
         self.token_repository = token_repository
+        self.hashing_pool = hashing_pool
+        self.throttle = throttle
 
     async def register_user(self, user_in: UserCreate) -> UserResponse:
         """
@@ -33,7 +53,7 @@ class AuthService:
         """
         logger.info(f"AuthService | action=register_attempt email={user_in.email}")
 
-        hashed_password = get_password_hash(user_in.password)
+        hashed_password = await self._run_hashing(lambda: get_password_hash(user_in.password))
         user_with_hash = user_in.model_copy(update={"password": hashed_password})
 
         try:
@@ -50,26 +70,47 @@ class AuthService:
 
         return UserResponse.model_validate(created_user)
 
-    async def authenticate_user(self, email: str, password: str) -> UserResponse | None:
+    async def authenticate_user(self, email: str, password: str, client_ip: str | None = None) -> UserResponse | None:
         """
         Authenticate a user by email and password.
         Returns UserResponse if successful, None otherwise.
+        Throttled attempts are rejected before any DB lookup or hashing.
         """
-        logger.info(f"AuthService | action=auth_attempt email={email}")
+        logger.info(f"AuthService | action=auth_attempt email={email} ip={client_ip}")
+
+        if self.throttle:
+            retry_after = self.throttle.acquire(email, client_ip)
+            if retry_after:
+                logger.warning(
+                    f"AuthService | action=auth_throttled email={email} ip={client_ip} retry_after={retry_after:.1f}"
+                )
+                raise TooManyRequestsException(retry_after=math.ceil(retry_after))
 
         user = await self.user_repository.get_by_email(email)
         if not user:
             logger.warning(f"AuthService | action=auth_failed reason=user_not_found email={email}")
+            self._record_login_failure(email)
             return None
 
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = await self._run_hashing(lambda: verify_and_update_password(password, user.hashed_password))
+        if not valid:
             logger.warning(f"AuthService | action=auth_failed reason=invalid_password email={email}")
+            self._record_login_failure(email)
             return None
 
+        if self.throttle:
+            self.throttle.record_success(email)
+
         if not user.is_active:
             logger.warning(f"AuthService | action=auth_failed reason=inactive_user email={email}")
             return None
 
+        # Legacy scheme or old cost: store the upgraded hash while we have the plain password
+        if new_hash:
+            await self.user_repository.update_password_hash(user_id=user.id, hashed_password=new_hash)
+            await self.user_repository.commit()
+            logger.info(f"AuthService | action=password_rehashed user_id={user.id}")
+
         logger.info(f"AuthService | action=auth_success user_id={user.id}")
         return UserResponse.model_validate(user)
 
@@ -78,53 +119,92 @@ class AuthService:
         Generate Access and Refresh tokens for a user.
         Saves the refresh token in the database.
         """
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(subject=str(user.id), expires_delta=access_token_expires)
-
-        refresh_token = secrets.token_urlsafe(32)
-        refresh_token_expires = datetime.now(UTC) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        refresh_token, refresh_token_expires = self._new_refresh_token()
 
-        await self.token_repository.create(user_id=user.id, token=refresh_token, expires_at=refresh_token_expires)
+        await self.token_repository.create(
+            user_id=user.id, token_hash=hash_token(refresh_token), expires_at=refresh_token_expires
+        )
         await self.token_repository.commit()
 
         logger.debug(f"AuthService | action=tokens_generated user_id={user.id}")
 
-        return Token(access_token=access_token, refresh_token=refresh_token, token_type="bearer")
+        return Token(access_token=self._new_access_token(user.id), refresh_token=refresh_token, token_type="bearer")
 
     async def refresh_token(self, token: str) -> Token:
         """
-        Rotate refresh token: validate old one, delete it, create new pair.
+        Rotate refresh token: consume the old one and store the new one in a single statement.
+        A token can be rotated only once, even by concurrent requests.
+        Expired tokens and tokens of inactive users are consumed without a successor.
         """
-        db_token = await self.token_repository.get_by_token(token)
-        if not db_token:
+        refresh_token, refresh_token_expires = self._new_refresh_token()
+        rotation = await self.token_repository.rotate(
+            token_hash=hash_token(token),
+            new_token_hash=hash_token(refresh_token),
+            new_expires_at=refresh_token_expires,
+            now=datetime.now(UTC),
+        )
+        if rotation is None:
             logger.warning("AuthService | action=refresh_failed reason=token_not_found")
             raise AuthException("Invalid refresh token")
 
-        now = datetime.now(UTC)
-        if db_token.expires_at < now:
-            logger.warning("AuthService | action=refresh_failed reason=token_expired")
-            await self.token_repository.delete(token)
-            await self.token_repository.commit()
-            raise AuthException("Refresh token expired")
+        await self.token_repository.commit()
 
-        user = await self.user_repository.get_by_id(db_token.user_id)
-        if not user:
-            logger.error(f"AuthService | action=refresh_failed reason=user_not_found user_id={db_token.user_id}")
-            await self.token_repository.delete(token)
-            await self.token_repository.commit()
-            raise AuthException("User not found")
+        if rotation.expired:
+            logger.warning(f"AuthService | action=refresh_failed reason=token_expired user_id={rotation.user_id}")
+            raise AuthException("Refresh token expired")
 
-        if not user.is_active:
+        if not rotation.is_active:
+            logger.warning(f"AuthService | action=refresh_failed reason=inactive_user user_id={rotation.user_id}")
             raise AuthException("User is inactive")
 
-        await self.token_repository.delete(token)
-
-        user_schema = UserResponse.model_validate(user)
-        return await self.create_tokens(user_schema)
+        logger.debug(f"AuthService | action=tokens_rotated user_id={rotation.user_id}")
+        return Token(
+            access_token=self._new_access_token(rotation.user_id), refresh_token=refresh_token, token_type="bearer"
+        )
 
     async def logout(self, token: str) -> None:
         """
         Logout: simply delete the refresh token.
         """
-        await self.token_repository.delete(token)
+        await self.token_repository.delete(hash_token(token))
         await self.token_repository.commit()
+
+    async def purge_expired_tokens(self, batch_size: int) -> int:
+        """
+        Delete one batch of expired refresh tokens (abandoned sessions).
+
+        Returns:
+            int: Number of deleted tokens.
+        """
+        deleted = await self.token_repository.delete_expired(now=datetime.now(UTC), limit=batch_size)
+        await self.token_repository.commit()
+        if deleted:
+            logger.info(f"AuthService | action=expired_tokens_purged count={deleted}")
+        return deleted
+
+    @staticmethod
+    def _new_access_token(user_id: UUID) -> str:
+        return create_access_token(
+            subject=str(user_id), expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+
+    @staticmethod
+    def _new_refresh_token() -> tuple[str, datetime]:
+        """
+        Returns: (opaque token, expiry). Only its digest is ever stored.
+        """
+        return secrets.token_urlsafe(32), datetime.now(UTC) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+    def _record_login_failure(self, email: str) -> None:
+        if self.throttle:
+            self.throttle.record_failure(email)
+
+    async def _run_hashing(self, fn: Callable[[], T]) -> T:
+        """
+        Run password hashing on the app's bounded hashing pool (shared threadpool if none is given).
+        Never on the event loop: one bcrypt/argon2 call takes ~100-300 ms of CPU.
+        """
+        with span("password_hash"):
+            if self.hashing_pool is None:
+                return await run_in_threadpool(fn)
+            return await asyncio.get_running_loop().run_in_executor(self.hashing_pool, fn)
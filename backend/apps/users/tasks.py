@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import time
+import uuid
+from typing import Any
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from backend.apps.users.schemas.user import CurrentUser
+from backend.apps.users.services.api_key_service import ApiKeyIndex, ApiKeyService
+from backend.apps.users.services.auth_service import AuthService
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.database.repositories.api_key_repository import ApiKeyRepository
+from backend.database.repositories.token_repository import TokenRepository
+from backend.database.repositories.user_repository import UserRepository
+
+# Postgres channel fed by the users_notify_changed trigger (payload: user id)
+USER_CHANGED_CHANNEL = "user_changed"
+# Fed by the api_keys_notify_changed trigger (payload: key name)
+API_KEY_CHANGED_CHANNEL = "api_key_changed"
+PING_INTERVAL_SECONDS = 30
+RECONNECT_DELAY_SECONDS = 5
+
+
+async def run_user_cache_listener(engine: AsyncEngine, cache: TTLCache[uuid.UUID, CurrentUser]) -> None:
+    """
+    Background loop started from the app lifespan. Runs until cancelled.
+    Every worker LISTENs on USER_CHANGED_CHANNEL and drops the changed user from its cache,
+    so deactivation or a password change made by any worker (or by hand in SQL) applies everywhere.
+    """
+    logger.info(f"UserCacheListener | action=start channel={USER_CHANGED_CHANNEL}")
+
+    def on_notify(_connection: Any, _pid: int, _channel: str, payload: str) -> None:
+        cache.pop(uuid.UUID(payload))
+        logger.debug(f"UserCacheListener | action=invalidated user_id={payload}")
+
+    while True:
+        try:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                driver: Any = raw.driver_connection  # asyncpg.Connection
+                await driver.add_listener(USER_CHANGED_CHANNEL, on_notify)
+
+                # Changes made while we were not listening are unknown
+                cache.clear()
+                logger.info("UserCacheListener | action=listening")
+
+                try:
+                    while True:
+                        await asyncio.sleep(PING_INTERVAL_SECONDS)
+                        await driver.execute("SELECT 1")  # raises once the connection is gone
+                finally:
+                    if not driver.is_closed():
+                        await driver.remove_listener(USER_CHANGED_CHANNEL, on_notify)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"UserCacheListener | action=listen_failed error={e}", exc_info=True)
+
+        cache.clear()
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+async def sweep_expired_tokens(session_factory: async_sessionmaker[AsyncSession]) -> int:
+    """
+    Delete all expired refresh tokens, one small batch per transaction
+    (short locks, bounded WAL per commit).
+
+    Returns:
+        int: Number of deleted tokens.
+    """
+    total = 0
+    while True:
+        async with session_factory() as session:
+            service = AuthService(UserRepository(session=session), TokenRepository(session=session))
+            deleted = await service.purge_expired_tokens(batch_size=settings.TOKEN_SWEEP_BATCH_SIZE)
+
+        total += deleted
+        if deleted < settings.TOKEN_SWEEP_BATCH_SIZE:
+            return total
+
+
+async def run_token_sweeper(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    """
+    Background loop started from the app lifespan. Runs until cancelled.
+    """
+    logger.info(f"TokenSweeper | action=start interval={settings.TOKEN_SWEEP_INTERVAL_SECONDS}s")
+
+    while True:
+        try:
+            deleted = await sweep_expired_tokens(session_factory)
+            logger.debug(f"TokenSweeper | action=sweep_done deleted={deleted}")
+        except Exception as e:
+            logger.error(f"TokenSweeper | action=sweep_failed error={e}", exc_info=True)
+
+        await asyncio.sleep(settings.TOKEN_SWEEP_INTERVAL_SECONDS)
+
+
+async def refresh_api_key_index(session_factory: async_sessionmaker[AsyncSession], index: ApiKeyIndex) -> None:
+    """
+    Reload the in-memory API key index from the DB.
+    """
+    async with session_factory() as session:
+        service = ApiKeyService(ApiKeyRepository(session=session), UserRepository(session=session))
+        await service.load_index(index)
+
+
+async def run_api_key_listener(
+    engine: AsyncEngine | None, session_factory: async_sessionmaker[AsyncSession], index: ApiKeyIndex
+) -> None:
+    """
+    Background loop started from the app lifespan. Runs until cancelled.
+    Reloads the whole index (a handful of rows) when a key changes or the owner of an indexed key changes,
+    and every API_KEY_RELOAD_SECONDS in case notifications are missed (or LISTEN is disabled).
+    engine is the LISTEN connection source; None (no session-level connection) means periodic reloads only.
+    Unlike the user cache, the index is kept on errors: emptying it would lock out every service.
+    """
+    logger.info(f"ApiKeyListener | action=start listen={settings.API_KEY_LISTEN and engine is not None}")
+
+    if not settings.API_KEY_LISTEN or engine is None:
+        await _reload_api_keys_periodically(session_factory, index)
+        return
+
+    changed = asyncio.Event()
+
+    def on_notify(_connection: Any, _pid: int, channel: str, payload: str) -> None:
+        if channel == USER_CHANGED_CHANNEL and not index.has_owner(uuid.UUID(payload)):
+            return
+        changed.set()
+
+    channels = (API_KEY_CHANGED_CHANNEL, USER_CHANGED_CHANNEL)
+    while True:
+        try:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                driver: Any = raw.driver_connection  # asyncpg.Connection
+                for channel in channels:
+                    await driver.add_listener(channel, on_notify)
+
+                try:
+                    # Changes made while we were not listening are unknown
+                    changed.clear()
+                    await refresh_api_key_index(session_factory, index)
+                    reloaded_at = time.monotonic()
+                    logger.info(f"ApiKeyListener | action=listening keys={len(index)}")
+
+                    while True:
+                        with contextlib.suppress(TimeoutError):
+                            await asyncio.wait_for(changed.wait(), timeout=PING_INTERVAL_SECONDS)
+
+                        if changed.is_set() or time.monotonic() - reloaded_at >= settings.API_KEY_RELOAD_SECONDS:
+                            # Notifications that arrive during the reload trigger another one
+                            changed.clear()
+                            await refresh_api_key_index(session_factory, index)
+                            reloaded_at = time.monotonic()
+                            logger.debug(f"ApiKeyListener | action=reloaded keys={len(index)}")
+                        else:
+                            await driver.execute("SELECT 1")  # raises once the connection is gone
+                finally:
+                    if not driver.is_closed():
+                        for channel in channels:
+                            await driver.remove_listener(channel, on_notify)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"ApiKeyListener | action=listen_failed error={e}", exc_info=True)
+
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+async def _reload_api_keys_periodically(
+    session_factory: async_sessionmaker[AsyncSession], index: ApiKeyIndex
+) -> None:
+    while True:
+        await asyncio.sleep(settings.API_KEY_RELOAD_SECONDS)
+        try:
+            await refresh_api_key_index(session_factory, index)
+        except Exception as e:
+            logger.error(f"ApiKeyListener | action=reload_failed error={e}", exc_info=True)
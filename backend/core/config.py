@@ -1,6 +1,6 @@
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import computed_field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -29,20 +29,86 @@ class Settings(BaseSettings):
     
     # Domain settings for generating absolute URLs
     SITE_URL: str = "http://localhost:8000"
+    # "HEADLESS": media API only, authenticated by X-API-Key (no registration, login or JWT)
+    APP_MODE: Literal["FULL", "HEADLESS"] = "FULL"
 
 
 
     # --- Security ---
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Login throttling (per worker), checked before password hashing
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_ACCOUNT_BURST: int = 5
+    LOGIN_ACCOUNT_PER_MINUTE: float = 5
+    LOGIN_IP_BURST: int = 20
+    LOGIN_IP_PER_MINUTE: float = 30
+    LOGIN_BACKOFF_AFTER_FAILURES: int = 3  # then 1, 2, 4, ... seconds per failure
+    LOGIN_BACKOFF_MAX_SECONDS: float = 15 * 60
+    # Background deletion of expired refresh tokens
+    TOKEN_SWEEP_ENABLED: bool = True
+    TOKEN_SWEEP_INTERVAL_SECONDS: int = 60 * 60
+    TOKEN_SWEEP_BATCH_SIZE: int = 1000
+    # New hashes use this scheme; hashes in the other scheme (or with another cost) are upgraded on login.
+    # "argon2" (argon2id) needs argon2-cffi installed.
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # concurrent hashes per process, off the event loop
+    # Snapshots of authenticated users (get_current_user); 0 disables the cache
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    # LISTEN for user changes from other workers; needs a session-level connection (see DATABASE_LISTEN_URL).
+    # Without one the cache is switched off; False accepts changes applying only after the TTL.
+    USER_CACHE_LISTEN: bool = True
+    # API keys are held in memory; reloaded on api_key_changed (LISTEN) and on this interval
+    API_KEY_LISTEN: bool = True
+    API_KEY_RELOAD_SECONDS: int = 5 * 60
 
     # --- Database ---
     DATABASE_URL: str
     AUTO_MIGRATE: bool = True
+    # Optional read replica for read-only queries (feed, gallery, profile, auth lookups)
+    DATABASE_READ_URL: str | None = None
+    # After a user's write, their reads stay on the primary for this long (replica lag)
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Direct Postgres DSN (session-level) for LISTEN/NOTIFY when DATABASE_URL goes through pgbouncer
+    # transaction pooling; with DB_PROFILE="direct" the main engine is used
+    DATABASE_LISTEN_URL: str | None = None
+
+    # --- Database Engine Profile ---
+    # "direct": asyncpg talks to Postgres, prepared statements are cached.
+    # "pgbouncer" (default, safe behind any pooler): statement caches disabled.
+    DB_PROFILE: Literal["direct", "pgbouncer"] = "pgbouncer"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 30 * 60  # seconds, -1 disables
+    DB_POOL_TIMEOUT: float = 30.0  # max wait for a pool connection
+    DB_POOL_WARMUP: int = 5  # connections opened at startup
+    DB_CONNECT_TIMEOUT: float = 10.0
+    DB_COMMAND_TIMEOUT: float | None = None
+    DB_STATEMENT_CACHE_SIZE: int = 100  # "direct" profile only
 
     # --- Storage ---
     UPLOAD_DIR: Path = BASE_DIR / "data" / "uploads"
     MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5 MB
+    IMAGING_WORKERS: int = 4  # threads for mime sniffing and thumbnails
+
+    # --- Garbage Collection (CAS) ---
+    GC_ENABLED: bool = True
+    GC_GRACE_PERIOD_SECONDS: int = 24 * 60 * 60  # undo window for deleted files
+    GC_INTERVAL_SECONDS: int = 5 * 60
+    GC_BATCH_SIZE: int = 500
+
+    # --- Metrics ---
+    # Prometheus exposition at /metrics (restrict access at the proxy).
+    # Multi-process workers: set PROMETHEUS_MULTIPROC_DIR to an empty directory.
+    METRICS_ENABLED: bool = True
+    METRICS_SAMPLE_INTERVAL_SECONDS: float = 5.0  # DB pool / threadpool gauges
+    # Server-Timing header + one RequestTiming log line per request (db, auth, imaging, ...).
+    # Off by default: timings leak server internals to clients.
+    SERVER_TIMING_ENABLED: bool = False
+    # DEBUG only: warn when one request runs the same statement shape more than this many times (N+1)
+    QUERY_REPEAT_WARN_THRESHOLD: int = 5
 
     # --- Logging ---
     LOG_LEVEL_CONSOLE: str = "INFO"
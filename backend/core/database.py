@@ -1,42 +1,108 @@
+import asyncio
+import math
+import time
+import uuid
 from collections.abc import AsyncGenerator
-from typing import Any
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Annotated, Any
 from urllib.parse import urlparse, urlunparse
 
+from fastapi import Depends
 from loguru import logger
+from sqlalchemy import event, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, NullPool
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from ..database.models.base import Base
 from .config import BASE_DIR, settings
 
 # --- Connection Configuration ---
 
-connect_args: dict[str, Any] = {
-    "prepared_statement_cache_size": 0,
-}
 
-db_url = settings.DATABASE_URL
+def _connection_args(url: str) -> tuple[str, dict[str, Any]]:
+    """
+    Split asyncpg connect_args out of a database URL and apply the engine profile.
+    """
+    connect_args: dict[str, Any] = {
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+    }
+
+    if settings.DB_PROFILE == "pgbouncer":
+        # Transaction pooling: a prepared statement may land on another server connection
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    else:
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
+    # Handle SSL mode for asyncpg
+    if "sslmode" in url:
+        connect_args["ssl"] = "require"
+        try:
+            parsed = urlparse(url)
+            # Remove query params (like sslmode) from URL as they are handled in connect_args
+            url = urlunparse(parsed._replace(query=""))
+        except Exception as parse_exc:
+            logger.warning(f"Database | action=parse_url_failed error={parse_exc}")
+
+    return url, connect_args
+
+
+@dataclass
+class PoolStats:
+    """
+    Pool checkout wait times (how long requests queue for a connection).
+    """
+
+    checkouts: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+    def observe(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long each checkout waited (per pool: primary and replica apart).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.observe(time.perf_counter() - start)
 
-# Handle SSL mode for asyncpg
-if "sslmode" in db_url:
-    connect_args["ssl"] = "require"
-    try:
-        parsed = urlparse(db_url)
-        # Remove query params (like sslmode) from URL as they are handled in connect_args
-        db_url = urlunparse(parsed._replace(query=""))
-    except Exception as parse_exc:
-        logger.warning(f"Database | action=parse_url_failed error={parse_exc}")
 
 pool_settings: dict[str, Any] = {
-    "pool_size": 20,
-    "max_overflow": 10,
+    "poolclass": TimedAsyncQueuePool,
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
     "pool_pre_ping": True,
 }
 
+db_url, connect_args = _connection_args(settings.DATABASE_URL)
+
 async_engine = create_async_engine(
     db_url,
     echo=False,
@@ -44,9 +110,173 @@ async_engine = create_async_engine(
     **pool_settings,
 )
 
+# --- Read Replica (optional) ---
+
+read_engine: AsyncEngine | None = None
+if settings.DATABASE_READ_URL:
+    read_url, read_connect_args = _connection_args(settings.DATABASE_READ_URL)
+    read_engine = create_async_engine(
+        read_url,
+        echo=False,
+        connect_args=read_connect_args,
+        **pool_settings,
+    )
+
+# --- LISTEN connection ---
+# LISTEN/NOTIFY needs a session-level connection, which pgbouncer transaction pooling does not give:
+# behind pgbouncer the listeners go straight to Postgres via DATABASE_LISTEN_URL (one connection each, no pool).
+# None: no way to receive notifications.
+
+listen_engine: AsyncEngine | None = async_engine if settings.DB_PROFILE == "direct" else None
+if settings.DATABASE_LISTEN_URL:
+    listen_url, listen_connect_args = _connection_args(settings.DATABASE_LISTEN_URL)
+    listen_engine = create_async_engine(
+        listen_url,
+        echo=False,
+        connect_args=listen_connect_args,
+        poolclass=NullPool,
+    )
+
+# Read-your-writes: user key -> monotonic deadline until which their reads go to the primary.
+# Per process; the PRIMARY_PIN_COOKIE set by ReadYourWritesMiddleware carries the pin to the other workers.
+_db_reader: ContextVar[str | None] = ContextVar("db_reader", default=None)
+_pinned_until: dict[str, float] = {}
+
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+
+class RequestPin:
+    """
+    Read-your-writes state of one request: the pin the client brought (cookie) and whether it wrote.
+    """
+
+    __slots__ = ("until", "wrote")
+
+    def __init__(self, until: float = 0.0) -> None:
+        self.until = until  # wall-clock deadline, comparable across workers
+        self.wrote = False
+
+
+_request_pin: ContextVar[RequestPin | None] = ContextVar("request_pin", default=None)
+
+
+def set_db_reader(key: str) -> None:
+    """
+    Identify who the current request reads for (set by auth once the token is decoded).
+    """
+    _db_reader.set(key)
+
+
+def is_pinned_to_primary() -> bool:
+    """
+    True if the current reader has written within READ_YOUR_WRITES_SECONDS,
+    on this worker or (PRIMARY_PIN_COOKIE) on any other.
+    """
+    pin = _request_pin.get()
+    if pin is not None and pin.until > time.time():
+        return True
+    key = _db_reader.get()
+    return key is not None and _pinned_until.get(key, 0.0) > time.monotonic()
+
+
+def _pin_to_primary(key: str) -> None:
+    now = time.monotonic()
+    if len(_pinned_until) > 10_000:
+        for stale in [k for k, deadline in _pinned_until.items() if deadline <= now]:
+            del _pinned_until[stale]
+    _pinned_until[key] = now + settings.READ_YOUR_WRITES_SECONDS
+
+
+class PrimarySession(Session):
+    """
+    Session bound to the primary. Commits pin the current reader to the primary for a while.
+    """
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _after_primary_commit(session: Session) -> None:
+    key = _db_reader.get()
+    if key is not None:
+        _pin_to_primary(key)
+    pin = _request_pin.get()
+    if pin is not None:
+        pin.wrote = True
+
+
+class ReadYourWritesMiddleware:
+    """
+    Carries the read-your-writes pin across workers: a request that committed on the primary gets a
+    short-lived cookie with the pin deadline, and any worker sends that client's reads to the primary until then.
+    The cookie is not signed: a client can only pin itself, and never for longer than READ_YOUR_WRITES_SECONDS
+    past the current request. Clients without cookies (API keys) keep the per-worker pin only.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        pin = RequestPin(_client_pin(scope))
+        token = _request_pin.set(pin)
+
+        async def send_with_pin(message: Message) -> None:
+            if message["type"] == "http.response.start" and pin.wrote:
+                ttl = settings.READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{PRIMARY_PIN_COOKIE}={time.time() + ttl:.3f}; Max-Age={math.ceil(ttl)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            _request_pin.reset(token)
+
+
+def _client_pin(scope: Scope) -> float:
+    """
+    Pin deadline from the request cookie, capped at READ_YOUR_WRITES_SECONDS from now. 0.0 if absent or invalid.
+    """
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            raw = cookie_parser(value.decode("latin-1")).get(PRIMARY_PIN_COOKIE)
+            if raw is None:
+                continue
+            try:
+                until = float(raw)
+            except ValueError:
+                return 0.0
+            return min(until, time.time() + settings.READ_YOUR_WRITES_SECONDS)
+    return 0.0
+
+
+class ReadSession(Session):
+    """
+    Session for read-only queries: uses the replica unless the reader is pinned to the primary.
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        if read_engine is None or is_pinned_to_primary():
+            return async_engine.sync_engine
+        return read_engine.sync_engine
+
+
 async_session_factory = async_sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
+    sync_session_class=PrimarySession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
+async_read_session_factory = async_sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=ReadSession,
     expire_on_commit=False,
     autoflush=False,
 )
@@ -66,6 +296,64 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_read_db(
+    db: Annotated[AsyncSession, Depends(get_db)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read-only queries.
+    Without DATABASE_READ_URL this is the request's primary session (no extra connection).
+    """
+    if read_engine is None:
+        yield db
+        return
+
+    async with async_read_session_factory() as session:
+        yield session
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open `connections` pool connections up front, so the first requests after deploy
+    do not pay for TCP/TLS/auth handshakes.
+    """
+
+    async def _touch() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(_touch() for _ in range(connections)))
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"Database | action=pool_warmup status=success connections={connections} ms={elapsed:.1f}")
+    except Exception as exc:
+        logger.warning(f"Database | action=pool_warmup status=failed error={exc}")
+
+
+def _pool_status(engine: AsyncEngine) -> dict[str, Any]:
+    pool = engine.sync_engine.pool
+    stats = getattr(pool, "stats", None) or PoolStats()
+    avg_wait = stats.wait_total / stats.checkouts if stats.checkouts else 0.0
+    return {
+        "size": pool.size(),  # type: ignore[attr-defined]
+        "checked_out": pool.checkedout(),  # type: ignore[attr-defined]
+        "overflow": pool.overflow(),  # type: ignore[attr-defined]
+        "checkouts": stats.checkouts,
+        "checkout_wait_avg_ms": round(avg_wait * 1000, 3),
+        "checkout_wait_max_ms": round(stats.wait_max * 1000, 3),
+    }
+
+
+def get_pool_status() -> dict[str, Any]:
+    """
+    Usage and checkout wait times of the primary pool, and of the replica pool if there is one.
+    """
+    status: dict[str, Any] = {"profile": settings.DB_PROFILE, "primary": _pool_status(async_engine)}
+    if read_engine is not None:
+        status["replica"] = _pool_status(read_engine)
+    return status
+
+
 async def create_db_tables() -> None:
     """
     Create all tables defined in SQLAlchemy models.
@@ -82,8 +370,6 @@ async def run_alembic_migrations() -> None:
     """
     Run Alembic migrations programmatically using Alembic API.
     """
-    import asyncio
-
     from alembic import command
     from alembic.config import Config
 
@@ -113,4 +399,17 @@ async def run_alembic_migrations() -> None:
     await asyncio.to_thread(_run_sync_migrations)
 
 # Explicitly export Base for mypy
-__all__ = ["Base", "get_db", "create_db_tables", "run_alembic_migrations", "async_engine"]
+__all__ = [
+    "Base",
+    "get_db",
+    "get_read_db",
+    "get_pool_status",
+    "warm_up_pool",
+    "set_db_reader",
+    "ReadYourWritesMiddleware",
+    "create_db_tables",
+    "run_alembic_migrations",
+    "async_engine",
+    "read_engine",
+    "listen_engine",
+]
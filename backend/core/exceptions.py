@@ -1,7 +1,8 @@
 from typing import Any
 
 from fastapi import HTTPException, Request, status
-from fastapi.responses import JSONResponse
+
+from .responses import FastJSONResponse
 
 
 class BaseAPIException(HTTPException):
@@ -15,8 +16,9 @@ class BaseAPIException(HTTPException):
         detail: Any = None,
         error_code: str | None = None,
         extra: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
     ):
-        super().__init__(status_code=status_code, detail=detail)
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
         self.error_code = error_code
         self.extra = extra or {}
 
@@ -68,12 +70,23 @@ class AuthException(BaseAPIException):
         )
 
 
-async def api_exception_handler(_: Request, exc: BaseAPIException) -> JSONResponse:
+class TooManyRequestsException(BaseAPIException):
+    def __init__(self, retry_after: int, detail: str = "Too many requests"):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            error_code="rate_limited",
+            extra={"retry_after": retry_after},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def api_exception_handler(_: Request, exc: BaseAPIException) -> FastJSONResponse:
     """
     Handler for custom BaseAPIException.
     Returns structured JSON error response.
     """
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={
             "error": {
@@ -82,4 +95,5 @@ async def api_exception_handler(_: Request, exc: BaseAPIException) -> JSONRespon
                 **exc.extra,
             }
         },
+        headers=exc.headers,
     )
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from anyio import to_thread
+from loguru import logger
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.core.config import settings
+from backend.core.database import get_pool_status
+
+# Multi-process mode (several uvicorn/gunicorn workers): every worker writes its samples to
+# PROMETHEUS_MULTIPROC_DIR and /metrics aggregates them. The directory must be emptied before start.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "pinlite_http_request_duration_seconds",
+    "HTTP request latency by route template and status.",
+    ["method", "route", "status"],
+)
+
+UPLOAD_STAGE_SECONDS = Histogram(
+    "pinlite_upload_stage_duration_seconds",
+    "Time spent in each upload_image stage.",
+    ["stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# Dedup hit ratio: rate(..{result="hit"}) / rate(..)
+UPLOADS_TOTAL = Counter("pinlite_uploads_total", "Stored uploads by deduplication result.", ["result"])
+
+GC_FILES_TOTAL = Counter("pinlite_gc_files_total", "Files handled by the CAS garbage collector.", ["phase"])
+GC_SWEEPS_TOTAL = Counter("pinlite_gc_sweeps_total", "Garbage collector runs.", ["result"])
+
+# Sampled by run_metrics_sampler; livesum adds up the live workers
+DB_POOL_CONNECTIONS = Gauge(
+    "pinlite_db_pool_connections",
+    "Primary pool connections (checked_out, overflow).",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+THREADPOOL_QUEUE_DEPTH = Gauge(
+    "pinlite_threadpool_queue_depth",
+    "Jobs waiting for a thread, per pool.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+
+class MetricsMiddleware:
+    """
+    Records HTTP_REQUEST_SECONDS for every request (pure ASGI: no response buffering).
+    Routes are labelled by their template (/api/v1/media/{image_id}), never by the raw path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route_template(scope), str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Full path template of the matched route, "unmatched" for 404s.
+    Routes of included routers only know their own path; FastAPI keeps the prefixed one in its route context.
+    """
+    route = scope.get("fastapi", {}).get("effective_route_context") or scope.get("route")
+    return getattr(route, "path_format", None) or "unmatched"
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Exposition for /metrics: this process, or all workers in multi-process mode.
+
+    Returns:
+        tuple[bytes, str]: (body, content type)
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def sample_runtime_metrics(pools: dict[str, Executor]) -> None:
+    """
+    Update the pool gauges. Must run on the event loop (reads the anyio limiter).
+    """
+    primary = get_pool_status()["primary"]
+    DB_POOL_CONNECTIONS.labels("checked_out").set(primary["checked_out"])
+    DB_POOL_CONNECTIONS.labels("overflow").set(max(primary["overflow"], 0))
+
+    # Shared threadpool behind run_in_threadpool / sync endpoints
+    THREADPOOL_QUEUE_DEPTH.labels("default").set(to_thread.current_default_thread_limiter().statistics().tasks_waiting)
+    for name, pool in pools.items():
+        if isinstance(pool, ThreadPoolExecutor):
+            THREADPOOL_QUEUE_DEPTH.labels(name).set(pool._work_queue.qsize())
+
+
+async def run_metrics_sampler(pools: dict[str, Executor]) -> None:
+    """
+    Background loop started from the app lifespan. Runs until cancelled.
+    Gauges are sampled on an interval rather than at scrape time, so they also work in multi-process mode.
+    """
+    logger.info(f"MetricsSampler | action=start interval={settings.METRICS_SAMPLE_INTERVAL_SECONDS}s")
+
+    while True:
+        try:
+            sample_runtime_metrics(pools)
+        except Exception as e:
+            logger.error(f"MetricsSampler | action=sample_failed error={e}", exc_info=True)
+
+        await asyncio.sleep(settings.METRICS_SAMPLE_INTERVAL_SECONDS)
+
+
+def mark_process_dead() -> None:
+    """
+    Drop this worker's live gauges from the multi-process aggregate on shutdown.
+    """
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
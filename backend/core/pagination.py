@@ -0,0 +1,27 @@
+import base64
+import binascii
+from datetime import datetime
+from uuid import UUID
+
+from .exceptions import ValidationException
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    """
+    Encode a keyset position (created_at, id) into an opaque URL-safe cursor.
+    """
+    raw = f"{created_at.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValidationException if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at_raw, item_id_raw = raw.split("|", 1)
+        return datetime.fromisoformat(created_at_raw), UUID(item_id_raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValidationException(detail="Invalid cursor") from exc
@@ -0,0 +1,109 @@
+import re
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.core.config import settings
+from backend.core.metrics import route_template
+
+_PARAMS = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_PARAM_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Statement with parameters and IN-lists collapsed: the same query in a loop has one shape.
+    """
+    shape = _PARAMS.sub("?", " ".join(statement.split()))
+    return _PARAM_LISTS.sub("?, ...", shape)
+
+
+class QueryLog:
+    """
+    SQL statements executed within a scope (request, test block).
+    """
+
+    __slots__ = ("statements",)
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        Shapes executed more than `threshold` times (N+1 candidates), most frequent first.
+        """
+        shapes = Counter(statement_shape(statement) for statement in self.statements)
+        return [(shape, n) for shape, n in shapes.most_common() if n > threshold]
+
+    def report(self) -> str:
+        return "\n".join(f"{i}. {' '.join(statement.split())}" for i, statement in enumerate(self.statements, 1))
+
+
+# Stack of active logs: a test block and the request it drives both see the queries
+_active_logs: ContextVar[tuple[QueryLog, ...]] = ContextVar("query_logs", default=())
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryLog]:
+    """
+    Record every statement executed in this context (including awaited requests) into a new QueryLog.
+    Needs instrument_query_log().
+    """
+    log = QueryLog()
+    token = _active_logs.set((*_active_logs.get(), log))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+# Signature of the assert_max_queries test fixture: `with assert_max_queries(2): ...`
+QueryBudget = Callable[[int], AbstractContextManager[QueryLog]]
+
+
+def _record_statement(_conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+    for log in _active_logs.get():
+        log.statements.append(statement)
+
+
+def instrument_query_log() -> None:
+    """
+    Feed statements of every engine into the active logs. Idempotent.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _record_statement):
+        event.listen(Engine, "before_cursor_execute", _record_statement)
+
+
+class QueryLogMiddleware:
+    """
+    Debug mode only: warns when one request runs the same statement shape
+    more than QUERY_REPEAT_WARN_THRESHOLD times (N+1 in a loop).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as log:
+            await self.app(scope, receive, send)
+
+        for shape, n in log.repeated(settings.QUERY_REPEAT_WARN_THRESHOLD):
+            logger.warning(
+                f"QueryLog | action=repeated_statement method={scope['method']} route={route_template(scope)} "
+                f"times={n} total_queries={log.count} statement={shape[:300]}"
+            )
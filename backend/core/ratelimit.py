@@ -0,0 +1,114 @@
+import time
+from dataclasses import dataclass
+
+from .cache import TTLCache
+
+
+@dataclass
+class _KeyState:
+    tokens: float
+    updated_at: float
+    failures: int = 0
+    blocked_until: float = 0.0
+
+
+class LoginThrottle:
+    """
+    In-process login limiter, checked before any DB lookup or password hashing.
+
+    - Token bucket per account (email) and per client IP: every attempt takes a token.
+    - Progressive backoff per account: after `backoff_after` failures in a row,
+      each further failure locks the account for 1, 2, 4, ... seconds (up to backoff_max).
+
+    State is per worker and bounded (LRU, idle keys expire after an hour).
+    """
+
+    STATE_TTL_SECONDS = 60 * 60
+    MAX_BACKOFF_EXPONENT = 32
+
+    def __init__(
+        self,
+        account_burst: int,
+        account_per_minute: float,
+        ip_burst: int,
+        ip_per_minute: float,
+        backoff_after: int,
+        backoff_max: float,
+        max_keys: int = 100_000,
+    ):
+        self.account_burst = account_burst
+        self.account_rate = account_per_minute / 60
+        self.ip_burst = ip_burst
+        self.ip_rate = ip_per_minute / 60
+        self.backoff_after = backoff_after
+        self.backoff_max = backoff_max
+        self._state: TTLCache[str, _KeyState] = TTLCache(maxsize=max_keys, ttl=self.STATE_TTL_SECONDS)
+
+    def acquire(self, account: str, ip: str | None) -> float:
+        """
+        Take a token from the account and IP buckets.
+
+        Returns:
+            float: 0 if the attempt may proceed, otherwise seconds until it may be retried.
+        """
+        now = time.monotonic()
+        buckets = [(self._account_key(account), self.account_burst, self.account_rate)]
+        if ip:
+            buckets.append((f"ip:{ip}", self.ip_burst, self.ip_rate))
+
+        states = []
+        retry_after = 0.0
+        for key, burst, rate in buckets:
+            state = self._refill(key, burst, rate, now)
+            states.append((key, state))
+
+            if state.blocked_until > now:
+                retry_after = max(retry_after, state.blocked_until - now)
+            elif state.tokens < 1:
+                retry_after = max(retry_after, (1 - state.tokens) / rate)
+
+        # Nothing is consumed on rejection: blocked traffic doesn't extend its own ban
+        for key, state in states:
+            if not retry_after:
+                state.tokens -= 1
+            self._state.set(key, state)
+
+        return retry_after
+
+    def record_failure(self, account: str) -> None:
+        """
+        Count a failed login and extend the account backoff once the free failures are used up.
+        """
+        key = self._account_key(account)
+        now = time.monotonic()
+        state = self._refill(key, self.account_burst, self.account_rate, now)
+        state.failures += 1
+
+        excess = state.failures - self.backoff_after
+        if excess > 0:
+            # Exponent capped: the failure count is unbounded, 2.0 ** 1024 overflows
+            state.blocked_until = now + min(2.0 ** min(excess - 1, self.MAX_BACKOFF_EXPONENT), self.backoff_max)
+        self._state.set(key, state)
+
+    def record_success(self, account: str) -> None:
+        """
+        Reset the account backoff after a successful login.
+        """
+        key = self._account_key(account)
+        state = self._state.get(key)
+        if state is not None:
+            state.failures = 0
+            state.blocked_until = 0.0
+
+    def _refill(self, key: str, burst: int, rate: float, now: float) -> _KeyState:
+        state = self._state.get(key)
+        if state is None:
+            return _KeyState(tokens=float(burst), updated_at=now)
+
+        state.tokens = min(float(burst), state.tokens + (now - state.updated_at) * rate)
+        state.updated_at = now
+        return state
+
+    @staticmethod
+    def _account_key(account: str) -> str:
+        return f"account:{account.strip().lower()}"
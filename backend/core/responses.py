@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _adapter(tp: Any) -> TypeAdapter[Any]:
+    """
+    One TypeAdapter per schema type (building them is expensive).
+    """
+    return TypeAdapter(tp)
+
+
+def _default(value: Any) -> Any:
+    """
+    orjson fallback for schemas nested in plain containers: each one is dumped by its own type.
+    """
+    if isinstance(value, BaseModel):
+        return _adapter(type(value)).dump_python(value, mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    App-wide JSON response class (default_response_class).
+
+    Routes return data, not responses: FastAPI validates it against the declared response_model
+    and serializes it with that type's TypeAdapter (fields outside the declared type are dropped),
+    then this class renders the result with orjson instead of json.dumps.
+    Built directly (exception handlers), a Pydantic schema is dumped by pydantic-core,
+    and schemas inside lists or dicts go through _default one by one (empty and mixed lists are fine).
+
+    The output is compact UTF-8 JSON like Starlette's, but not guaranteed to be byte-identical:
+    orjson spells some floats differently (1e16, not 1e+16) and writes NaN/Infinity as null where json.dumps raises.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return _adapter(type(content)).dump_json(content)
+
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -1,16 +1,38 @@
+import hashlib
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from jose import jwt
 from loguru import logger
 from passlib.context import CryptContext
+from passlib.hash import argon2
 
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
 
+def _build_pwd_context() -> CryptContext:
+    """
+    Password context for the configured scheme.
+    The first scheme hashes new passwords; the others are only verified and marked for rehash.
+    """
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme == "argon2" and not argon2.has_backend():
+        logger.warning("Security | action=argon2_unavailable fallback=bcrypt hint='pip install argon2-cffi'")
+        scheme = "bcrypt"
+
+    return CryptContext(
+        schemes=[scheme, *(other for other in ("argon2", "bcrypt") if other != scheme)],
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        argon2__type="ID",
+    )
+
+
+pwd_context = _build_pwd_context()
+
+
 def create_access_token(subject: str | Any, expires_delta: timedelta | None = None) -> str:
     """
     Creates a JWT access token.
@@ -44,8 +66,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verifies a password and rehashes it if the stored hash is outdated (legacy scheme or cost).
+
+    Returns:
+        tuple[bool, str | None]: (valid, new_hash) — new_hash is None when no upgrade is needed.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """
-    Hashes a password using bcrypt.
+    Hashes a password using the configured scheme (PASSWORD_HASH_SCHEME).
     """
     return pwd_context.hash(password)
+
+
+def hash_token(token: str) -> str:
+    """
+    SHA-256 digest of an opaque token (refresh tokens are stored only as digests).
+    Tokens carry 256 bits of entropy, so a fast unsalted hash is enough.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
@@ -0,0 +1,37 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapses concurrent calls with the same key into one execution (in-process).
+    Callers arriving while a call is in flight share its result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[T]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        Run fn once per key at a time.
+
+        Returns:
+            tuple[T, bool]: (result, shared) — shared is True for callers that joined an in-flight call.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            return await asyncio.shield(call), True
+
+        call = asyncio.ensure_future(fn())
+        self._calls[key] = call
+        call.add_done_callback(lambda _: self._forget(key, call))
+
+        # Shield: if the leader is cancelled, followers still get the result
+        return await asyncio.shield(call), False
+
+    def _forget(self, key: str, call: asyncio.Future[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,143 @@
+import time
+from contextvars import ContextVar
+from types import TracebackType
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.core.metrics import route_template
+
+# Server-Timing metric name for queries; spans use their own names ("auth", "imaging", ...)
+DB_SPAN = "db"
+
+
+class RequestTiming:
+    """
+    Time spent per span name (and number of spans) within one request.
+    """
+
+    __slots__ = ("spans",)
+
+    def __init__(self) -> None:
+        self.spans: dict[str, list[float]] = {}  # name -> [seconds, count]
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self, total: float) -> str:
+        """
+        Server-Timing header value: db;dur=3.1;desc="4 queries", auth;dur=0.2, total;dur=12.5
+        """
+        parts = []
+        for name, (seconds, count) in self.spans.items():
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if name == DB_SPAN:
+                part += f';desc="{int(count)} queries"'
+            parts.append(part)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_timing: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+class Span:
+    """
+    Adds the time spent in a `with` block to the current request's timing.
+    Outside a timed request (middleware disabled, background tasks) it only costs a ContextVar lookup.
+    """
+
+    __slots__ = ("name", "timing", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.timing = _timing.get()
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        if self.timing is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        if self.timing is not None:
+            self.timing.add(self.name, time.perf_counter() - self.start)
+
+
+def span(name: str) -> Span:
+    """
+    Usage: `with span("imaging"): ...`
+    """
+    return Span(name)
+
+
+def _before_cursor_execute(conn: Any, *_args: Any) -> None:
+    if _timing.get() is not None:
+        conn.info.setdefault("timing_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, *_args: Any) -> None:
+    timing = _timing.get()
+    starts = conn.info.get("timing_query_start")
+    if timing is not None and starts:
+        timing.add(DB_SPAN, time.perf_counter() - starts.pop())
+
+
+def instrument_queries() -> None:
+    """
+    Time every query of every engine (primary, replica) into the "db" span. Idempotent.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ServerTimingMiddleware:
+    """
+    Collects spans for each request, sends them as a Server-Timing header
+    and writes one log line per request with the same breakdown.
+    Spans finished after the response headers went out (streamed bodies) only reach the log line.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _timing.set(timing)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timing.server_timing(time.perf_counter() - start).encode("latin-1")
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timing.reset(token)
+            spans = " ".join(
+                f"{name}_ms={seconds * 1000:.1f}" + (f" db_queries={int(count)}" if name == DB_SPAN else "")
+                for name, (seconds, count) in timing.spans.items()
+            )
+            logger.info(
+                f"RequestTiming | method={scope['method']} route={route_template(scope)} status={status} "
+                f"total_ms={(time.perf_counter() - start) * 1000:.1f} {spans}".rstrip()
+            )
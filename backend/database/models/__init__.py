@@ -1,12 +1,15 @@
 from .base import Base
-from .media import File, Image
-from .users import RefreshToken, SocialAccount, User
+from .media import File, Image, ImageTag, Tag
+from .users import ApiKey, RefreshToken, SocialAccount, User
 
 __all__ = [
     "Base",
     "User",
     "SocialAccount",
     "RefreshToken",
+    "ApiKey",
     "File",
     "Image",
+    "Tag",
+    "ImageTag",
 ]
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Connection, DateTime, ForeignKey, Index, Integer, Row, String, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -21,6 +21,11 @@ class File(Base):
 
     __tablename__ = "files"
 
+    # GC candidates only (partial index keeps it tiny)
+    __table_args__ = (
+        Index("ix_files_orphaned_at", "orphaned_at", postgresql_where=text("orphaned_at IS NOT NULL")),
+    )
+
     # SHA-256 hash as Primary Key
     hash: Mapped[str] = mapped_column(String(64), primary_key=True)
 
@@ -30,8 +35,10 @@ class File(Base):
     # Relative path in storage (e.g., "a1/b2/a1b2c3d4...")
     path: Mapped[str] = mapped_column(String, nullable=False)
 
-    # Reference counting for Garbage Collection
-    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Set when no image references the file (there is no ref counter): by the images_mark_orphaned_files
+    # trigger when the last image goes, and on insert until the first image is registered.
+    # The sweeper collects it after a grace period.
+    orphaned_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
@@ -39,7 +46,7 @@ class File(Base):
     images: Mapped[list["Image"]] = relationship("Image", back_populates="file")
 
     def __repr__(self) -> str:
-        return f"<File(hash={self.hash[:8]}..., mime={self.mime_type}, refs={self.ref_count})>"
+        return f"<File(hash={self.hash[:8]}..., mime={self.mime_type})>"
 
 
 class Image(Base):
@@ -51,6 +58,16 @@ class Image(Base):
 
     __tablename__ = "images"
 
+    # Trigram index for substring search over filename (ILIKE '%q%')
+    __table_args__ = (
+        Index(
+            "ix_images_filename_trgm",
+            "filename",
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+        ),
+    )
+
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
 
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -68,3 +85,88 @@ class Image(Base):
 
     def __repr__(self) -> str:
         return f"<Image(id={self.id}, filename={self.filename})>"
+
+
+class Tag(Base):
+    """
+    Tag vocabulary (shared by all users, names are normalized lowercase).
+    image_count is maintained incrementally on attach/detach/delete,
+    so facet counts never have to scan image_tags.
+    """
+
+    __tablename__ = "tags"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
+
+    # Number of images carrying this tag (facet count)
+    image_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<Tag(name={self.name}, images={self.image_count})>"
+
+
+class ImageTag(Base):
+    """
+    Image <-> Tag link (inverted index).
+    PK (image_id, tag_id) serves "tags of an image",
+    ix_image_tags_tag_id_image_id serves "images with a tag" (AND/OR filtering).
+    """
+
+    __tablename__ = "image_tags"
+
+    image_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("images.id", ondelete="CASCADE"), primary_key=True)
+    tag_id: Mapped[int] = mapped_column(ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (Index("ix_image_tags_tag_id_image_id", "tag_id", "image_id"),)
+
+    def __repr__(self) -> str:
+        return f"<ImageTag(image_id={self.image_id}, tag_id={self.tag_id})>"
+
+
+# Projection rows returned by MediaRepository (mapped to schemas in the service layer)
+ImageRow = Row[uuid.UUID, str, datetime, str, int, str, datetime]  # id, filename, created_at, file columns
+TagRow = Row[str, int]  # name, image_count
+
+
+@event.listens_for(Image.__table__, "before_create")
+def _create_trgm_extension(target: Any, connection: Connection, **kw: Any) -> None:
+    """
+    gin_trgm_ops comes from the pg_trgm extension (migrations create it too).
+    """
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+# Flags files whose last image was deleted, for every DELETE on images (including user cascades).
+# Files are locked in hash order first, so concurrent deletes of one file's last images serialize,
+# and the UPDATE (a new snapshot) sees the images the other transaction deleted.
+MARK_ORPHANED_FILES_FUNCTION = """
+CREATE OR REPLACE FUNCTION mark_orphaned_files() RETURNS trigger AS $$
+BEGIN
+    PERFORM 1 FROM files WHERE hash IN (SELECT file_hash FROM deleted_images) ORDER BY hash FOR NO KEY UPDATE;
+    UPDATE files SET orphaned_at = now()
+    WHERE hash IN (SELECT file_hash FROM deleted_images)
+      AND orphaned_at IS NULL
+      AND NOT EXISTS (SELECT 1 FROM images WHERE images.file_hash = files.hash);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+MARK_ORPHANED_FILES_TRIGGER = """
+CREATE TRIGGER images_mark_orphaned_files
+AFTER DELETE ON images
+REFERENCING OLD TABLE AS deleted_images
+FOR EACH STATEMENT EXECUTE FUNCTION mark_orphaned_files()
+"""
+
+
+@event.listens_for(Image.__table__, "after_create")
+def _create_mark_orphaned_files_trigger(target: Any, connection: Connection, **kw: Any) -> None:
+    """
+    Same trigger as the migration, for schemas built with create_all (tests).
+    """
+    connection.execute(text(MARK_ORPHANED_FILES_FUNCTION))
+    connection.execute(text(MARK_ORPHANED_FILES_TRIGGER))
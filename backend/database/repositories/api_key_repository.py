@@ -0,0 +1,57 @@
+import uuid
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.apps.users.schemas.api_key import ApiKeyPrincipal
+from backend.database.models import ApiKey, User
+
+
+class ApiKeyRepository:
+    """
+    SQLAlchemy implementation of IApiKeyRepository.
+    Reads happen only when the in-memory key index is (re)loaded, never per request.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def list_active(self) -> dict[str, ApiKeyPrincipal]:
+        """
+        Active keys of active owners, keyed by digest.
+        """
+        stmt = (
+            select(ApiKey.key_hash, ApiKey.id, ApiKey.name, ApiKey.user_id, ApiKey.scopes)
+            .join(User, User.id == ApiKey.user_id)
+            .where(ApiKey.is_active.is_(True), User.is_active.is_(True))
+        )
+        result = await self.session.execute(stmt)
+        return {
+            row.key_hash: ApiKeyPrincipal(id=row.user_id, key_id=row.id, name=row.name, scopes=frozenset(row.scopes))
+            for row in result
+        }
+
+    async def create(self, name: str, key_hash: str, user_id: uuid.UUID, scopes: list[str]) -> None:
+        """
+        Insert a new key (digest only).
+        """
+        stmt = insert(ApiKey).values(
+            id=uuid.uuid4(), name=name, key_hash=key_hash, user_id=user_id, scopes=scopes, is_active=True
+        )
+        await self.session.execute(stmt)
+
+    async def deactivate(self, name: str) -> bool:
+        """
+        Mark a key inactive; it stays in the table for auditing.
+        """
+        stmt = (
+            update(ApiKey)
+            .where(ApiKey.name == name, ApiKey.is_active.is_(True))
+            .values(is_active=False)
+            .returning(ApiKey.id)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def commit(self) -> None:
+        await self.session.commit()
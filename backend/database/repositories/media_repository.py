@@ -1,19 +1,98 @@
-from uuid import UUID
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from datetime import datetime
+from uuid import UUID, uuid4
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Select,
+    cast,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, BIT
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from backend.database.models import File, Image
+from backend.database.models import File, Image, ImageTag, Tag
+from backend.database.models.media import ImageRow, TagRow
+
+# Column projection for image listings: one JOIN, no ORM identity map, no selectinload.
+# Select is generative, so every query builds on this without mutating it.
+# Labels are the ImageRow contract (see IMediaRepository).
+_IMAGE_READ_SELECT = select(
+    Image.id,
+    Image.filename,
+    Image.created_at,
+    File.hash,
+    File.size_bytes,
+    File.mime_type,
+    File.created_at.label("file_created_at"),
+).join(File, Image.file_hash == File.hash)
+
+# Same key as _hash_lock_key, computed in SQL: first 8 bytes of the hash as a signed bigint
+_HASH_LOCK_KEY_SQL = cast(cast(func.concat("x", func.substr(File.hash, 1, 16)), BIT(64)), BigInteger)
+
+
+def _hash_lock_key(file_hash: str) -> int:
+    """
+    Advisory lock key for a file hash.
+    """
+    return int.from_bytes(bytes.fromhex(file_hash[:16]), "big", signed=True)
+
+
+# Class key of the GC advisory lock (two-int form: its own keyspace, apart from the hash locks)
+_GC_LOCK_CLASS = 0x6763
+
+# GC reference check: served by the index on images.file_hash
+_IS_REFERENCED = exists().where(Image.file_hash == File.hash)
+
+
+def _escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards so user input is matched literally.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _tag_filter(tags: list[str], match_all: bool) -> ColumnElement[bool]:
+    """
+    Restrict images by tag names via the image_tags inverted index.
+    match_all=True -> image has every tag (AND), otherwise any of them (OR).
+    """
+    tagged = select(ImageTag.image_id).join(Tag, Tag.id == ImageTag.tag_id).where(Tag.name.in_(tags))
+    if match_all:
+        tagged = tagged.group_by(ImageTag.image_id).having(func.count() == len(tags))
+    return Image.id.in_(tagged)
 
 
 class MediaRepository:
     """
     SQLAlchemy implementation of IMediaRepository (Protocol).
+    Read-only listing queries go to read_session (replica), everything else to session (primary).
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, read_session: AsyncSession | None = None):
         self.session = session
+        self.read_session = read_session or session
+
+    @asynccontextmanager
+    async def detached(self) -> AsyncIterator["MediaRepository"]:
+        """
+        A repository on a session of its own (own connection and transaction), not tied to the request:
+        work shared by several requests must outlive the one that started it. Rolled back unless committed.
+        """
+        async with AsyncSession(bind=self.session.bind, expire_on_commit=False, autoflush=False) as session:
+            yield MediaRepository(session=session)
 
     # --- File Operations (CAS) ---
 
@@ -25,59 +104,172 @@ class MediaRepository:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def create_file(self, file_hash: str, size_bytes: int, mime_type: str, path: str) -> File:
+    async def lock_file_hash(self, file_hash: str) -> None:
         """
-        Register a new physical file in the database.
-        Initial ref_count is 0 (will be incremented when Image is created).
+        Take a transaction-scoped advisory lock on the hash (released on commit/rollback).
+        Serializes storing the same new file across workers.
         """
-        file = File(
-            hash=file_hash,
-            size_bytes=size_bytes,
-            mime_type=mime_type,
-            path=path,
-            ref_count=0,
-        )
-        self.session.add(file)
-        await self.session.flush()
-        return file
+        await self.session.execute(select(func.pg_advisory_xact_lock(_hash_lock_key(file_hash))))
 
-    async def delete_file(self, file_hash: str) -> None:
+    async def save_file(self, file_hash: str, size_bytes: int, mime_type: str, path: str) -> None:
         """
-        Delete physical file record (used by GC).
+        Upsert the files record of a stored blob, flagged orphaned until register_image links the first image:
+        if the upload fails after the blob is stored, the sweeper collects it.
         """
-        stmt = delete(File).where(File.hash == file_hash)
+        stmt = pg_insert(File).values(
+            hash=file_hash, size_bytes=size_bytes, mime_type=mime_type, path=path, orphaned_at=func.now()
+        )
+        stmt = stmt.on_conflict_do_update(index_elements=[File.hash], set_={"orphaned_at": stmt.excluded.orphaned_at})
         await self.session.execute(stmt)
 
-    async def get_usage_count(self, file_hash: str) -> int:
+    async def try_lock_gc(self) -> bool:
+        """
+        Try to take the GC advisory lock for the current transaction (one sweeper across workers).
+        Two-key form, so it never collides with the per-hash locks.
+        """
+        result = await self.session.execute(select(func.pg_try_advisory_xact_lock(_GC_LOCK_CLASS, 0)))
+        return bool(result.scalar_one())
+
+    async def unmark_referenced_files(self, limit: int) -> int:
         """
-        Get current reference count from the file record.
+        GC mark phase, one batch: clear orphaned_at on flagged files that got referenced again
+        (an image linked while the last other one was being deleted). Scans the flagged files only
+        (ix_files_orphaned_at); files are flagged by the images_mark_orphaned_files trigger.
+        Returns the number of cleared files.
         """
-        stmt = select(File.ref_count).where(File.hash == file_hash)
+        candidates = (
+            select(File.hash)
+            .where(File.orphaned_at.is_not(None), _IS_REFERENCED)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(File)
+            .where(File.hash.in_(candidates.scalar_subquery()))
+            .values(orphaned_at=None)
+            .returning(File.hash)
+        )
         result = await self.session.execute(stmt)
-        return result.scalar() or 0
+        return len(result.all())
 
-    # --- Image Operations (User Assets) ---
+    async def delete_orphaned_files(self, older_than: datetime, limit: int) -> list[tuple[str, str]]:
+        """
+        Sweep one batch of files marked orphaned before `older_than` and still unreferenced (used by GC).
+        Skips hashes an upload currently holds the advisory lock for.
+        Returns (hash, mime_type) of the deleted records so blobs can be removed without probing.
+        """
+        candidates = (
+            select(File.hash)
+            .where(
+                File.orphaned_at < older_than,
+                ~_IS_REFERENCED,
+                func.pg_try_advisory_xact_lock(_HASH_LOCK_KEY_SQL),
+            )
+            .order_by(File.orphaned_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            delete(File)
+            .where(File.hash.in_(candidates.scalar_subquery()), ~_IS_REFERENCED)
+            .returning(File.hash, File.mime_type)
+        )
+        result = await self.session.execute(stmt)
+        return [(row.hash, row.mime_type) for row in result]
 
-    async def create_image(self, user_id: UUID, file_hash: str, filename: str) -> Image:
+    async def lock_absent_files(self, hashes: list[str]) -> set[str]:
         """
-        Link a user to a file (create an asset).
-        Increments the file's ref_count.
+        Take the advisory locks on the hashes (until commit) in one statement
+        and return those that have no files record.
+        Used by GC before unlinking blobs of records it has already deleted.
         """
-        # 1. Create Image record
-        image = Image(user_id=user_id, file_hash=file_hash, filename=filename)
-        self.session.add(image)
+        keys = func.unnest(literal(sorted({_hash_lock_key(h) for h in hashes}), ARRAY(BigInteger))).table_valued("key")
+        await self.session.execute(select(func.pg_advisory_xact_lock(keys.c.key)))
 
-        # 2. Increment File ref_count
-        stmt = update(File).where(File.hash == file_hash).values(ref_count=File.ref_count + 1)
-        await self.session.execute(stmt)
+        result = await self.session.execute(select(File.hash).where(File.hash.in_(hashes)))
+        return set(hashes) - set(result.scalars())
 
-        await self.session.flush()
-        await self.session.refresh(image)
+    # --- Image Operations (User Assets) ---
 
-        # Explicitly load the file relationship to avoid lazy loading issues later
-        stmt_load = select(Image).where(Image.id == image.id).options(selectinload(Image.file))
-        result = await self.session.execute(stmt_load)
-        return result.scalar_one()
+    async def register_image(
+        self,
+        user_id: UUID,
+        file_hash: str,
+        filename: str,
+        size_bytes: int,
+        mime_type: str,
+        path: str,
+    ) -> ImageRow:
+        """
+        Register an upload of a new (or orphaned) file in one statement:
+        upsert the File and insert the Image linked to it.
+        Re-uploading an orphaned file within the GC grace period revives it.
+        """
+        file_cte = (
+            pg_insert(File)
+            .values(hash=file_hash, size_bytes=size_bytes, mime_type=mime_type, path=path)
+            .on_conflict_do_update(index_elements=[File.hash], set_={"orphaned_at": None})
+            .returning(File.hash, File.size_bytes, File.mime_type, File.created_at)
+            .cte("f")
+        )
+        image_cte = (
+            insert(Image)
+            .from_select(
+                ["id", "user_id", "file_hash", "filename"],
+                select(literal(uuid4(), Image.id.type)).add_columns(
+                    literal(user_id, Image.user_id.type),
+                    file_cte.c.hash,
+                    literal(filename, Image.filename.type),
+                ),
+            )
+            .returning(Image.id, Image.filename, Image.created_at)
+            .cte("i")
+        )
+        stmt = select(
+            image_cte.c.id,
+            image_cte.c.filename,
+            image_cte.c.created_at,
+            file_cte.c.hash,
+            file_cte.c.size_bytes,
+            file_cte.c.mime_type,
+            file_cte.c.created_at.label("file_created_at"),
+        ).select_from(image_cte.join(file_cte, true()))
+        result = await self.session.execute(stmt)
+        return result.one()
+
+    async def link_image(self, user_id: UUID, file_hash: str, filename: str) -> ImageRow | None:
+        """
+        Register an upload of an already stored file (dedup hit) in one statement.
+        The files row is only read (FK check takes a shared KEY SHARE lock), so uploads
+        of one popular hash never queue on a row lock.
+        Returns None if the file is gone (swept in the meantime).
+        """
+        image_cte = (
+            insert(Image)
+            .from_select(
+                ["id", "user_id", "file_hash", "filename"],
+                select(literal(uuid4(), Image.id.type))
+                .add_columns(
+                    literal(user_id, Image.user_id.type),
+                    File.hash,
+                    literal(filename, Image.filename.type),
+                )
+                .where(File.hash == file_hash),
+            )
+            .returning(Image.id, Image.filename, Image.created_at, Image.file_hash)
+            .cte("i")
+        )
+        stmt = select(
+            image_cte.c.id,
+            image_cte.c.filename,
+            image_cte.c.created_at,
+            File.hash,
+            File.size_bytes,
+            File.mime_type,
+            File.created_at.label("file_created_at"),
+        ).join_from(image_cte, File, File.hash == image_cte.c.file_hash)
+        result = await self.session.execute(stmt)
+        return result.one_or_none()
 
     async def get_image_by_id(self, image_id: UUID) -> Image | None:
         """
@@ -89,53 +281,184 @@ class MediaRepository:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_public_images(self, limit: int, offset: int) -> list[Image]:
+    async def get_public_images(
+        self,
+        limit: int,
+        offset: int,
+        tags: list[str] | None = None,
+        match_all: bool = False,
+    ) -> Sequence[ImageRow]:
         """
-        Get gallery for public feed.
+        Get gallery for public feed, optionally filtered by tags.
         """
-        stmt = (
-            select(Image)
-            .order_by(Image.created_at.desc())
-            .limit(limit)
-            .offset(offset)
-            .options(selectinload(Image.file))  # Eager load File
-        )
-        result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        stmt = _IMAGE_READ_SELECT
+        if tags:
+            stmt = stmt.where(_tag_filter(tags, match_all))
+
+        stmt = stmt.order_by(Image.created_at.desc()).limit(limit).offset(offset)
+        result = await self.read_session.execute(stmt)
+        return result.all()
 
-    async def get_images_by_user(self, user_id: UUID, limit: int, offset: int) -> list[Image]:
+    async def get_images_by_user(
+        self,
+        user_id: UUID,
+        limit: int,
+        offset: int,
+        tags: list[str] | None = None,
+        match_all: bool = False,
+    ) -> Sequence[ImageRow]:
         """
-        Get gallery for a specific user.
+        Get gallery for a specific user, optionally filtered by tags.
         """
-        stmt = (
-            select(Image)
-            .where(Image.user_id == user_id)
-            .order_by(Image.created_at.desc())
-            .limit(limit)
-            .offset(offset)
-            .options(selectinload(Image.file))  # Eager load File
-        )
-        result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        stmt = _IMAGE_READ_SELECT.where(Image.user_id == user_id)
+        if tags:
+            stmt = stmt.where(_tag_filter(tags, match_all))
+
+        stmt = stmt.order_by(Image.created_at.desc()).limit(limit).offset(offset)
+        result = await self.read_session.execute(stmt)
+        return result.all()
+
+    async def search_images(
+        self,
+        query: str,
+        user_id: UUID | None,
+        limit: int,
+        after: tuple[datetime, UUID] | None = None,
+    ) -> Sequence[ImageRow]:
+        """
+        Substring search over filename (served by the ix_images_filename_trgm GIN index).
+        Keyset pagination: returns rows strictly after the given (created_at, id).
+        """
+        stmt = _IMAGE_READ_SELECT.where(Image.filename.ilike(f"%{_escape_like(query)}%", escape="\\"))
+        if user_id is not None:
+            stmt = stmt.where(Image.user_id == user_id)
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(Image.created_at, Image.id) < tuple_(*after, types=[Image.created_at.type, Image.id.type])
+            )
+
+        stmt = stmt.order_by(Image.created_at.desc(), Image.id.desc()).limit(limit)
+        result = await self.read_session.execute(stmt)
+        return result.all()
 
     async def delete_image(self, image_id: UUID) -> None:
         """
         Delete user image (asset).
-        Decrements the file's ref_count.
+        If it was the file's last image, the images_mark_orphaned_files trigger flags the file for the sweeper.
         """
-        # 1. Get file_hash before deleting (to know which file to decrement)
-        stmt_get = select(Image.file_hash).where(Image.id == image_id)
-        result = await self.session.execute(stmt_get)
-        file_hash = result.scalar_one_or_none()
-
-        if file_hash:
-            # 2. Decrement File ref_count
-            stmt_update = update(File).where(File.hash == file_hash).values(ref_count=File.ref_count - 1)
-            await self.session.execute(stmt_update)
+        await self._unlink_tags(select(Image.id).where(Image.id == image_id))
 
-        # 3. Delete Image
         stmt_del = delete(Image).where(Image.id == image_id)
         await self.session.execute(stmt_del)
 
+    async def delete_images(self, user_id: UUID, image_ids: list[UUID]) -> None:
+        """
+        Delete many of the user's images with set-based counter updates.
+        Files left without images are flagged for the sweeper by the images_mark_orphaned_files trigger.
+        """
+        await self._unlink_tags(select(Image.id).where(Image.id.in_(image_ids), Image.user_id == user_id))
+
+        stmt_del = delete(Image).where(Image.id.in_(image_ids), Image.user_id == user_id)
+        await self.session.execute(stmt_del)
+
+    async def _unlink_tags(self, images: Select[UUID]) -> None:
+        """
+        Remove the images' tag links and decrement facet counts by what was actually removed, in one statement.
+        The images are locked FOR UPDATE, so a concurrent attach_tags waits for the delete instead of
+        adding a link the FK cascade would drop without a counter update.
+        """
+        unlinked = (
+            delete(ImageTag)
+            .where(ImageTag.image_id.in_(images.with_for_update().scalar_subquery()))
+            .returning(ImageTag.tag_id)
+            .cte("unlinked")
+        )
+        removed = (
+            select(unlinked.c.tag_id).add_columns(func.count().label("n")).group_by(unlinked.c.tag_id).cte("removed")
+        )
+        stmt = update(Tag).where(Tag.id == removed.c.tag_id).values(image_count=Tag.image_count - removed.c.n)
+        await self.session.execute(stmt)
+
+    async def count_owned_images(self, user_id: UUID, image_ids: list[UUID]) -> int:
+        """
+        Count how many of the given images belong to the user.
+        """
+        stmt = select(func.count()).select_from(Image).where(Image.id.in_(image_ids), Image.user_id == user_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one()
+
+    # --- Tag Operations ---
+
+    async def attach_tags(self, image_ids: list[UUID], tags: list[str]) -> Sequence[TagRow]:
+        """
+        Attach tags to images (creating missing tags).
+        New links and facet counters are written in one statement; existing links are skipped.
+        """
+        # 1. Make sure every tag exists
+        stmt_tags = pg_insert(Tag).values([{"name": name} for name in tags]).on_conflict_do_nothing(
+            index_elements=[Tag.name]
+        )
+        await self.session.execute(stmt_tags)
+
+        # 2. Insert links (images x tags) and bump image_count by the number actually inserted
+        pairs = (
+            select(Image.id, Tag.id)
+            .select_from(Image)
+            .join(Tag, true())
+            .where(Image.id.in_(image_ids), Tag.name.in_(tags))
+        )
+        linked = (
+            pg_insert(ImageTag)
+            .from_select(["image_id", "tag_id"], pairs)
+            .on_conflict_do_nothing()
+            .returning(ImageTag.tag_id)
+            .cte("linked")
+        )
+        added = select(linked.c.tag_id).add_columns(func.count().label("n")).group_by(linked.c.tag_id).cte("added")
+        stmt_count = update(Tag).where(Tag.id == added.c.tag_id).values(image_count=Tag.image_count + added.c.n)
+        await self.session.execute(stmt_count)
+
+        return await self._get_tags(tags)
+
+    async def detach_tags(self, image_ids: list[UUID], tags: list[str]) -> Sequence[TagRow]:
+        """
+        Detach tags from images.
+        Links and facet counters are removed in one statement.
+        """
+        unlinked = (
+            delete(ImageTag)
+            .where(
+                ImageTag.image_id.in_(image_ids),
+                ImageTag.tag_id.in_(select(Tag.id).where(Tag.name.in_(tags))),
+            )
+            .returning(ImageTag.tag_id)
+            .cte("unlinked")
+        )
+        removed = (
+            select(unlinked.c.tag_id).add_columns(func.count().label("n")).group_by(unlinked.c.tag_id).cte("removed")
+        )
+        stmt = update(Tag).where(Tag.id == removed.c.tag_id).values(image_count=Tag.image_count - removed.c.n)
+        await self.session.execute(stmt)
+
+        return await self._get_tags(tags)
+
+    async def get_tag_facets(self, limit: int) -> Sequence[TagRow]:
+        """
+        Most used tags with their image counts (reads counters only, O(tags)).
+        """
+        stmt = (
+            select(Tag.name, Tag.image_count)
+            .where(Tag.image_count > 0)
+            .order_by(Tag.image_count.desc(), Tag.name)
+            .limit(limit)
+        )
+        result = await self.read_session.execute(stmt)
+        return result.all()
+
+    async def _get_tags(self, tags: list[str]) -> Sequence[TagRow]:
+        stmt = select(Tag.name, Tag.image_count).where(Tag.name.in_(tags)).order_by(Tag.name)
+        result = await self.session.execute(stmt)
+        return result.all()
+
     async def commit(self) -> None:
         await self.session.commit()
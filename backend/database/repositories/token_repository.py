@@ -1,43 +1,77 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, literal, select, true
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from backend.database.models import RefreshToken
+from backend.apps.users.schemas.token import TokenRotation
+from backend.database.models import RefreshToken, User
 
 
 class TokenRepository:
     """
     SQLAlchemy implementation of ITokenRepository.
+    Tokens are addressed by their SHA-256 digest (hashed by the service layer).
     """
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create(self, user_id: uuid.UUID, token: str, expires_at: datetime) -> RefreshToken:
+    async def create(self, user_id: uuid.UUID, token_hash: str, expires_at: datetime) -> None:
         """
-        Create a new refresh token.
+        Create a new refresh token (single INSERT, no read-back).
         """
-        db_token = RefreshToken(user_id=user_id, token=token, expires_at=expires_at)
-        self.session.add(db_token)
-        await self.session.flush()
-        await self.session.refresh(db_token)
-        return db_token
+        stmt = insert(RefreshToken).values(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
+        await self.session.execute(stmt)
 
-    async def get_by_token(self, token: str) -> RefreshToken | None:
+    async def rotate(
+        self, token_hash: str, new_token_hash: str, new_expires_at: datetime, now: datetime
+    ) -> TokenRotation | None:
         """
-        Retrieve a refresh token by its value.
+        Consume a refresh token and issue its successor in one statement:
+        DELETE ... USING users RETURNING (expiry, is_active), then INSERT ... SELECT from it
+        only if the token was live and the user active.
+        The DELETE row lock makes concurrent rotations of the same token serialize; only one gets a row.
         """
-        stmt = select(RefreshToken).where(RefreshToken.token == token)
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        old = (
+            delete(RefreshToken)
+            .where(RefreshToken.token_hash == token_hash, User.id == RefreshToken.user_id)
+            .returning(
+                RefreshToken.user_id,
+                (RefreshToken.expires_at < now).label("expired"),
+                User.is_active,
+            )
+            .cte("old")
+        )
+        new = (
+            insert(RefreshToken)
+            .from_select(
+                ["user_id", "token_hash", "expires_at"],
+                select(old.c.user_id)
+                .add_columns(
+                    literal(new_token_hash, RefreshToken.token_hash.type),
+                    literal(new_expires_at, RefreshToken.expires_at.type),
+                )
+                .where(old.c.is_active, ~old.c.expired),
+            )
+            .returning(RefreshToken.user_id)
+            .cte("new")
+        )
+        stmt = select(
+            old.c.user_id,
+            old.c.expired,
+            old.c.is_active,
+            new.c.user_id.is_not(None).label("rotated"),
+        ).select_from(old.outerjoin(new, true()))
 
-    async def delete(self, token: str) -> None:
+        row = (await self.session.execute(stmt)).one_or_none()
+        return TokenRotation.model_validate(row._mapping) if row else None
+
+    async def delete(self, token_hash: str) -> None:
         """
         Delete a specific refresh token.
         """
-        stmt = delete(RefreshToken).where(RefreshToken.token == token)
+        stmt = delete(RefreshToken).where(RefreshToken.token_hash == token_hash)
         await self.session.execute(stmt)
 
     async def delete_all_for_user(self, user_id: uuid.UUID) -> None:
@@ -47,5 +81,21 @@ class TokenRepository:
         stmt = delete(RefreshToken).where(RefreshToken.user_id == user_id)
         await self.session.execute(stmt)
 
+    async def delete_expired(self, now: datetime, limit: int) -> int:
+        """
+        Delete one batch of expired tokens (oldest first) via the expires_at index.
+        Rows locked by a concurrent sweeper in another worker are skipped.
+        """
+        batch = (
+            select(RefreshToken.id)
+            .where(RefreshToken.expires_at < now)
+            .order_by(RefreshToken.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = delete(RefreshToken).where(RefreshToken.id.in_(batch.scalar_subquery())).returning(RefreshToken.id)
+        result = await self.session.execute(stmt)
+        return len(result.all())
+
     async def commit(self) -> None:
         await self.session.commit()
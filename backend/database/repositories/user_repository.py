@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.apps.users.schemas.user import UserCreate
@@ -10,17 +10,21 @@ from backend.database.models import User
 class UserRepository:
     """
     SQLAlchemy implementation of IUserRepository.
+    Lookups by ID (auth, profile) go to read_session (replica), everything else to session (primary).
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, read_session: AsyncSession | None = None):
         self.session = session
+        self.read_session = read_session or session
 
-    async def get_by_id(self, user_id: uuid.UUID) -> User | None:
+    async def get_by_id(self, user_id: uuid.UUID, primary: bool = False) -> User | None:
         """
         Retrieve a user by their unique ID.
+        primary=True skips the replica (rows that get cached must not lag behind an invalidation).
         """
         stmt = select(User).where(User.id == user_id)
-        result = await self.session.execute(stmt)
+        session = self.session if primary else self.read_session
+        result = await session.execute(stmt)
         return result.scalar_one_or_none()
 
     async def get_by_email(self, email: str) -> User | None:
@@ -47,5 +51,12 @@ class UserRepository:
         await self.session.refresh(db_user)
         return db_user
 
+    async def update_password_hash(self, user_id: uuid.UUID, hashed_password: str) -> None:
+        """
+        Replace the stored password hash (rehash on login).
+        """
+        stmt = update(User).where(User.id == user_id).values(hashed_password=hashed_password)
+        await self.session.execute(stmt)
+
     async def commit(self) -> None:
         await self.session.commit()
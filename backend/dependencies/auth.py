@@ -1,33 +1,43 @@
 import uuid
+from collections.abc import Awaitable, Callable
 from typing import Annotated, Any
 
 from fastapi import Depends
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from jose import JWTError, jwt
 from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.apps.users.contracts.token_repository import ITokenRepository
 from backend.apps.users.contracts.user_repository import IUserRepository
+from backend.apps.users.schemas.api_key import ApiKeyPrincipal, ApiKeyScope
+from backend.apps.users.schemas.user import CurrentUser
 from backend.apps.users.services.auth_service import AuthService
 from backend.core.config import settings
-from backend.core.database import get_db
-from backend.core.exceptions import AuthException
+from backend.core.database import get_db, get_read_db, set_db_reader
+from backend.core.exceptions import AuthException, PermissionDeniedException
 from backend.core.security import ALGORITHM
-from backend.database.models import User
+from backend.core.timing import span
 from backend.database.repositories.token_repository import TokenRepository
 from backend.database.repositories.user_repository import UserRepository
+from backend.dependencies.container import AppContainer, get_container
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+api_key_scheme = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+# Whoever a media route acts for: a user (JWT) or a service (API key, acting as its owner)
+Principal = CurrentUser | ApiKeyPrincipal
 
 
 def get_user_repository(
     db: Annotated[AsyncSession, Depends(get_db)],
+    read_db: Annotated[AsyncSession, Depends(get_read_db)],
 ) -> IUserRepository:
     """
     Dependency provider for User Repository.
     """
-    return UserRepository(session=db)
+    return UserRepository(session=db, read_session=read_db)
 
 
 def get_token_repository(
@@ -42,21 +52,34 @@ def get_token_repository(
 def get_auth_service(
     user_repository: Annotated[IUserRepository, Depends(get_user_repository)],
     token_repository: Annotated[ITokenRepository, Depends(get_token_repository)],
+    container: Annotated[AppContainer, Depends(get_container)],
 ) -> AuthService:
     """
     Dependency provider for Auth Service.
     """
-    return AuthService(user_repository=user_repository, token_repository=token_repository)
+    return AuthService(
+        user_repository=user_repository,
+        token_repository=token_repository,
+        hashing_pool=container.hashing_pool,
+        throttle=container.login_throttle,
+    )
 
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    auth_service: Annotated[AuthService, Depends(get_auth_service)],
-) -> User:
+    user_repository: Annotated[IUserRepository, Depends(get_user_repository)],
+    container: Annotated[AppContainer, Depends(get_container)],
+) -> CurrentUser:
     """
     Dependency to get the current authenticated user from the JWT token.
     Validates token signature and expiration.
+    Active users are served from the app-scoped user cache; a miss costs one SELECT.
     """
+    with span("auth"):
+        return await _load_current_user(token, user_repository, container)
+
+
+async def _load_current_user(token: str, user_repository: IUserRepository, container: AppContainer) -> CurrentUser:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
         user_id_raw: Any = payload.get("sub")
@@ -77,9 +100,107 @@ async def get_current_user(
         logger.warning(f"AuthDependency | action=validate_failed reason=jwt_error error={exc}")
         raise AuthException(detail="Could not validate credentials") from exc
 
-    user = await auth_service.user_repository.get_by_id(user_id=user_id)
+    # Read-your-writes: lets replica reads fall back to the primary after this user's writes
+    set_db_reader(user_id_str)
+
+    cached = container.user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # A row that gets cached is read from the primary: a lagging replica would put back
+    # the state a user_changed notification has just evicted, for a whole TTL
+    user = await user_repository.get_by_id(user_id=user_id, primary=container.user_cache.enabled)
     if user is None:
         logger.warning(f"AuthDependency | action=user_lookup_failed reason=not_found user_id={user_id}")
         raise AuthException(detail="User not found")
 
-    return user
+    if not user.is_active:
+        logger.warning(f"AuthDependency | action=user_lookup_failed reason=inactive user_id={user_id}")
+        raise AuthException(detail="User is inactive")
+
+    # Only active users are cached; changes evict them via the user_changed channel
+    snapshot = CurrentUser.model_validate(user)
+    container.user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+async def get_current_user_optional(
+    token: Annotated[str | None, Depends(oauth2_scheme_optional)],
+    user_repository: Annotated[IUserRepository, Depends(get_user_repository)],
+    container: Annotated[AppContainer, Depends(get_container)],
+) -> CurrentUser | None:
+    """
+    Same as get_current_user, but returns None for anonymous requests.
+    An invalid token is still rejected.
+    """
+    if token is None:
+        return None
+    return await get_current_user(token=token, user_repository=user_repository, container=container)
+
+
+async def _resolve_principal(
+    scope: ApiKeyScope,
+    api_key: str | None,
+    token: str | None,
+    user_repository: IUserRepository,
+    container: AppContainer,
+) -> Principal | None:
+    """
+    X-API-Key wins over a bearer token. In headless mode bearer tokens are ignored.
+    """
+    if api_key is not None:
+        with span("auth"):
+            principal = container.api_keys.lookup(api_key)
+        if principal is None:
+            logger.warning("AuthDependency | action=api_key_failed reason=unknown_key")
+            raise AuthException(detail="Invalid API key")
+
+        if scope not in principal.scopes:
+            logger.warning(
+                f"AuthDependency | action=api_key_failed reason=missing_scope key={principal.name} scope={scope}"
+            )
+            raise PermissionDeniedException(detail=f"API key has no '{scope}' scope")
+
+        set_db_reader(str(principal.id))
+        return principal
+
+    if token is None or settings.APP_MODE == "HEADLESS":
+        return None
+    return await get_current_user(token=token, user_repository=user_repository, container=container)
+
+
+def get_current_principal(scope: ApiKeyScope) -> Callable[..., Awaitable[Principal]]:
+    """
+    Dependency factory for media routes: accepts an API key with `scope` or, in FULL mode, a user JWT.
+    An API key is checked against the in-memory index, without a JWT decode or a DB lookup.
+    """
+
+    async def dependency(
+        api_key: Annotated[str | None, Depends(api_key_scheme)],
+        token: Annotated[str | None, Depends(oauth2_scheme_optional)],
+        user_repository: Annotated[IUserRepository, Depends(get_user_repository)],
+        container: Annotated[AppContainer, Depends(get_container)],
+    ) -> Principal:
+        principal = await _resolve_principal(scope, api_key, token, user_repository, container)
+        if principal is None:
+            raise AuthException(detail="Not authenticated")
+        return principal
+
+    return dependency
+
+
+def get_current_principal_optional(scope: ApiKeyScope) -> Callable[..., Awaitable[Principal | None]]:
+    """
+    Same as get_current_principal, but returns None for anonymous requests.
+    Invalid credentials are still rejected.
+    """
+
+    async def dependency(
+        api_key: Annotated[str | None, Depends(api_key_scheme)],
+        token: Annotated[str | None, Depends(oauth2_scheme_optional)],
+        user_repository: Annotated[IUserRepository, Depends(get_user_repository)],
+        container: Annotated[AppContainer, Depends(get_container)],
+    ) -> Principal | None:
+        return await _resolve_principal(scope, api_key, token, user_repository, container)
+
+    return dependency
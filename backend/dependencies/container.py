@@ -0,0 +1,84 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from fastapi import Request
+from loguru import logger
+
+from backend.apps.media.storage import MediaStorage, open_storage
+from backend.apps.users.schemas.user import CurrentUser
+from backend.apps.users.services.api_key_service import ApiKeyIndex
+from backend.core.cache import TTLCache
+from backend.core.config import settings
+from backend.core.ratelimit import LoginThrottle
+
+
+@dataclass
+class AppContainer:
+    """
+    Process-wide singletons, built once in the app lifespan and closed on shutdown.
+    DB sessions are not held here: they stay request-scoped (get_db).
+    """
+
+    storage: MediaStorage
+    imaging_pool: ThreadPoolExecutor
+    hashing_pool: ThreadPoolExecutor
+    user_cache: TTLCache[uuid.UUID, CurrentUser]
+    login_throttle: LoginThrottle | None
+    api_keys: ApiKeyIndex
+
+    @classmethod
+    def create(cls, cache_users: bool = True) -> "AppContainer":
+        """
+        Build all app-scoped resources from settings.
+        cache_users=False disables the user cache (no way to invalidate it across workers).
+        """
+        container = cls(
+            storage=open_storage(settings.UPLOAD_DIR),
+            # Bounded separately, so thumbnailing can't starve the shared threadpool (file I/O, FileResponse)
+            imaging_pool=ThreadPoolExecutor(max_workers=settings.IMAGING_WORKERS, thread_name_prefix="imaging"),
+            # Caps CPU spent on password hashing; excess logins queue instead of stalling other work
+            hashing_pool=ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            ),
+            user_cache=TTLCache(
+                maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS if cache_users else 0
+            ),
+            login_throttle=(
+                LoginThrottle(
+                    account_burst=settings.LOGIN_ACCOUNT_BURST,
+                    account_per_minute=settings.LOGIN_ACCOUNT_PER_MINUTE,
+                    ip_burst=settings.LOGIN_IP_BURST,
+                    ip_per_minute=settings.LOGIN_IP_PER_MINUTE,
+                    backoff_after=settings.LOGIN_BACKOFF_AFTER_FAILURES,
+                    backoff_max=settings.LOGIN_BACKOFF_MAX_SECONDS,
+                )
+                if settings.LOGIN_THROTTLE_ENABLED
+                else None
+            ),
+            # Filled from the DB in the lifespan, then kept fresh by the api key listener
+            api_keys=ApiKeyIndex(),
+        )
+        logger.info(
+            f"AppContainer | action=created upload_dir={settings.UPLOAD_DIR} "
+            f"imaging_workers={settings.IMAGING_WORKERS} hashing_workers={settings.PASSWORD_HASH_WORKERS}"
+        )
+        return container
+
+    async def aclose(self) -> None:
+        """
+        Release resources; waits for in-flight pool jobs without blocking the event loop.
+        """
+        for pool in (self.imaging_pool, self.hashing_pool):
+            await asyncio.to_thread(pool.shutdown, wait=True)
+        self.user_cache.clear()
+        logger.info("AppContainer | action=closed")
+
+
+def get_container(request: Request) -> AppContainer:
+    """
+    Dependency provider for the app-scoped container (set up in lifespan).
+    """
+    container: AppContainer = request.app.state.container
+    return container
@@ -5,23 +5,37 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.apps.media.contracts.media_repository import IMediaRepository
 from backend.apps.media.services.media_service import MediaService
-from backend.core.database import get_db
+from backend.apps.media.storage import MediaStorage
+from backend.core.database import get_db, get_read_db
 from backend.database.repositories.media_repository import MediaRepository
+from backend.dependencies.container import AppContainer, get_container
 
 
 def get_media_repository(
     db: Annotated[AsyncSession, Depends(get_db)],
+    read_db: Annotated[AsyncSession, Depends(get_read_db)],
 ) -> IMediaRepository:
     """
     Dependency provider for Media Repository.
     """
-    return MediaRepository(session=db)
+    return MediaRepository(session=db, read_session=read_db)
+
+
+def get_media_storage(
+    container: Annotated[AppContainer, Depends(get_container)],
+) -> MediaStorage:
+    """
+    Dependency provider for the app-scoped Media Storage (no DB session).
+    """
+    return container.storage
 
 
 def get_media_service(
     repository: Annotated[IMediaRepository, Depends(get_media_repository)],
+    container: Annotated[AppContainer, Depends(get_container)],
 ) -> MediaService:
     """
     Dependency provider for Media Service.
+    Only the repository (session) is per request; storage and imaging pool come from the container.
     """
-    return MediaService(repository=repository)
+    return MediaService(repository=repository, storage=container.storage, imaging_pool=container.imaging_pool)
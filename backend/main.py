@@ -1,18 +1,40 @@
 # backend/main.py
+import asyncio
+import contextlib
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from typing import Any
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from loguru import logger
 
+from .apps.media.tasks import run_file_sweeper
+from .apps.users.tasks import (
+    refresh_api_key_index,
+    run_api_key_listener,
+    run_token_sweeper,
+    run_user_cache_listener,
+)
 from .core.config import settings
-from .core.database import async_engine, run_alembic_migrations
+from .core.database import (
+    ReadYourWritesMiddleware,
+    async_engine,
+    async_session_factory,
+    get_pool_status,
+    listen_engine,
+    read_engine,
+    run_alembic_migrations,
+    warm_up_pool,
+)
 from .core.exceptions import BaseAPIException, api_exception_handler
 from .core.logger import setup_loguru
+from .core.metrics import MetricsMiddleware, mark_process_dead, render_metrics, run_metrics_sampler
+from .core.querylog import QueryLogMiddleware, instrument_query_log
+from .core.responses import FastJSONResponse
 from .core.schemas.error import ErrorResponse
+from .core.timing import ServerTimingMiddleware, instrument_queries
+from .dependencies.container import AppContainer
 from .router import api_router, tags_metadata
 
 
@@ -32,10 +54,72 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     else:
         logger.warning("⚠️ AUTO_MIGRATE=False: Skipping migrations. Run 'alembic upgrade head' manually.")
 
+    if settings.DB_POOL_WARMUP:
+        await warm_up_pool(async_engine, min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE))
+
+    # Cached users must be evicted when another worker changes them: that takes LISTEN
+    cache_users = listen_engine is not None or not settings.USER_CACHE_LISTEN
+    if not cache_users and settings.USER_CACHE_TTL_SECONDS > 0:
+        logger.error(
+            "❌ User cache DISABLED: LISTEN user_changed needs a session-level connection. "
+            "Behind pgbouncer set DATABASE_LISTEN_URL (direct Postgres); with a direct DATABASE_URL set "
+            "DB_PROFILE=direct; or set USER_CACHE_LISTEN=False to accept changes applying after the TTL."
+        )
+
+    # App-scoped singletons (storage, imaging pool); sessions stay per request
+    container = AppContainer.create(cache_users=cache_users)
+    app.state.container = container
+
+    # Keys must be known before the first request; the listener keeps them fresh afterwards.
+    # A failed load does not stop startup: the listener retries, X-API-Key gets 401 until then.
+    try:
+        await refresh_api_key_index(async_session_factory, container.api_keys)
+        logger.info(f"🔑 API keys loaded: {len(container.api_keys)} (mode={settings.APP_MODE})")
+    except Exception as exc:
+        logger.warning(f"⚠️ API keys not loaded, retrying in the listener: {exc}")
+
+    sweeper = (
+        asyncio.create_task(run_file_sweeper(async_session_factory, container.storage))
+        if settings.GC_ENABLED
+        else None
+    )
+    token_sweeper = (
+        asyncio.create_task(run_token_sweeper(async_session_factory)) if settings.TOKEN_SWEEP_ENABLED else None
+    )
+    cache_listener = (
+        asyncio.create_task(run_user_cache_listener(listen_engine, container.user_cache))
+        if settings.USER_CACHE_LISTEN and listen_engine is not None and container.user_cache.enabled
+        else None
+    )
+    # Always on: X-API-Key is accepted in both modes, and keys issued later (cli) must reach running workers
+    api_key_listener = asyncio.create_task(
+        run_api_key_listener(listen_engine, async_session_factory, container.api_keys)
+    )
+    metrics_sampler = (
+        asyncio.create_task(
+            run_metrics_sampler({"imaging": container.imaging_pool, "password_hash": container.hashing_pool})
+        )
+        if settings.METRICS_ENABLED
+        else None
+    )
+
     yield
 
+    for task in (sweeper, token_sweeper, cache_listener, api_key_listener, metrics_sampler):
+        if task:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    await container.aclose()
+    mark_process_dead()
+
     logger.info("🛑 Server shutting down... Closing DB connections...")
     await async_engine.dispose()
+    if listen_engine is not None and listen_engine is not async_engine:
+        await listen_engine.dispose()
+    if read_engine:
+        await read_engine.dispose()
     logger.info("👋 Bye!")
 
 
@@ -64,6 +148,7 @@ app = FastAPI(
     openapi_tags=tags_metadata,
     lifespan=lifespan,
     responses=responses,
+    default_response_class=FastJSONResponse,
 )
 
 # --- CORS SETUP ---
@@ -84,6 +169,26 @@ elif settings.ALLOWED_ORIGINS:
         allow_headers=["*"],
     )
 
+# --- READ-YOUR-WRITES ---
+# Only matters with a replica: carries the primary pin to the other workers
+if read_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# --- SERVER TIMING ---
+if settings.SERVER_TIMING_ENABLED:
+    instrument_queries()
+    app.add_middleware(ServerTimingMiddleware)
+
+# --- N+1 DETECTOR (debug) ---
+if settings.DEBUG:
+    instrument_query_log()
+    app.add_middleware(QueryLogMiddleware)
+
+# --- METRICS ---
+# Added last, so it is the outermost middleware and times the whole stack
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # --- EXCEPTION HANDLERS ---
 
 # 1. Наши кастомные ошибки (бизнес-логика)
@@ -91,14 +196,14 @@ app.add_exception_handler(BaseAPIException, api_exception_handler) # type: ignor
 
 # 2. Глобальный перехватчик всех остальных ошибок (Last Resort)
 @app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def global_exception_handler(request: Request, exc: Exception) -> FastJSONResponse:
     # Если DEBUG=True, позволяем FastAPI показать стандартную страницу с трейсбеком (удобно для разработки)
     if settings.DEBUG:
         raise exc
     
     # В проде логируем ошибку и отдаем нейтральный JSON
     logger.exception(f"🔥 Unhandled exception: {exc}")
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "error": {
@@ -116,6 +221,26 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok", "app": settings.PROJECT_NAME}
 
 
+@app.get("/health/db", tags=["System"], include_in_schema=False)
+async def health_db() -> dict[str, Any]:
+    """
+    Connection pool usage and checkout wait times.
+    Not proxied by Nginx: reachable from the Docker network only.
+    """
+    return get_pool_status()
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", tags=["System"], include_in_schema=False)
+    async def metrics() -> Response:
+        """
+        Prometheus exposition (aggregated over workers in multi-process mode).
+        """
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+
 @app.get("/", tags=["System"])
 async def root() -> dict[str, str]:
     if settings.DEBUG:
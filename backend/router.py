@@ -4,6 +4,7 @@ from fastapi import APIRouter
 from backend.apps.media.api.media import router as media_router
 from backend.apps.users.api.auth import router as auth_router
 from backend.apps.users.api.users import router as users_router
+from backend.core.config import settings
 
 api_router = APIRouter()
 
@@ -27,6 +28,8 @@ tags_metadata = [
     },
 ]
 
-api_router.include_router(auth_router, prefix="/auth", tags=["Auth"])
-api_router.include_router(users_router, prefix="/users", tags=["Users"])
+# Headless mode: no registration, login or profile; media routes authenticate by X-API-Key only
+if settings.APP_MODE == "FULL":
+    api_router.include_router(auth_router, prefix="/auth", tags=["Auth"])
+    api_router.include_router(users_router, prefix="/users", tags=["Users"])
 api_router.include_router(media_router, prefix="/media", tags=["Media"])
@@ -0,0 +1,106 @@
+"""
+Load test: many uploads of one popular hash (dedup hits) at increasing concurrency.
+
+Each simulated upload is the DB part of the dedup-hit path: link_image + commit.
+The "legacy" mode additionally takes the row lock that the old
+`UPDATE files SET ref_count = ref_count + 1` held until commit (FOR NO KEY UPDATE),
+so every upload of the hash queues on a single row. The "current" mode only reads
+the files row, so throughput should keep growing with concurrency.
+
+Needs a throwaway Postgres database: all tables are dropped and recreated.
+
+Usage:
+    python -m benchmarks.dedup_hotspot --database-url postgresql+asyncpg://... \\
+        [--concurrency 1 8 32] [--seconds 5]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import statistics
+import time
+import uuid
+from typing import Any
+
+from backend.database.models import File, User
+from backend.database.models.base import Base
+from backend.database.repositories.media_repository import MediaRepository
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+HOT_HASH = hashlib.sha256(b"viral meme").hexdigest()
+
+
+async def _setup(engine: AsyncEngine) -> uuid.UUID:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    user_id = uuid.uuid4()
+    async with async_sessionmaker(engine)() as session:
+        session.add(User(id=user_id, email="bench@example.com", hashed_password="x"))
+        session.add(File(hash=HOT_HASH, size_bytes=1024, mime_type="image/png", path="/dev/null"))
+        await session.commit()
+    return user_id
+
+
+async def _worker(
+    factory: async_sessionmaker[AsyncSession], user_id: uuid.UUID, legacy: bool, deadline: float
+) -> list[float]:
+    latencies = []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        async with factory() as session:
+            if legacy:
+                await session.execute(select(File.hash).where(File.hash == HOT_HASH).with_for_update(key_share=True))
+            await MediaRepository(session=session).link_image(user_id=user_id, file_hash=HOT_HASH, filename="meme.png")
+            await session.commit()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _measure(
+    factory: async_sessionmaker[AsyncSession], user_id: uuid.UUID, legacy: bool, concurrency: int, seconds: float
+) -> dict[str, Any]:
+    deadline = time.perf_counter() + seconds
+    results = await asyncio.gather(*(_worker(factory, user_id, legacy, deadline) for _ in range(concurrency)))
+    latencies = sorted(latency for worker in results for latency in worker)
+    return {
+        "mode": "legacy" if legacy else "current",
+        "concurrency": concurrency,
+        "uploads": len(latencies),
+        "uploads_per_sec": round(len(latencies) / seconds, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+async def run(database_url: str, concurrency: list[int], seconds: float) -> dict[str, Any]:
+    engine = create_async_engine(database_url, pool_size=max(concurrency), max_overflow=0)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        user_id = await _setup(engine)
+        runs = [
+            await _measure(factory, user_id, legacy, level, seconds)
+            for legacy in (True, False)
+            for level in concurrency
+        ]
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    finally:
+        await engine.dispose()
+    return {"benchmark": "dedup_hotspot", "seconds": seconds, "runs": runs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.database_url, args.concurrency, args.seconds)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Performance regression gate: compare benchmark results with the committed baselines.
+
+Takes the JSON written by the benchmarks (--output, or their stdout redirected to a file),
+matches every case/scenario with benchmarks/baselines/<benchmark>.json and fails when a gated
+metric moved the wrong way by more than its tolerance:
+
+    throughput (rps, ops_per_sec, *_per_sec)  fails below baseline * (1 - tolerance)
+    latency (p95_ms)                          fails above baseline * (1 + tolerance)
+    errors                                    fails above the baseline count
+
+Other metrics (p50, p99, mean) are gated only if the baseline file lists a tolerance for them.
+Tolerances live in the baseline file ("tolerances": {"p95_ms": 0.3}) and survive re-baselining.
+
+Baselines are only comparable on the machine (and settings) they were recorded on.
+
+Only the hot_paths baseline is committed; record the load baseline on the gating machine first.
+
+Usage:
+    python -m benchmarks.hot_paths --output /tmp/hot_paths.json
+    python -m benchmarks.gate /tmp/hot_paths.json [--verbose]
+    python -m benchmarks.gate /tmp/load.json --rebaseline   # first run: writes baselines/load-<target>.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+# Gated by default: metric -> allowed relative change in the bad direction
+DEFAULT_TOLERANCES = {
+    "rps": 0.10,
+    "ops_per_sec": 0.10,
+    "uploads_per_sec": 0.10,
+    "orm_rows_per_sec": 0.10,
+    "projection_rows_per_sec": 0.10,
+    "p95_ms": 0.20,
+    "errors": 0.0,
+}
+# Fields that name a case rather than measure it
+IDENTITY_FIELDS = ("name", "scenario", "mode", "concurrency")
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric == "rps" or metric.endswith("_per_sec") or metric == "speedup"
+
+
+def baseline_path(result: dict[str, Any], baseline_dir: Path) -> Path:
+    """
+    One baseline per benchmark; load results are split by target (inprocess and http differ a lot).
+    """
+    name = result["benchmark"]
+    if result.get("target"):
+        name += f"-{result['target']}"
+    return baseline_dir / f"{name}.json"
+
+
+def entries(result: dict[str, Any]) -> dict[str, dict[str, float]]:
+    """
+    Cases of a result keyed by their identity: {"generate_thumbnail[PNG,640x480]": {"p95_ms": ..., ...}}.
+    """
+    rows = result.get("results") or result.get("runs") or [result]
+    keyed = {}
+    for row in rows:
+        key = " ".join(str(row[f]) for f in IDENTITY_FIELDS if f in row) or result["benchmark"]
+        keyed[key] = {
+            metric: float(value)
+            for metric, value in row.items()
+            if metric not in IDENTITY_FIELDS and isinstance(value, int | float) and not isinstance(value, bool)
+        }
+    return keyed
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], verbose: bool = False
+) -> tuple[list[str], list[str]]:
+    """
+    Returns:
+        tuple[list[str], list[str]]: (report lines, regression lines)
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **baseline.get("tolerances", {})}
+    base_entries = entries(baseline)
+    current_entries = entries(current)
+    lines: list[str] = []
+    regressions: list[str] = []
+
+    for key, base_metrics in base_entries.items():
+        metrics = current_entries.get(key)
+        if metrics is None:
+            lines.append(f"  {key}: missing from the current run")
+            continue
+
+        for metric, tolerance in tolerances.items():
+            if metric not in base_metrics or metric not in metrics:
+                continue
+            before, after = base_metrics[metric], metrics[metric]
+            change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+            worse = -change if higher_is_better(metric) else change
+
+            line = f"  {key}  {metric}: {before:g} -> {after:g} ({change:+.1%}, tolerance {tolerance:.0%})"
+            if worse > tolerance:
+                regressions.append(line)
+                lines.append(line + "  REGRESSION")
+            elif worse < -tolerance and metric != "errors":
+                lines.append(line + "  improved (consider --rebaseline)")
+            elif verbose:
+                lines.append(line)
+
+    for key in current_entries.keys() - base_entries.keys():
+        lines.append(f"  {key}: new, no baseline")
+
+    return lines, regressions
+
+
+def rebaseline(result: dict[str, Any], path: Path) -> None:
+    """
+    Store the result as the new baseline, keeping tolerances tuned in the old one.
+    """
+    if path.exists():
+        tolerances = json.loads(path.read_text()).get("tolerances")
+        if tolerances:
+            result = {**result, "tolerances": tolerances}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2) + "\n")
+
+
+def run(results: list[Path], baseline_dir: Path, update: bool, verbose: bool) -> int:
+    """
+    Returns:
+        int: exit code, 0 = no regressions, 1 = regressions, 2 = missing baseline
+    """
+    exit_code = 0
+    for result_path in results:
+        current = json.loads(result_path.read_text())
+        path = baseline_path(current, baseline_dir)
+
+        if update:
+            rebaseline(current, path)
+            print(f"{path}: baseline updated from {result_path}")
+            continue
+
+        if not path.exists():
+            print(f"{path}: no baseline, record one with --rebaseline")
+            exit_code = max(exit_code, 2)
+            continue
+
+        lines, regressions = compare(json.loads(path.read_text()), current, verbose)
+        status = f"FAILED, {len(regressions)} regression(s)" if regressions else "ok"
+        print(f"{current['benchmark']} vs {path.name}: {status}")
+        if lines:
+            print("\n".join(lines))
+        if regressions:
+            exit_code = max(exit_code, 1)
+
+    return exit_code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("results", type=Path, nargs="+", help="Benchmark result JSON files")
+    parser.add_argument("--baseline-dir", type=Path, default=BASELINE_DIR)
+    parser.add_argument("--rebaseline", action="store_true", help="Replace the baselines with these results")
+    parser.add_argument("--verbose", action="store_true", help="Also list metrics within tolerance")
+    args = parser.parse_args()
+    sys.exit(run(args.results, args.baseline_dir, args.rebaseline, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Microbenchmarks: MediaService hot paths, feed page serialization and JWTs.
+
+No database: MediaService gets a repository that fails on any call (none of these paths touch it),
+images are generated, files go to a temporary directory. Imaging work runs on a
+one-thread pool, as in the app container, so the thread hop is part of the timing.
+
+Each case runs for at least --min-time seconds (and --min-rounds rounds).
+
+Pre-optimization paths run next to the current ones, so one recording holds both:
+stream_to_temp[...,chunk=64KB] is the old chunk size, feed_page_serialize[JSONResponse,...]
+is the stock FastAPI serialization (jsonable_encoder + json.dumps) that FastJSONResponse replaced.
+feed_page_serialize[rows=...] is what a route does: validate and dump the page with the declared
+response type's TypeAdapter, render with FastJSONResponse.
+
+Usage:
+    python -m benchmarks.hot_paths [--min-time 0.5] [--min-rounds 5] [--filter thumbnail] [--output result.json]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import math
+import os
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NoReturn
+
+from backend.apps.media.schemas.media import ImageRead
+from backend.apps.media.services.media_service import MediaService
+from backend.apps.media.storage import MediaStorage
+from backend.core.config import settings
+from backend.core.responses import FastJSONResponse
+from backend.core.security import ALGORITHM, create_access_token
+from fastapi import UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from jose import jwt
+from pydantic import TypeAdapter
+
+from benchmarks.payloads import FORMATS, make_image
+
+STREAM_SIZE = 4 * 1024 * 1024
+CHUNK_SIZES = [16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024]
+VALIDATE_SIZE = (1280, 960)
+THUMBNAIL_SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+THUMBNAIL_FORMATS = ["JPEG", "PNG", "WEBP"]
+PAGE_ROWS = 100
+
+FeedRow = namedtuple(
+    "FeedRow",
+    ["id", "filename", "created_at", "hash", "size_bytes", "mime_type", "file_created_at"],
+)
+
+
+class NoDatabaseRepository:
+    """
+    IMediaRepository for paths that must not touch the database: any repository call fails the benchmark.
+    """
+
+    def __getattr__(self, name: str) -> Callable[..., NoReturn]:
+        def fail(*args: Any, **kwargs: Any) -> NoReturn:
+            raise AssertionError(f"benchmarked path called repository.{name}")
+
+        return fail
+
+
+def _percentile(timings: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted timings, in milliseconds.
+    """
+    return round(timings[max(math.ceil(len(timings) * q) - 1, 0)] * 1000, 4)
+
+
+def _stats(name: str, timings: list[float]) -> dict[str, Any]:
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        "name": name,
+        "rounds": len(timings),
+        "mean_ms": round(mean * 1000, 4),
+        "p50_ms": _percentile(timings, 0.50),
+        "p95_ms": _percentile(timings, 0.95),
+        "ops_per_sec": round(1 / mean, 1),
+    }
+
+
+async def _bench(name: str, fn: Callable[[], Awaitable[Any]], min_time: float, min_rounds: int) -> dict[str, Any]:
+    await fn()  # warmup
+    timings: list[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_rounds or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return _stats(name, timings)
+
+
+def _feed_rows(rows: int) -> list[FeedRow]:
+    now = datetime.now(UTC)
+    return [
+        FeedRow(
+            id=uuid.uuid4(),
+            filename=f"image_{i}.jpg",
+            created_at=now,
+            hash=hashlib.sha256(str(i).encode()).hexdigest(),
+            size_bytes=100_000 + i,
+            mime_type="image/jpeg",
+            file_created_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def _cases(service: MediaService, root: Path) -> dict[str, Callable[[], Awaitable[Any]]]:
+    """
+    name -> one round of the benchmark. Inputs are prepared here, outside the timing.
+    """
+    cases: dict[str, Callable[[], Awaitable[Any]]] = {}
+
+    upload = UploadFile(file=io.BytesIO(os.urandom(STREAM_SIZE)), filename="stream.bin")
+    temp_path = root / "stream.tmp"
+    for chunk_size in CHUNK_SIZES:
+
+        async def stream(chunk_size: int = chunk_size) -> None:
+            upload.file.seek(0)
+            service.chunk_size = chunk_size
+            await service._process_stream_to_temp(upload, temp_path)
+
+        cases[f"stream_to_temp[{STREAM_SIZE // 1024 // 1024}MB,chunk={chunk_size // 1024}KB]"] = stream
+
+    for fmt, (_, ext) in FORMATS.items():
+        path = root / f"validate{ext}"
+        path.write_bytes(make_image(*VALIDATE_SIZE, fmt))
+
+        async def validate(path: Path = path) -> str:
+            return await service._validate_file_type(path)
+
+        cases[f"validate_file_type[{fmt}]"] = validate
+
+    file_hash = "ab" * 32
+    service.storage.shard_dir(file_hash).mkdir(parents=True)
+    for width, height in THUMBNAIL_SIZES:
+        for fmt in THUMBNAIL_FORMATS:
+            path = root / f"original_{width}x{height}{FORMATS[fmt][1]}"
+            path.write_bytes(make_image(width, height, fmt))
+
+            async def thumbnail(path: Path = path) -> None:
+                await service._generate_thumbnail(path, file_hash)
+
+            cases[f"generate_thumbnail[{fmt},{width}x{height}]"] = thumbnail
+
+    rows = _feed_rows(PAGE_ROWS)
+    page_adapter: TypeAdapter[list[ImageRead]] = TypeAdapter(list[ImageRead])
+
+    async def serialize_page() -> bytes:
+        page = page_adapter.validate_python([ImageRead.from_row(row) for row in rows])
+        return FastJSONResponse(page_adapter.dump_python(page, mode="json")).body
+
+    async def serialize_page_stock() -> bytes:
+        return JSONResponse(jsonable_encoder([ImageRead.from_row(row) for row in rows])).body
+
+    cases[f"feed_page_serialize[rows={PAGE_ROWS}]"] = serialize_page
+    cases[f"feed_page_serialize[JSONResponse,rows={PAGE_ROWS}]"] = serialize_page_stock
+
+    token = create_access_token(str(uuid.uuid4()))
+
+    async def encode_token() -> str:
+        return create_access_token(str(uuid.uuid4()))
+
+    async def decode_token() -> dict[str, Any]:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+
+    cases["jwt_encode"] = encode_token
+    cases["jwt_decode"] = decode_token
+    return cases
+
+
+async def run(min_time: float = 0.5, min_rounds: int = 5, name_filter: str | None = None) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="pinlite-bench-") as tmp, ThreadPoolExecutor(1) as pool:
+        root = Path(tmp)
+        service = MediaService(repository=NoDatabaseRepository(), storage=MediaStorage(root), imaging_pool=pool)
+        service.max_upload_size = STREAM_SIZE
+
+        results = [
+            await _bench(name, fn, min_time, min_rounds)
+            for name, fn in _cases(service, root).items()
+            if name_filter is None or name_filter in name
+        ]
+
+    return {"benchmark": "hot_paths", "min_time": min_time, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per case")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--filter", dest="name_filter", help="Only cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="Also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.min_time, args.min_rounds, args.name_filter))
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
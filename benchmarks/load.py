@@ -0,0 +1,318 @@
+"""
+Load test: throughput and tail latency of the real app (routers, services, Postgres, disk).
+
+Scenarios (each runs for --seconds with --concurrency virtual users, one logged-in user per VU):
+    mixed_uploads  unique JPEG/PNG uploads, 60% small / 30% medium / 10% large
+    dedup_uploads  everyone uploads the same few pictures: the deduplication hit path
+    feed_scroll    GET /media/feed page after page (offset pagination), as the gallery scrolls
+    login_storm    POST /auth/login with correct passwords: the password hashing pool
+
+Targets:
+    inprocess  the app is driven through httpx ASGITransport in this process (no network, no uvicorn)
+    http       uvicorn is started in a subprocess (--workers) and hit over localhost,
+               or an already running server with --base-url
+
+Uses the database from DATABASE_URL like the app itself (migrations run on startup): point it at a
+throwaway Postgres. Uploads go to a temporary UPLOAD_DIR. Login throttling is switched off,
+otherwise the login storm measures the 429 path.
+
+Usage:
+    python -m benchmarks.load [--target inprocess|http] [--scenarios mixed_uploads feed_scroll ...] \\
+        [--concurrency 16] [--seconds 10] [--workers 1] [--base-url http://...] [--output result.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from backend.core.config import settings
+from backend.main import app
+
+from benchmarks.payloads import FORMATS, make_image, make_unique
+
+API = "/api/v1"
+PASSWORD = "bench-password-123"
+
+# (weight, width, height, format) of the mixed upload scenario
+UPLOAD_MIX = [
+    (6, 320, 240, "JPEG"),
+    (3, 1280, 960, "JPEG"),
+    (1, 2560, 1920, "PNG"),
+]
+DEDUP_PICTURES = 3
+FEED_PAGE = 20
+
+# Applied to the server under test (env of the uvicorn subprocess, settings in-process)
+SERVER_OVERRIDES = {"LOGIN_THROTTLE_ENABLED": "False"}
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    headers: dict[str, str]
+    page: int = 0
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    users: list[VirtualUser]
+    feed_pages: int = 1
+    mixed: list[tuple[str, bytes]] = field(default_factory=list)  # weighted (format, payload)
+    dedup: list[tuple[str, bytes]] = field(default_factory=list)
+
+
+Request = Callable[[Context, VirtualUser], Awaitable[httpx.Response]]
+
+
+async def _upload(ctx: Context, vu: VirtualUser, fmt: str, payload: bytes) -> httpx.Response:
+    mime, ext = FORMATS[fmt]
+    files = {"file": (f"bench{ext}", payload, mime)}
+    return await ctx.client.post(f"{API}/media/upload", files=files, headers=vu.headers)
+
+
+async def _mixed_upload(ctx: Context, vu: VirtualUser) -> httpx.Response:
+    fmt, payload = random.choice(ctx.mixed)
+    return await _upload(ctx, vu, fmt, make_unique(payload, fmt))
+
+
+async def _dedup_upload(ctx: Context, vu: VirtualUser) -> httpx.Response:
+    fmt, payload = random.choice(ctx.dedup)
+    return await _upload(ctx, vu, fmt, payload)
+
+
+async def _feed_page(ctx: Context, vu: VirtualUser) -> httpx.Response:
+    offset = vu.page * FEED_PAGE
+    vu.page = (vu.page + 1) % ctx.feed_pages
+    return await ctx.client.get(f"{API}/media/feed", params={"limit": FEED_PAGE, "offset": offset})
+
+
+async def _login(ctx: Context, vu: VirtualUser) -> httpx.Response:
+    return await ctx.client.post(f"{API}/auth/login", data={"username": vu.email, "password": PASSWORD})
+
+
+# name -> (request, expected status)
+SCENARIOS: dict[str, tuple[Request, int]] = {
+    "mixed_uploads": (_mixed_upload, 201),
+    "dedup_uploads": (_dedup_upload, 201),
+    "feed_scroll": (_feed_page, 200),
+    "login_storm": (_login, 200),
+}
+
+
+def _percentile(latencies: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted latencies, in milliseconds.
+    """
+    if not latencies:
+        return 0.0
+    return round(latencies[max(math.ceil(len(latencies) * q) - 1, 0)] * 1000, 2)
+
+
+async def _worker(
+    ctx: Context, vu: VirtualUser, request: Request, expected: int, deadline: float
+) -> tuple[list[float], int]:
+    latencies = []
+    errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await request(ctx, vu)
+            ok = response.status_code == expected
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+async def _measure(ctx: Context, name: str, seconds: float, warmup: float) -> dict[str, Any]:
+    request, expected = SCENARIOS[name]
+    if warmup:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(_worker(ctx, vu, request, expected, deadline) for vu in ctx.users))
+
+    deadline = time.perf_counter() + seconds
+    results = await asyncio.gather(*(_worker(ctx, vu, request, expected, deadline) for vu in ctx.users))
+    latencies = sorted(latency for worker, _ in results for latency in worker)
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+    }
+
+
+async def _setup(client: httpx.AsyncClient, concurrency: int, seed_images: int) -> Context:
+    """
+    One registered, logged-in user per VU (unique per run, so reruns on the same database work),
+    generated payloads and enough images for the feed to scroll through.
+    """
+    run_id = uuid.uuid4().hex[:8]
+
+    async def create_user(n: int) -> VirtualUser:
+        email = f"load-{run_id}-{n}@bench.example"
+        response = await client.post(f"{API}/auth/register", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        response = await client.post(f"{API}/auth/login", data={"username": email, "password": PASSWORD})
+        response.raise_for_status()
+        return VirtualUser(email=email, headers={"Authorization": f"Bearer {response.json()['access_token']}"})
+
+    users = list(await asyncio.gather(*(create_user(n) for n in range(concurrency))))
+    ctx = Context(client=client, users=users)
+
+    for weight, width, height, fmt in UPLOAD_MIX:
+        ctx.mixed.extend([(fmt, make_image(width, height, fmt))] * weight)
+    ctx.dedup = [("JPEG", make_unique(make_image(800, 600), "JPEG")) for _ in range(DEDUP_PICTURES)]
+
+    small = make_image(320, 240)
+    for n in range(seed_images):
+        response = await _upload(ctx, users[n % len(users)], "JPEG", make_unique(small, "JPEG"))
+        response.raise_for_status()
+    ctx.feed_pages = max(seed_images // FEED_PAGE, 1)
+    return ctx
+
+
+@contextlib.asynccontextmanager
+async def _inprocess_client(upload_dir: Path) -> AsyncIterator[httpx.AsyncClient]:
+    # Read when the lifespan builds the container
+    settings.LOGIN_THROTTLE_ENABLED = False
+    settings.UPLOAD_DIR = upload_dir
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+@contextlib.asynccontextmanager
+async def _http_client(
+    upload_dir: Path, concurrency: int, workers: int, base_url: str | None
+) -> AsyncIterator[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    server = None
+    if base_url is None:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        env = {**os.environ, **SERVER_OVERRIDES, "UPLOAD_DIR": str(upload_dir)}
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "backend.main:app",
+                "--host", "127.0.0.1", "--port", str(port),
+                "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+            ],
+            env=env,
+        )
+
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            await _wait_ready(client, server)
+            yield client
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+async def _wait_ready(client: httpx.AsyncClient, server: subprocess.Popen[bytes] | None) -> None:
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        with contextlib.suppress(httpx.HTTPError):
+            if (await client.get("/health")).status_code == 200:
+                return
+        await asyncio.sleep(0.5)
+    raise RuntimeError("Server did not become ready in 60s")
+
+
+async def run(
+    target: str,
+    scenarios: list[str],
+    concurrency: int,
+    seconds: float,
+    warmup: float,
+    seed_images: int,
+    workers: int = 1,
+    base_url: str | None = None,
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="pinlite-load-") as tmp:
+        upload_dir = Path(tmp)
+        client_cm = (
+            _inprocess_client(upload_dir)
+            if target == "inprocess"
+            else _http_client(upload_dir, concurrency, workers, base_url)
+        )
+        async with client_cm as client:
+            ctx = await _setup(client, concurrency, seed_images)
+            runs = [await _measure(ctx, name, seconds, warmup) for name in scenarios]
+
+    return {
+        "benchmark": "load",
+        "target": target,
+        "workers": workers if target == "http" else None,
+        "concurrency": concurrency,
+        "seconds": seconds,
+        "runs": runs,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--seed-images", type=int, default=200, help="Images uploaded before the run (feed depth)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (http target)")
+    parser.add_argument("--base-url", help="Existing server for the http target instead of starting uvicorn")
+    parser.add_argument("--output", type=Path, help="Also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run(
+            args.target,
+            args.scenarios,
+            args.concurrency,
+            args.seconds,
+            args.warmup,
+            args.seed_images,
+            args.workers,
+            args.base_url,
+        )
+    )
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Generated image payloads shared by the benchmarks (no fixtures on disk).
+"""
+
+import io
+import struct
+import uuid
+import zlib
+
+from PIL import Image
+
+# Pillow format name -> (upload MIME type, file extension)
+FORMATS = {
+    "JPEG": ("image/jpeg", ".jpg"),
+    "PNG": ("image/png", ".png"),
+    "WEBP": ("image/webp", ".webp"),
+    "GIF": ("image/gif", ".gif"),
+}
+
+
+def make_image(width: int, height: int, fmt: str = "JPEG") -> bytes:
+    """
+    Smooth gradient picture: compresses like a photo rather than like noise, so sizes stay realistic.
+    """
+    red = Image.linear_gradient("L").resize((width, height))
+    green = Image.radial_gradient("L").resize((width, height))
+    blue = red.transpose(Image.Transpose.ROTATE_90).resize((width, height))
+    image = Image.merge("RGB", (red, green, blue))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **({"quality": 85} if fmt in ("JPEG", "WEBP") else {}))
+    return buffer.getvalue()
+
+
+def make_unique(payload: bytes, fmt: str) -> bytes:
+    """
+    Same picture, different bytes (and hash): a random comment is inserted after the header.
+    Cheap enough to run per request, so uploads never hit deduplication by accident.
+    """
+    marker = uuid.uuid4().hex.encode()
+    if fmt == "JPEG":
+        # COM segment right after SOI
+        return payload[:2] + b"\xff\xfe" + struct.pack(">H", len(marker) + 2) + marker + payload[2:]
+    if fmt == "PNG":
+        # tEXt chunk right after IHDR (8-byte signature + 25-byte IHDR chunk)
+        body = b"tEXt" + b"bench\x00" + marker
+        chunk = struct.pack(">I", len(body) - 4) + body + struct.pack(">I", zlib.crc32(body))
+        return payload[:33] + chunk + payload[33:]
+    raise ValueError(f"make_unique supports JPEG and PNG, not {fmt}")
@@ -0,0 +1,128 @@
+"""
+Microbenchmark: ORM hydration vs column projection for list endpoints.
+
+Compares the legacy path (ORM Image + File objects -> ImageRead.model_validate with
+per-item mime_map) against the projection path (JOIN row -> ImageRead.from_row).
+Both sides are serialized to JSON, as FastAPI would do for /media/feed.
+
+Usage:
+    python -m benchmarks.projection [--rows 100] [--repeat 200]
+"""
+
+import argparse
+import hashlib
+import json
+import time
+import uuid
+from collections import namedtuple
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from backend.apps.media.schemas.media import FileRead, ImageRead
+from backend.core.config import settings
+from backend.core.schemas.base import BaseResponse
+from backend.database.models import File, Image
+from pydantic import TypeAdapter, computed_field
+
+ProjectionRow = namedtuple(
+    "ProjectionRow",
+    ["id", "filename", "created_at", "hash", "size_bytes", "mime_type", "file_created_at"],
+)
+
+
+class LegacyImageRead(BaseResponse):
+    """
+    ImageRead as it was before the projection path (mime_map rebuilt per item).
+    """
+
+    id: uuid.UUID
+    filename: str
+    created_at: datetime
+    file: FileRead
+
+    @computed_field
+    def url(self) -> str:
+        h = self.file.hash
+        mime_map = {
+            "image/jpeg": ".jpg",
+            "image/png": ".png",
+            "image/gif": ".gif",
+            "image/webp": ".webp",
+        }
+        ext = mime_map.get(self.file.mime_type, "")
+        return f"{settings.SITE_URL}/media/storage/{h[:2]}/{h[2:4]}/{h}{ext}"
+
+    @computed_field
+    def src(self) -> str:
+        h = self.file.hash
+        return f"{settings.SITE_URL}/media/storage/{h[:2]}/{h[2:4]}/{h}_thumb.jpg"
+
+
+_LEGACY_LIST: TypeAdapter[list[LegacyImageRead]] = TypeAdapter(list[LegacyImageRead])
+_IMAGE_LIST: TypeAdapter[list[ImageRead]] = TypeAdapter(list[ImageRead])
+
+
+def _fixture(rows: int) -> list[ProjectionRow]:
+    now = datetime.now(UTC)
+    return [
+        ProjectionRow(
+            id=uuid.uuid4(),
+            filename=f"image_{i}.png",
+            created_at=now,
+            hash=hashlib.sha256(str(i).encode()).hexdigest(),
+            size_bytes=1024 + i,
+            mime_type="image/png",
+            file_created_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def _orm_path(data: list[ProjectionRow]) -> bytes:
+    images = []
+    for r in data:
+        file = File(hash=r.hash, size_bytes=r.size_bytes, mime_type=r.mime_type, path="", created_at=r.file_created_at)
+        images.append(Image(id=r.id, filename=r.filename, created_at=r.created_at, file_hash=r.hash, file=file))
+    items = [LegacyImageRead.model_validate(img) for img in images]
+    return _LEGACY_LIST.dump_json(items)
+
+
+def _projection_path(data: list[ProjectionRow]) -> bytes:
+    items = [ImageRead.from_row(r) for r in data]
+    return _IMAGE_LIST.dump_json(items)
+
+
+def _rows_per_sec(fn: Callable[[list[ProjectionRow]], bytes], data: list[ProjectionRow], repeat: int) -> float:
+    fn(data)  # warmup
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    elapsed = time.perf_counter() - start
+    return len(data) * repeat / elapsed
+
+
+def run(rows: int = 100, repeat: int = 200) -> dict[str, Any]:
+    data = _fixture(rows)
+    before = _rows_per_sec(_orm_path, data, repeat)
+    after = _rows_per_sec(_projection_path, data, repeat)
+    return {
+        "benchmark": "list_projection",
+        "rows": rows,
+        "repeat": repeat,
+        "orm_rows_per_sec": round(before, 1),
+        "projection_rows_per_sec": round(after, 1),
+        "speedup": round(after / before, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(rows=args.rows, repeat=args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
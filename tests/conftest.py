@@ -1,11 +1,17 @@
 import asyncio
 import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
 from typing import AsyncGenerator, Generator
 
 import pytest
 import pytest_asyncio
+from backend.core.config import settings
 from backend.core.database import get_db
+from backend.core.querylog import QueryBudget, QueryLog, count_queries, instrument_query_log
 from backend.database.models.base import Base
+from backend.dependencies.container import AppContainer
 from backend.main import app
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
@@ -31,6 +37,45 @@ TestingSessionLocal = async_sessionmaker(
 )
 
 
+instrument_query_log()
+
+
+@pytest.fixture
+def assert_max_queries() -> QueryBudget:
+    """
+    Query budget for one endpoint call:
+
+        with assert_max_queries(2):
+            await async_client.get("/api/v1/media/feed")
+
+    Fails with the list of executed statements if the block runs more than n of them.
+    """
+
+    @contextmanager
+    def check(n: int) -> Iterator[QueryLog]:
+        with count_queries() as log:
+            yield log
+        assert log.count <= n, f"Expected at most {n} queries, got {log.count}:\n{log.report()}"
+
+    return check
+
+
+@pytest.fixture(autouse=True)
+def _max_queries_marker(request: pytest.FixtureRequest) -> Iterator[None]:
+    """
+    @pytest.mark.max_queries(n): the same budget for the whole test (setup requests included).
+    """
+    marker = request.node.get_closest_marker("max_queries")
+    if marker is None:
+        yield
+        return
+
+    with count_queries() as log:
+        yield
+    n = marker.args[0]
+    assert log.count <= n, f"Expected at most {n} queries, got {log.count}:\n{log.report()}"
+
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     """Create an instance of the default event loop for each test case."""
@@ -61,11 +106,18 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 @pytest_asyncio.fixture(scope="function")
-async def async_client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def async_client(
+    db_session: AsyncSession, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[AsyncClient, None]:
     """
     HTTP Client fixture for integration tests.
     Overrides get_db dependency with test session.
+    ASGITransport does not run the lifespan, so the app container is built here (uploads go to tmp_path).
     """
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path / "uploads")
+    container = AppContainer.create()
+    app.state.container = container
+
     async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
         yield db_session
 
@@ -77,3 +129,4 @@ async def async_client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient,
         yield client
 
     app.dependency_overrides.clear()
+    await container.aclose()
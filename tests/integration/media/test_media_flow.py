@@ -1,7 +1,16 @@
+from datetime import timedelta
 from pathlib import Path
 
 import pytest
+from backend.apps.media.services.media_service import MediaService
+from backend.apps.users.services.api_key_service import ApiKeyService
+from backend.core.querylog import QueryBudget
+from backend.database.repositories.api_key_repository import ApiKeyRepository
+from backend.database.repositories.media_repository import MediaRepository
+from backend.database.repositories.user_repository import UserRepository
+from backend.main import app
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # --- Fixtures ---
 
@@ -37,7 +46,8 @@ async def test_media_upload_flow(
     async_client: AsyncClient, 
     sample_image: Path, 
     tmp_path: Path, 
-    monkeypatch: pytest.MonkeyPatch
+    monkeypatch: pytest.MonkeyPatch,
+    assert_max_queries: QueryBudget,
 ) -> None:
     """
     Test full media flow: Upload -> Feed -> Deduplication -> Delete
@@ -61,7 +71,9 @@ async def test_media_upload_flow(
     # 2. Upload Image
     with open(sample_image, "rb") as f:
         files = {"file": ("my_cat.png", f, "image/png")}
-        response = await async_client.post("/api/v1/media/upload", files=files, headers=headers)
+        # Auth, hash lookup; blob store on its own session: lock, re-check, files upsert; image insert
+        with assert_max_queries(6):
+            response = await async_client.post("/api/v1/media/upload", files=files, headers=headers)
     
     assert response.status_code == 201
     data = response.json()
@@ -71,7 +83,8 @@ async def test_media_upload_flow(
     file_hash = data["file"]["hash"]
 
     # 3. Verify Feed
-    response = await async_client.get("/api/v1/media/feed")
+    with assert_max_queries(1):
+        response = await async_client.get("/api/v1/media/feed")
     assert response.status_code == 200
     feed = response.json()
     assert len(feed) > 0
@@ -80,7 +93,9 @@ async def test_media_upload_flow(
     # 4. Upload Duplicate (Deduplication Test)
     with open(sample_image, "rb") as f:
         files = {"file": ("my_cat_copy.png", f, "image/png")}
-        response = await async_client.post("/api/v1/media/upload", files=files, headers=headers)
+        # Dedup hit: hash lookup and insert only (user served from the cache)
+        with assert_max_queries(2):
+            response = await async_client.post("/api/v1/media/upload", files=files, headers=headers)
     
     assert response.status_code in [200, 201]
     data_2 = response.json()
@@ -90,7 +105,8 @@ async def test_media_upload_flow(
     assert data_2["file"]["hash"] == file_hash # Same File Hash
 
     # 5. Delete First Image (File should remain)
-    response = await async_client.delete(f"/api/v1/media/{image_id_1}", headers=headers)
+    with assert_max_queries(4):
+        response = await async_client.delete(f"/api/v1/media/{image_id_1}", headers=headers)
     assert response.status_code in [200, 204]
 
     # Check if file still exists on disk (mocked check via API or assumption)
@@ -103,6 +119,35 @@ async def test_media_upload_flow(
     response = await async_client.delete(f"/api/v1/media/{image_id_2}", headers=headers)
     assert response.status_code in [200, 204]
 
+@pytest.mark.asyncio
+async def test_upload_with_api_key(async_client: AsyncClient, db_session: AsyncSession, sample_image: Path) -> None:
+    """
+    Test server-to-server access: upload and own gallery with X-API-Key, scopes enforced.
+    """
+    service = ApiKeyService(ApiKeyRepository(session=db_session), UserRepository(session=db_session))
+    write_key = await service.issue_key(name="shop-cdn", owner_email="cdn@shop.example", scopes=["media:write"])
+    read_key = await service.issue_key(name="shop-read", owner_email="cdn@shop.example", scopes=["media:read"])
+    await service.load_index(app.state.container.api_keys)
+
+    with open(sample_image, "rb") as f:
+        files = {"file": ("product.png", f, "image/png")}
+        response = await async_client.post("/api/v1/media/upload", files=files, headers={"X-API-Key": write_key})
+    assert response.status_code == 201
+    image_id = response.json()["id"]
+
+    response = await async_client.get("/api/v1/media/my", headers={"X-API-Key": read_key})
+    assert response.status_code == 200
+    assert [img["id"] for img in response.json()] == [image_id]
+
+    # Scope and revocation
+    response = await async_client.get("/api/v1/media/my", headers={"X-API-Key": write_key})
+    assert response.status_code == 403
+
+    await service.revoke_key("shop-read")
+    await service.load_index(app.state.container.api_keys)
+    response = await async_client.get("/api/v1/media/my", headers={"X-API-Key": read_key})
+    assert response.status_code == 401
+
 @pytest.mark.asyncio
 async def test_upload_invalid_file_type(
     async_client: AsyncClient, 
@@ -218,3 +263,203 @@ async def test_delete_other_user_image(
 
     # Should be Forbidden
     assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_search_by_filename(
+    async_client: AsyncClient,
+    sample_image: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    assert_max_queries: QueryBudget,
+) -> None:
+    """
+    Test filename search: scoping, case-insensitive match and cursor pagination.
+    """
+    from backend.core.config import settings
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path / "uploads")
+
+    email = "searcher@example.com"
+    password = "password123"
+    await async_client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    login_res = await async_client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password}
+    )
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+    for name in ["Holiday_1.png", "holiday_2.png", "work.png"]:
+        with open(sample_image, "rb") as f:
+            files = {"file": (name, f, "image/png")}
+            await async_client.post("/api/v1/media/upload", files=files, headers=headers)
+
+    # Own gallery requires auth
+    response = await async_client.get("/api/v1/media/search", params={"q": "holiday"})
+    assert response.status_code == 401
+
+    # First page: one search query (user served from the cache)
+    with assert_max_queries(1):
+        response = await async_client.get("/api/v1/media/search", params={"q": "HOLIDAY", "limit": 1}, headers=headers)
+    assert response.status_code == 200
+    page = response.json()
+    assert [img["filename"] for img in page["items"]] == ["holiday_2.png"]
+    assert page["next_cursor"] is not None
+
+    # Second (last) page: the cursor is a keyset, still one query
+    with assert_max_queries(1):
+        response = await async_client.get(
+            "/api/v1/media/search",
+            params={"q": "holiday", "limit": 1, "cursor": page["next_cursor"]},
+            headers=headers,
+        )
+    page = response.json()
+    assert [img["filename"] for img in page["items"]] == ["Holiday_1.png"]
+    assert page["next_cursor"] is None
+
+    # Public scope works anonymously; LIKE wildcards are matched literally
+    with assert_max_queries(1):
+        response = await async_client.get("/api/v1/media/search", params={"q": "y_1", "scope": "public"})
+    assert [img["filename"] for img in response.json()["items"]] == ["Holiday_1.png"]
+    response = await async_client.get("/api/v1/media/search", params={"q": "%%%", "scope": "public"})
+    assert response.json()["items"] == []
+
+@pytest.mark.asyncio
+async def test_tags_filter_and_facets(
+    async_client: AsyncClient,
+    sample_image: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    assert_max_queries: QueryBudget,
+) -> None:
+    """
+    Test bulk tagging, AND/OR feed filtering and incremental facet counts.
+    """
+    from backend.core.config import settings
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path / "uploads")
+
+    email = "tagger@example.com"
+    password = "password123"
+    await async_client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    login_res = await async_client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password}
+    )
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+    image_ids = []
+    for name in ["a.png", "b.png"]:
+        with open(sample_image, "rb") as f:
+            files = {"file": (name, f, "image/png")}
+            response = await async_client.post("/api/v1/media/upload", files=files, headers=headers)
+        image_ids.append(response.json()["id"])
+    image_a, image_b = image_ids
+
+    # Tag both as "cat", only A as "Sea"
+    # Ownership count, tag upsert, links + counters, tags read back (user served from the cache)
+    with assert_max_queries(4):
+        response = await async_client.post(
+            "/api/v1/media/tags/attach", json={"image_ids": image_ids, "tags": ["cat"]}, headers=headers
+        )
+    assert response.status_code == 200
+    assert response.json() == [{"name": "cat", "image_count": 2}]
+    await async_client.post(
+        "/api/v1/media/tags/attach", json={"image_ids": [image_a], "tags": ["Sea"]}, headers=headers
+    )
+
+    # Re-attaching is idempotent for counts
+    response = await async_client.post(
+        "/api/v1/media/tags/attach", json={"image_ids": image_ids, "tags": ["cat"]}, headers=headers
+    )
+    assert response.json() == [{"name": "cat", "image_count": 2}]
+
+    # Facets: counters only
+    with assert_max_queries(1):
+        response = await async_client.get("/api/v1/media/tags")
+    assert response.json() == [{"name": "cat", "image_count": 2}, {"name": "sea", "image_count": 1}]
+
+    # OR / AND filtering: the tag filter is part of the listing query
+    with assert_max_queries(1):
+        response = await async_client.get("/api/v1/media/feed", params={"tags": ["cat", "sea"]})
+    assert {img["id"] for img in response.json()} == {image_a, image_b}
+    with assert_max_queries(1):
+        response = await async_client.get(
+            "/api/v1/media/my", params={"tags": ["cat", "sea"], "tag_mode": "all"}, headers=headers
+        )
+    assert [img["id"] for img in response.json()] == [image_a]
+
+    # Detach + delete keep counters in sync
+    # Ownership count, links + counters, tags read back
+    with assert_max_queries(3):
+        await async_client.post(
+            "/api/v1/media/tags/detach", json={"image_ids": [image_a], "tags": ["sea"]}, headers=headers
+        )
+    await async_client.delete(f"/api/v1/media/{image_b}", headers=headers)
+    response = await async_client.get("/api/v1/media/tags")
+    assert response.json() == [{"name": "cat", "image_count": 1}]
+
+    # Other users cannot tag my images
+    await async_client.post("/api/v1/auth/register", json={"email": "other@example.com", "password": password})
+    other_login = await async_client.post(
+        "/api/v1/auth/login",
+        data={"username": "other@example.com", "password": password}
+    )
+    other_headers = {"Authorization": f"Bearer {other_login.json()['access_token']}"}
+    response = await async_client.post(
+        "/api/v1/media/tags/attach", json={"image_ids": [image_a], "tags": ["mine"]}, headers=other_headers
+    )
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_batch_delete_collects_files(
+    async_client: AsyncClient,
+    db_session: AsyncSession,
+    sample_image: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    assert_max_queries: QueryBudget,
+) -> None:
+    """
+    Test batch delete + deferred GC: the shared file survives the delete
+    and is collected by the sweeper once the grace period is over.
+    """
+    from backend.core.config import settings
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path / "uploads")
+
+    email = "batch_user@example.com"
+    password = "password123"
+    await async_client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    login_res = await async_client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": password}
+    )
+    headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+    image_ids = []
+    for name in ["one.png", "two.png"]:
+        with open(sample_image, "rb") as f:
+            files = {"file": (name, f, "image/png")}
+            response = await async_client.post("/api/v1/media/upload", files=files, headers=headers)
+        image_ids.append(response.json()["id"])
+    file_hash = response.json()["file"]["hash"]
+    await async_client.post(
+        "/api/v1/media/tags/attach", json={"image_ids": image_ids, "tags": ["pair"]}, headers=headers
+    )
+
+    # Ownership count, tag unlink + counters, delete (files are flagged by the images trigger)
+    with assert_max_queries(3):
+        response = await async_client.post(
+            "/api/v1/media/delete/batch", json={"image_ids": image_ids}, headers=headers
+        )
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 2}
+
+    assert (await async_client.get("/api/v1/media/my", headers=headers)).json() == []
+    assert (await async_client.get("/api/v1/media/tags")).json() == [{"name": "pair", "image_count": 0}]
+
+    # The delete flagged the file (nothing to unflag), but within the grace period it is not collected
+    service = MediaService(MediaRepository(session=db_session))
+    assert await service.mark_garbage(batch_size=100) == 0
+    assert await service.collect_garbage(grace_period=timedelta(hours=1), batch_size=100) == 0
+    assert (await async_client.get(f"/api/v1/media/{file_hash}")).status_code == 200
+
+    assert await service.collect_garbage(grace_period=timedelta(0), batch_size=100) == 1
+    assert (await async_client.get(f"/api/v1/media/{file_hash}")).status_code == 404
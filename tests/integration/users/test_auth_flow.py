@@ -1,32 +1,44 @@
 import asyncio
+from datetime import UTC, datetime, timedelta
 
 import pytest
+from backend.apps.users.services.auth_service import AuthService
+from backend.core.querylog import QueryBudget
+from backend.core.security import hash_token
+from backend.database.models import RefreshToken
+from backend.database.repositories.token_repository import TokenRepository
+from backend.database.repositories.user_repository import UserRepository
 from httpx import AsyncClient
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 @pytest.mark.asyncio
-async def test_auth_flow_full_cycle(async_client: AsyncClient) -> None:
+async def test_auth_flow_full_cycle(async_client: AsyncClient, assert_max_queries: QueryBudget) -> None:
     """
     Полный цикл: Регистрация -> Логин -> Профиль -> Рефреш -> Логаут
+    Бюджет запросов на каждую ручку ловит лишние SELECT/refresh.
     """
     email = "flow_user@example.com"
     password = "securePassword123!"
 
     # 1. Register
-    response = await async_client.post("/api/v1/auth/register", json={
-        "email": email,
-        "password": password
-    })
+    with assert_max_queries(2):
+        response = await async_client.post("/api/v1/auth/register", json={
+            "email": email,
+            "password": password
+        })
     assert response.status_code == 201
     data = response.json()
     assert data["email"] == email
     assert "id" in data
 
     # 2. Login
-    response = await async_client.post("/api/v1/auth/login", data={
-        "username": email,
-        "password": password
-    })
+    with assert_max_queries(2):
+        response = await async_client.post("/api/v1/auth/login", data={
+            "username": email,
+            "password": password
+        })
     assert response.status_code == 200
     tokens = response.json()
     assert "access_token" in tokens
@@ -35,9 +47,10 @@ async def test_auth_flow_full_cycle(async_client: AsyncClient) -> None:
     refresh_token = tokens["refresh_token"]
 
     # 3. Get Me (Profile)
-    response = await async_client.get("/api/v1/users/me", headers={
-        "Authorization": f"Bearer {access_token}"
-    })
+    with assert_max_queries(1):
+        response = await async_client.get("/api/v1/users/me", headers={
+            "Authorization": f"Bearer {access_token}"
+        })
     assert response.status_code == 200
     profile = response.json()
     assert profile["email"] == email
@@ -46,26 +59,30 @@ async def test_auth_flow_full_cycle(async_client: AsyncClient) -> None:
     await asyncio.sleep(1.1)
 
     # 4. Refresh Token
-    response = await async_client.post("/api/v1/auth/refresh", json={
-        "refresh_token": refresh_token
-    })
+    with assert_max_queries(1):
+        response = await async_client.post("/api/v1/auth/refresh", json={
+            "refresh_token": refresh_token
+        })
     assert response.status_code == 200
     new_tokens = response.json()
     assert new_tokens["access_token"] != access_token
     new_access_token = new_tokens["access_token"]
 
     # 5. Check Old Access Token (Should still be valid until expiration, but let's check new one)
-    response = await async_client.get("/api/v1/users/me", headers={
-        "Authorization": f"Bearer {new_access_token}"
-    })
+    # Served from the user cache
+    with assert_max_queries(0):
+        response = await async_client.get("/api/v1/users/me", headers={
+            "Authorization": f"Bearer {new_access_token}"
+        })
     assert response.status_code == 200
 
     # 6. Logout
     # Assuming logout endpoint takes refresh token to invalidate it
     # Check API spec: usually logout invalidates the refresh token
-    response = await async_client.post("/api/v1/auth/logout", json={
-        "refresh_token": refresh_token
-    })
+    with assert_max_queries(1):
+        response = await async_client.post("/api/v1/auth/logout", json={
+            "refresh_token": refresh_token
+        })
     # If logout is implemented as 204 or 200
     assert response.status_code in [200, 204]
 
@@ -75,7 +92,67 @@ async def test_auth_flow_full_cycle(async_client: AsyncClient) -> None:
     })
     assert response.status_code == 401
 
+@pytest.mark.asyncio
+async def test_refresh_token_rotates_once(async_client: AsyncClient) -> None:
+    """
+    Ротация одним запросом: старый токен одноразовый, новый сразу рабочий.
+    """
+    email = "rotate_user@example.com"
+    password = "securePassword123!"
+    await async_client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    response = await async_client.post("/api/v1/auth/login", data={"username": email, "password": password})
+    old_token = response.json()["refresh_token"]
+
+    response = await async_client.post("/api/v1/auth/refresh", json={"refresh_token": old_token})
+    assert response.status_code == 200
+    new_token = response.json()["refresh_token"]
+
+    response = await async_client.post("/api/v1/auth/refresh", json={"refresh_token": old_token})
+    assert response.status_code == 401
+
+    response = await async_client.post("/api/v1/auth/refresh", json={"refresh_token": new_token})
+    assert response.status_code == 200
+
 @pytest.mark.asyncio
 async def test_access_protected_route_without_token(async_client: AsyncClient) -> None:
     response = await async_client.get("/api/v1/users/me")
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_expired_refresh_tokens_are_swept(async_client: AsyncClient, db_session: AsyncSession) -> None:
+    """
+    Токены хранятся как SHA-256, а просроченные удаляются батчами; живые не трогаются.
+    """
+    email = "sweep_user@example.com"
+    password = "securePassword123!"
+    await async_client.post("/api/v1/auth/register", json={"email": email, "password": password})
+    refresh_tokens = []
+    for _ in range(4):
+        response = await async_client.post("/api/v1/auth/login", data={"username": email, "password": password})
+        refresh_tokens.append(response.json()["refresh_token"])
+    *expired_tokens, live_token = refresh_tokens
+
+    # Stored only as a digest
+    stored = (await db_session.execute(select(RefreshToken.token_hash))).scalars().all()
+    assert sorted(stored) == sorted(hash_token(token) for token in refresh_tokens)
+
+    # Expire three of them and sweep with a batch smaller than the backlog
+    await db_session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash.in_([hash_token(token) for token in expired_tokens]))
+        .values(expires_at=datetime.now(UTC) - timedelta(days=1))
+    )
+    await db_session.commit()
+
+    service = AuthService(UserRepository(session=db_session), TokenRepository(session=db_session))
+    assert [await service.purge_expired_tokens(batch_size=1) for _ in range(4)] == [1, 1, 1, 0]
+
+    remaining = (await db_session.execute(select(RefreshToken.token_hash))).scalars().all()
+    assert remaining == [hash_token(live_token)]
+
+    for token in expired_tokens:
+        response = await async_client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+        assert response.status_code == 401
+    response = await async_client.post("/api/v1/auth/refresh", json={"refresh_token": live_token})
+    assert response.status_code == 200
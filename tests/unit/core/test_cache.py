@@ -0,0 +1,37 @@
+from backend.core.cache import TTLCache
+
+
+def test_entries_expire_after_ttl() -> None:
+    """
+    Test that expired entries are treated as missing and dropped.
+    """
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    # Expire the entry without sleeping
+    cache._data["a"] = (0.0, 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_is_evicted() -> None:
+    """
+    Test that the cache stays bounded and evicts the least recently used key.
+    """
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_zero_ttl_disables_cache() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
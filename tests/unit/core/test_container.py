@@ -0,0 +1,44 @@
+import threading
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from backend.apps.media.contracts.media_repository import IMediaRepository
+from backend.apps.media.services.media_service import MediaService
+from backend.core.config import settings
+from backend.dependencies.container import AppContainer
+
+
+@pytest.mark.asyncio
+async def test_container_lifecycle(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that the container is built once from settings, feeds services, and closes its pool.
+    """
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path)
+    container = AppContainer.create()
+    assert container.storage.storage_dir == tmp_path / "storage"
+    assert container.storage.temp_dir.is_dir()
+
+    service = MediaService(
+        AsyncMock(spec=IMediaRepository), storage=container.storage, imaging_pool=container.imaging_pool
+    )
+    thread_name = await service._run_imaging(lambda: threading.current_thread().name)
+    assert thread_name.startswith("imaging")
+
+    await container.aclose()
+    with pytest.raises(RuntimeError):
+        container.imaging_pool.submit(print)
+
+
+@pytest.mark.asyncio
+async def test_container_without_user_invalidation_caches_no_users(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Test that a container built without a way to invalidate users across workers does not cache them.
+    """
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path)
+    container = AppContainer.create(cache_users=False)
+
+    assert not container.user_cache.enabled
+    await container.aclose()
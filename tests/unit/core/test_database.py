@@ -0,0 +1,136 @@
+import contextvars
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from backend.core import database
+from backend.core.config import settings
+from backend.core.database import PrimarySession, ReadSession, is_pinned_to_primary, set_db_reader
+from starlette.types import Message, Receive, Scope, Send
+
+
+@pytest.fixture
+def replica(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    engine = MagicMock()
+    monkeypatch.setattr(database, "read_engine", engine)
+    monkeypatch.setattr(database, "_pinned_until", {})
+    return engine
+
+
+def test_reads_go_to_replica_until_reader_writes(replica: MagicMock) -> None:
+    """
+    Test read-your-writes: a commit on the primary pins that reader's reads to the primary.
+    """
+    def scenario() -> None:
+        session = ReadSession()
+        set_db_reader("user-1")
+        assert session.get_bind() is replica.sync_engine
+
+        database._after_primary_commit(PrimarySession())
+
+        assert is_pinned_to_primary()
+        assert session.get_bind() is database.async_engine.sync_engine
+
+    contextvars.copy_context().run(scenario)
+
+
+def test_pin_is_per_reader_and_expires(replica: MagicMock) -> None:
+    """
+    Test that pins do not leak to other readers and lapse after READ_YOUR_WRITES_SECONDS.
+    """
+    def write_as_user_1() -> None:
+        set_db_reader("user-1")
+        database._after_primary_commit(PrimarySession())
+
+    def read_as(key: str) -> bool:
+        set_db_reader(key)
+        return is_pinned_to_primary()
+
+    contextvars.copy_context().run(write_as_user_1)
+
+    assert contextvars.copy_context().run(read_as, "user-1")
+    assert not contextvars.copy_context().run(read_as, "user-2")
+
+    database._pinned_until["user-1"] = 0.0  # deadline passed
+    assert not contextvars.copy_context().run(read_as, "user-1")
+
+
+@pytest.mark.asyncio
+async def test_pin_crosses_workers_via_cookie(replica: MagicMock) -> None:
+    """
+    Test that a write sets the pin cookie, and a request carrying it is pinned on a worker that never saw the write.
+    """
+    pinned: list[bool] = []
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        pinned.append(database.is_pinned_to_primary())
+        if scope["path"] == "/write":
+            database._after_primary_commit(PrimarySession())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def request(path: str, cookie: bytes | None = None) -> list[tuple[bytes, bytes]]:
+        sent: list[Message] = []
+
+        async def send(message: Message) -> None:
+            sent.append(message)
+
+        headers = [(b"cookie", cookie)] if cookie else []
+        scope = {"type": "http", "path": path, "headers": headers}
+        await database.ReadYourWritesMiddleware(app)(scope, MagicMock(), send)
+        return list(sent[0]["headers"])
+
+    # Write on "worker A": the response carries the pin
+    headers = await request("/write")
+    cookie = dict(headers)[b"set-cookie"].split(b";")[0]
+    assert cookie.startswith(database.PRIMARY_PIN_COOKIE.encode())
+
+    database._pinned_until.clear()  # "worker B" has no in-process pin
+    await request("/read", cookie)
+    assert pinned == [False, True]
+
+    # Reads without writes set no cookie; a forged far-future pin is capped
+    assert await request("/read") == []
+    far = f"{database.PRIMARY_PIN_COOKIE}={time.time() + 3600}".encode()
+    assert database._client_pin({"headers": [(b"cookie", far)]}) <= time.time() + settings.READ_YOUR_WRITES_SECONDS
+
+
+def test_connection_args_follow_profile(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that the pgbouncer profile disables statement caches and direct keeps them.
+    """
+    monkeypatch.setattr(settings, "DB_PROFILE", "direct")
+    _, direct = database._connection_args("postgresql+asyncpg://u:p@db/app")
+    assert direct["prepared_statement_cache_size"] == settings.DB_STATEMENT_CACHE_SIZE
+    assert "statement_cache_size" not in direct
+
+    monkeypatch.setattr(settings, "DB_PROFILE", "pgbouncer")
+    url, bouncer = database._connection_args("postgresql+asyncpg://u:p@db/app?sslmode=require")
+    assert bouncer["prepared_statement_cache_size"] == 0
+    assert bouncer["statement_cache_size"] == 0
+    assert bouncer["prepared_statement_name_func"]() != bouncer["prepared_statement_name_func"]()
+    assert bouncer["ssl"] == "require"
+    assert url == "postgresql+asyncpg://u:p@db/app"
+
+
+def test_pool_status_reports_checkout_wait_per_engine(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that checkout waits are recorded per pool: replica waits do not show up as primary ones.
+    """
+    primary = database.TimedAsyncQueuePool(MagicMock(), pool_size=3)
+    replica = database.TimedAsyncQueuePool(MagicMock(), pool_size=2)
+    monkeypatch.setattr(database, "async_engine", MagicMock(sync_engine=MagicMock(pool=primary)))
+    monkeypatch.setattr(database, "read_engine", MagicMock(sync_engine=MagicMock(pool=replica)))
+    primary.stats.observe(0.002)
+    primary.stats.observe(0.004)
+    replica.stats.observe(0.010)
+
+    status = database.get_pool_status()
+
+    assert status["primary"]["checkouts"] == 2
+    assert status["primary"]["checkout_wait_avg_ms"] == 3.0
+    assert status["primary"]["checkout_wait_max_ms"] == 4.0
+    assert status["primary"]["size"] == 3
+    assert status["replica"]["checkouts"] == 1
+    assert status["replica"]["checkout_wait_max_ms"] == 10.0
+    assert status["replica"]["size"] == 2
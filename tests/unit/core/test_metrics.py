@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from backend.core.metrics import MetricsMiddleware, render_metrics, sample_runtime_metrics
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+ROUTE = "/api/items/{item_id}"
+
+
+def _request_count(status: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "pinlite_http_request_duration_seconds_count", {"method": "GET", "route": ROUTE, "status": status}
+    )
+    return value or 0.0
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template() -> None:
+    """
+    Latency is recorded per route template and status, so item ids don't blow up label cardinality.
+    """
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict[str, int]:
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.add_middleware(MetricsMiddleware)
+    before_ok, before_invalid = _request_count("200"), _request_count("422")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/api/items/1")).status_code == 200
+        assert (await client.get("/api/items/2")).status_code == 200
+        assert (await client.get("/api/items/abc")).status_code == 422
+
+    assert _request_count("200") == before_ok + 2
+    assert _request_count("422") == before_invalid + 1
+    assert b"pinlite_http_request_duration_seconds_bucket" in render_metrics()[0]
+
+
+@pytest.mark.asyncio
+async def test_sampler_reports_threadpool_queue_depth() -> None:
+    """
+    Jobs queued behind a busy worker show up in the queue depth gauge.
+    """
+    release = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=1)
+    futures = [pool.submit(release.wait) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    sample_runtime_metrics({"imaging": pool})
+
+    assert REGISTRY.get_sample_value("pinlite_threadpool_queue_depth", {"pool": "imaging"}) == 2
+    assert REGISTRY.get_sample_value("pinlite_db_pool_connections", {"state": "checked_out"}) == 0
+
+    release.set()
+    for future in futures:
+        future.result()
+    pool.shutdown()
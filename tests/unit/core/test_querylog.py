@@ -0,0 +1,61 @@
+import pytest
+from backend.core.querylog import QueryLogMiddleware, count_queries, instrument_query_log, statement_shape
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+
+def test_statement_shape_collapses_params_and_in_lists() -> None:
+    first = statement_shape("SELECT * FROM tags\n WHERE id = $1 AND name IN ($2, $3, $4)")
+    second = statement_shape("SELECT * FROM tags WHERE id = $7 AND name IN ($8)")
+
+    assert first == "SELECT * FROM tags WHERE id = ? AND name IN (?, ...)"
+    assert second == "SELECT * FROM tags WHERE id = ? AND name IN (?)"
+
+
+def test_nested_logs_both_count() -> None:
+    """
+    A test-level budget still sees queries made inside a request that has its own log.
+    """
+    engine = create_engine("sqlite://")
+    instrument_query_log()
+
+    with count_queries() as outer:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with count_queries() as inner:
+                conn.execute(text("SELECT 2"))
+
+    assert outer.count == 2
+    assert inner.count == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_is_reported(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    A request running the same statement in a loop gets a QueryLog warning.
+    """
+    engine = create_engine("sqlite://")
+    instrument_query_log()
+    app = FastAPI()
+    app.add_middleware(QueryLogMiddleware)
+
+    @app.get("/n-plus-one")
+    def n_plus_one() -> dict[str, int]:
+        with engine.connect() as conn:
+            for i in range(7):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {"ok": 1}
+
+    messages: list[str] = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/n-plus-one")).status_code == 200
+    finally:
+        logger.remove(sink)
+
+    assert len(messages) == 1
+    assert "action=repeated_statement" in messages[0]
+    assert "route=/n-plus-one times=7 total_queries=7" in messages[0]
@@ -0,0 +1,77 @@
+import pytest
+from backend.core.ratelimit import LoginThrottle
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr("backend.core.ratelimit.time.monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def throttle() -> LoginThrottle:
+    return LoginThrottle(
+        account_burst=3, account_per_minute=6, ip_burst=5, ip_per_minute=60, backoff_after=2, backoff_max=30
+    )
+
+
+def test_account_bucket_refills(throttle: LoginThrottle, clock: FakeClock) -> None:
+    """
+    Test that a burst is allowed, then attempts wait for the next token (6/min = one per 10s).
+    """
+    assert [throttle.acquire("a@example.com", None) for _ in range(3)] == [0, 0, 0]
+    assert throttle.acquire("A@example.com ", None) == pytest.approx(10)  # same account
+
+    clock.now += 10
+    assert throttle.acquire("a@example.com", None) == 0
+
+
+def test_ip_bucket_spans_accounts(throttle: LoginThrottle, clock: FakeClock) -> None:
+    """
+    Test that one IP can't spray many accounts past its own bucket.
+    """
+    for i in range(5):
+        assert throttle.acquire(f"user{i}@example.com", "10.0.0.1") == 0
+
+    assert throttle.acquire("other@example.com", "10.0.0.1") > 0
+    assert throttle.acquire("other@example.com", "10.0.0.2") == 0
+
+
+def test_failures_back_off_progressively(throttle: LoginThrottle, clock: FakeClock) -> None:
+    """
+    Test that failures beyond the free ones lock the account for 1, 2, 4 ... seconds, capped.
+    """
+    throttle.record_failure("a@example.com")
+    throttle.record_failure("a@example.com")
+    assert throttle.acquire("a@example.com", None) == 0  # free failures used up, no lock yet
+
+    waits = []
+    for _ in range(7):
+        throttle.record_failure("a@example.com")
+        waits.append(throttle.acquire("a@example.com", None))
+    assert waits == [1, 2, 4, 8, 16, 30, 30]
+
+    throttle.record_success("a@example.com")
+    clock.now += 60
+    assert throttle.acquire("a@example.com", None) == 0
+
+
+def test_backoff_survives_unbounded_failures(throttle: LoginThrottle, clock: FakeClock) -> None:
+    """
+    Test that a sustained attack (thousands of failures) keeps the lock at backoff_max instead of overflowing.
+    """
+    for _ in range(5000):
+        throttle.record_failure("a@example.com")
+        clock.now += 31  # one attempt per expired lock
+
+    throttle.record_failure("a@example.com")
+    assert throttle.acquire("a@example.com", None) == 30
@@ -0,0 +1,77 @@
+from datetime import UTC, datetime
+from uuid import uuid4
+
+import pytest
+from backend.apps.media.schemas.media import FileRead, ImageRead, TagRead
+from backend.apps.users.schemas.user import UserResponse
+from backend.core.responses import FastJSONResponse
+from backend.main import app
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+
+
+def _image(name: str) -> ImageRead:
+    now = datetime.now(UTC)
+    file = FileRead(hash="ab" * 32, size_bytes=100, mime_type="image/png", created_at=now)
+    return ImageRead(id=uuid4(), filename=name, created_at=now, file=file)
+
+
+def test_image_list_bytes_match_default_encoder() -> None:
+    images = [_image("cat.png"), _image("кот ☃.png")]
+
+    assert FastJSONResponse(images).body == JSONResponse(jsonable_encoder(images)).body
+
+
+def test_user_response_bytes_match_default_encoder() -> None:
+    user = UserResponse(
+        id=uuid4(),
+        email="test@example.com",
+        is_active=True,
+        is_superuser=False,
+        created_at=datetime.now(UTC),
+    )
+
+    assert FastJSONResponse(user).body == JSONResponse(jsonable_encoder(user)).body
+
+
+def test_plain_payloads_match_default_encoder() -> None:
+    for payload in ([], {"status": "ok"}, {"error": {"code": "not_found", "message": "Не найдено"}}):
+        assert FastJSONResponse(payload).body == JSONResponse(payload).body
+
+
+def test_mixed_and_empty_lists_render_each_item_by_its_type() -> None:
+    tag = TagRead(name="cat", image_count=2)
+    mixed = [_image("cat.png"), tag, {"plain": 1}]
+
+    assert FastJSONResponse(mixed).body == JSONResponse(jsonable_encoder(mixed)).body
+    assert FastJSONResponse([]).body == b"[]"
+
+
+@pytest.mark.asyncio
+async def test_routes_filter_by_declared_response_model() -> None:
+    class Public(BaseModel):
+        name: str
+
+    class Private(Public):
+        secret: str
+
+    demo = FastAPI(default_response_class=FastJSONResponse)
+
+    @demo.get("/items", response_model=list[Public])
+    async def items() -> list[Public]:
+        return [Private(name="a", secret="s"), Public(name="b")]
+
+    async with AsyncClient(transport=ASGITransport(app=demo), base_url="http://test") as client:
+        response = await client.get("/items")
+
+    assert response.json() == [{"name": "a"}, {"name": "b"}]
+
+
+def test_openapi_keeps_response_models() -> None:
+    schema = app.openapi()
+    feed = schema["paths"]["/api/v1/media/feed"]["get"]["responses"]["200"]["content"]["application/json"]
+
+    assert feed["schema"]["items"]["$ref"].endswith("/ImageRead")
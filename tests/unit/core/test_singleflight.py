@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from backend.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution() -> None:
+    """
+    Test that concurrent callers with the same key run fn once and share the result.
+    """
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+
+    assert calls == 1
+    assert [value for value, _ in results] == [42] * 10
+    assert sum(shared for _, shared in results) == 9
+
+    # Key is released once the call finishes
+    await flight.do("key", work)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_and_key_released() -> None:
+    """
+    Test that a failing call propagates to all waiters and does not stick.
+    """
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight._calls == {}
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+from backend.core.timing import RequestTiming, ServerTimingMiddleware, instrument_queries, span
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+
+def test_span_outside_request_is_noop() -> None:
+    """
+    Spans in background tasks (no timed request) record nothing and don't fail.
+    """
+    with span("imaging"):
+        pass
+
+
+def test_server_timing_header_format() -> None:
+    timing = RequestTiming()
+    timing.add("db", 0.002)
+    timing.add("db", 0.001)
+    timing.add("auth", 0.0005)
+
+    assert timing.server_timing(0.01) == 'db;dur=3.0;desc="2 queries", auth;dur=0.5, total;dur=10.0'
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_spans_and_queries() -> None:
+    """
+    Spans and queries of a request end up in its Server-Timing header.
+    """
+    engine = create_engine("sqlite://")
+    instrument_queries()
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/work")
+    def work() -> dict[str, int]:
+        with span("imaging"):
+            time.sleep(0.01)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"ok": 1}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/work")
+
+    metrics = {part.split(";")[0]: part for part in response.headers["server-timing"].split(", ")}
+    assert set(metrics) == {"imaging", "db", "total"}
+    assert float(metrics["imaging"].split("dur=")[1]) >= 10
+    assert metrics["db"].endswith('desc="2 queries"')
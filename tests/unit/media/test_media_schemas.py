@@ -0,0 +1,50 @@
+from collections import namedtuple
+from datetime import UTC, datetime
+from uuid import uuid4
+
+import pytest
+from backend.apps.media.schemas.media import STORAGE_URL_PREFIX, ImageRead, TagsUpdate, normalize_tags
+from backend.database.models.media import File, Image
+
+Row = namedtuple(
+    "Row",
+    ["id", "filename", "created_at", "hash", "size_bytes", "mime_type", "file_created_at"],
+)
+
+
+def test_from_row_matches_orm_validation() -> None:
+    """
+    Projection rows must serialize exactly like ORM objects did.
+    """
+    now = datetime.now(UTC)
+    file_hash = "ab" * 32
+    row = Row(
+        id=uuid4(),
+        filename="cat.png",
+        created_at=now,
+        hash=file_hash,
+        size_bytes=100,
+        mime_type="image/png",
+        file_created_at=now,
+    )
+    file = File(hash=file_hash, size_bytes=100, mime_type="image/png", path="", created_at=now)
+    image = Image(id=row.id, filename="cat.png", created_at=now, file_hash=file_hash, file=file)
+
+    projected = ImageRead.from_row(row)
+
+    assert projected.model_dump_json() == ImageRead.model_validate(image).model_dump_json()
+    dumped = projected.model_dump()
+    assert dumped["url"] == f"{STORAGE_URL_PREFIX}/ab/ab/{file_hash}.png"
+    assert dumped["src"] == f"{STORAGE_URL_PREFIX}/ab/ab/{file_hash}_thumb.jpg"
+
+
+def test_normalize_tags() -> None:
+    assert normalize_tags(["  Sea  View ", "sea view", "", "CAT"]) == ["sea view", "cat"]
+
+
+def test_tags_update_rejects_blank_and_long_tags() -> None:
+    with pytest.raises(ValueError):
+        TagsUpdate(image_ids=[uuid4()], tags=["   "])
+
+    with pytest.raises(ValueError):
+        TagsUpdate(image_ids=[uuid4()], tags=["x" * 51])
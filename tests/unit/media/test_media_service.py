@@ -1,13 +1,45 @@
-from datetime import UTC, datetime
+import asyncio
+from collections import namedtuple
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
 from backend.apps.media.contracts.media_repository import IMediaRepository
+from backend.apps.media.schemas.media import ImageBatchDelete, TagRead, TagsUpdate
 from backend.apps.media.services.media_service import MediaService
-from backend.core.exceptions import PermissionDeniedException
-from backend.database.models.media import File, Image
+from backend.apps.media.storage import MediaStorage, open_storage
+from backend.core.exceptions import PermissionDeniedException, ValidationException
+from backend.core.pagination import encode_cursor
+from backend.database.models.media import File
+
+# Repository rows (see IMediaRepository)
+ImageRow = namedtuple(
+    "ImageRow",
+    ["id", "filename", "created_at", "hash", "size_bytes", "mime_type", "file_created_at"],
+)
+TagRow = namedtuple("TagRow", ["name", "image_count"])
+
+
+def image_row(file: File, filename: str) -> ImageRow:
+    return ImageRow(
+        id=uuid4(),
+        filename=filename,
+        created_at=datetime.now(UTC),
+        hash=file.hash,
+        size_bytes=file.size_bytes,
+        mime_type=file.mime_type,
+        file_created_at=file.created_at,
+    )
+
+
+def detach_to(repo: AsyncMock, detached_repo: AsyncMock) -> None:
+    """repo.detached() yields detached_repo."""
+    repo.detached = MagicMock()
+    repo.detached.return_value.__aenter__.return_value = detached_repo
+    repo.detached.return_value.__aexit__.return_value = False
 
 # --- Mocks ---
 
@@ -15,6 +47,7 @@ from backend.database.models.media import File, Image
 def mock_media_repo() -> AsyncMock:
     repo = AsyncMock(spec=IMediaRepository)
     repo.commit = AsyncMock()
+    detach_to(repo, repo)
     return repo
 
 @pytest.fixture
@@ -22,13 +55,9 @@ def media_service(mock_media_repo: AsyncMock) -> MediaService:
     # Mock settings inside service
     with patch("backend.apps.media.services.media_service.settings") as mock_settings:
         mock_settings.MAX_UPLOAD_SIZE = 1024 * 1024 # 1MB
-        mock_settings.UPLOAD_DIR = Path("/tmp/test_uploads")
-        
-        service = MediaService(mock_media_repo)
-        # Override dirs to avoid real FS creation in init
-        service.temp_dir = MagicMock()
-        service.storage_dir = MagicMock()
-        return service
+
+        # Storage is not opened, so no real FS is touched
+        return MediaService(mock_media_repo, storage=MediaStorage(Path("/tmp/test_uploads")))
 
 # --- Tests ---
 
@@ -36,7 +65,7 @@ def media_service(mock_media_repo: AsyncMock) -> MediaService:
 async def test_upload_image_new_file(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
     """
     Test uploading a new file (Deduplication MISS).
-    Should create File and Image records and move file to storage.
+    Should move file to storage and register File + Image in one repository call.
     """
     # Arrange
     user_id = uuid4()
@@ -61,15 +90,7 @@ async def test_upload_image_new_file(media_service: MediaService, mock_media_rep
         path="/storage/hash123.jpg",
         created_at=datetime.now(UTC)
     )
-    mock_image = Image(
-        id=uuid4(),
-        user_id=user_id,
-        file_hash="hash123",
-        filename="cat.jpg",
-        created_at=datetime.now(UTC),
-        file=mock_file
-    )
-    mock_media_repo.create_image.return_value = mock_image
+    mock_media_repo.register_image.return_value = image_row(mock_file, "cat.jpg")
 
     # Mock shutil.move
     with patch("shutil.move") as mock_move:
@@ -79,14 +100,24 @@ async def test_upload_image_new_file(media_service: MediaService, mock_media_rep
     # Assert
     assert result.file.hash == "hash123"
     mock_move.assert_called_once() # Should move file
-    mock_media_repo.create_file.assert_called_once()
-    mock_media_repo.create_image.assert_called_once()
+    mock_media_repo.save_file.assert_awaited_once_with(
+        file_hash="hash123", size_bytes=100, mime_type="image/jpeg", path="/storage/hash123.jpg"
+    )
+    mock_media_repo.register_image.assert_called_once_with(
+        user_id=user_id,
+        file_hash="hash123",
+        filename="cat.jpg",
+        size_bytes=100,
+        mime_type="image/jpeg",
+        path="/storage/hash123.jpg",
+    )
+    assert mock_media_repo.commit.await_count == 2  # blob store session + request session
 
 @pytest.mark.asyncio
 async def test_upload_image_deduplication_hit(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
     """
     Test uploading an existing file (Deduplication HIT).
-    Should NOT create File record, only Image record.
+    Should NOT move the file, only link the Image to the existing File.
     """
     # Arrange
     user_id = uuid4()
@@ -107,15 +138,7 @@ async def test_upload_image_deduplication_hit(media_service: MediaService, mock_
     )
     mock_media_repo.get_file_by_hash.return_value = existing_file
     
-    mock_image = Image(
-        id=uuid4(),
-        user_id=user_id,
-        file_hash="hash123",
-        filename="cat_copy.jpg",
-        created_at=datetime.now(UTC),
-        file=existing_file
-    )
-    mock_media_repo.create_image.return_value = mock_image
+    mock_media_repo.link_image.return_value = image_row(existing_file, "cat_copy.jpg")
 
     with patch("shutil.move") as mock_move:
         # Act
@@ -124,15 +147,15 @@ async def test_upload_image_deduplication_hit(media_service: MediaService, mock_
     # Assert
     assert result.file.hash == "hash123"
     mock_move.assert_not_called() # Should NOT move file
-    mock_media_repo.create_file.assert_not_called() # Should NOT create new file record
-    mock_media_repo.create_image.assert_called_once() # But SHOULD create user link
+    mock_media_repo.link_image.assert_called_once_with(user_id=user_id, file_hash="hash123", filename="cat_copy.jpg")
+    mock_media_repo.register_image.assert_not_called() # files row is not written on a hit
     media_service._remove_file.assert_called() # Should remove temp file
 
 @pytest.mark.asyncio
 async def test_delete_image_owner_success(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
     """
     Test deleting image by owner.
-    GC should NOT trigger if file is used by others.
+    GC is deferred: the physical file is never touched inline.
     """
     # Arrange
     user_id = uuid4()
@@ -142,59 +165,65 @@ async def test_delete_image_owner_success(media_service: MediaService, mock_medi
     image.user_id = user_id
     image.file_hash = "hash123"
     mock_media_repo.get_image_by_id.return_value = image
-    
-    # GC: File is still used by others
-    mock_media_repo.get_usage_count.return_value = 2 
+    media_service._remove_blobs = AsyncMock() # type: ignore
 
     # Act
     await media_service.delete_image(user_id, image_id)
 
     # Assert
     mock_media_repo.delete_image.assert_called_with(image_id)
-    mock_media_repo.delete_file.assert_not_called() # Should NOT delete physical file
+    mock_media_repo.commit.assert_called_once()
+    mock_media_repo.delete_orphaned_files.assert_not_called()
+    media_service._remove_blobs.assert_not_called() # Should NOT delete physical file
 
 @pytest.mark.asyncio
-async def test_delete_image_gc_trigger(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+async def test_mark_garbage_one_batch(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
     """
-    Test deleting image triggering Garbage Collection.
+    Test GC mark: one batch of unflagged files, committed, sized by batch_size.
     """
     # Arrange
-    user_id = uuid4()
-    image_id = uuid4()
-    
-    image = MagicMock()
-    image.user_id = user_id
-    image.file_hash = "hash123"
-    mock_media_repo.get_image_by_id.return_value = image
-    
-    # GC: File is NOT used anymore
-    mock_media_repo.get_usage_count.return_value = 0
-    
-    media_service._remove_file = AsyncMock() # type: ignore
-    
-    # Mock _get_storage_path to return a Path that "exists"
-    mock_path = MagicMock(spec=Path)
-    mock_path.exists.return_value = True # Simulate file exists
-    media_service._get_storage_path = MagicMock(return_value=mock_path) # type: ignore
-    
-    media_service._get_thumbnail_path = MagicMock(return_value=Path("/thumb")) # type: ignore
+    mock_media_repo.unmark_referenced_files.return_value = 3
 
     # Act
-    await media_service.delete_image(user_id, image_id)
+    changed = await media_service.mark_garbage(batch_size=50)
 
     # Assert
-    mock_media_repo.delete_image.assert_called_with(image_id)
-    mock_media_repo.delete_file.assert_called_with("hash123") # Should delete physical file
-    
-    # We expect at least 2 calls (one for original, one for thumb)
-    # Since we iterate over extensions, it might be called more if multiple extensions match (unlikely in test)
-    # But we mocked exists=True for ALL calls to _get_storage_path.
-    # The loop iterates 5 times (empty + 4 mime types).
-    # So if exists=True always, it will try to remove 5 times + 1 thumb = 6 times.
-    
-    # Let's adjust the mock to only return True for one specific extension to be precise.
-    # Or just assert call_count >= 2
-    assert media_service._remove_file.call_count >= 2
+    assert changed == 3
+    mock_media_repo.unmark_referenced_files.assert_called_once_with(limit=50)
+    mock_media_repo.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_collect_garbage_removes_blobs_after_commit(
+    media_service: MediaService, mock_media_repo: AsyncMock
+) -> None:
+    """
+    Test GC sweep: orphans past the grace period are deleted and committed first,
+    then their blobs are removed under the hash locks, except for files uploaded again meanwhile.
+    """
+    # Arrange
+    order: list[str] = []
+    gone, revived = ("a" * 64, "image/png"), ("b" * 64, "image/jpeg")
+    mock_media_repo.delete_orphaned_files.return_value = [gone, revived]
+
+    def lock_absent_files(hashes: list[str]) -> set[str]:
+        order.append("lock")
+        return {gone[0]}
+
+    mock_media_repo.lock_absent_files.side_effect = lock_absent_files
+    media_service._remove_blobs = AsyncMock(side_effect=lambda _: order.append("unlink")) # type: ignore
+    mock_media_repo.commit.side_effect = lambda: order.append("commit")
+
+    # Act
+    collected = await media_service.collect_garbage(grace_period=timedelta(hours=1), batch_size=100)
+
+    # Assert
+    assert collected == 2
+    kwargs = mock_media_repo.delete_orphaned_files.call_args.kwargs
+    assert kwargs["limit"] == 100
+    assert kwargs["older_than"] < datetime.now(UTC) - timedelta(minutes=59)
+    mock_media_repo.lock_absent_files.assert_called_once_with([gone[0], revived[0]])
+    media_service._remove_blobs.assert_called_once_with([gone])
+    assert order == ["commit", "lock", "unlink", "commit"]
 
 @pytest.mark.asyncio
 async def test_delete_image_not_owner(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
@@ -213,3 +242,246 @@ async def test_delete_image_not_owner(media_service: MediaService, mock_media_re
     # Act & Assert
     with pytest.raises(PermissionDeniedException):
         await media_service.delete_image(user_id, image_id)
+
+@pytest.mark.asyncio
+async def test_search_images_paginates_with_cursor(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+    """
+    Test keyset pagination: one extra row means there is a next page.
+    """
+    # Arrange
+    user_id = uuid4()
+    now = datetime.now(UTC)
+    images = [ImageRow(uuid4(), f"cat_{i}.png", now, "hash123", 100, "image/png", now) for i in range(3)]
+    mock_media_repo.search_images.return_value = images
+
+    # Act
+    page = await media_service.search_images("cat", user_id=user_id, limit=2)
+
+    # Assert
+    assert [img.id for img in page.items] == [images[0].id, images[1].id]
+    assert page.next_cursor == encode_cursor(images[1].created_at, images[1].id)
+    mock_media_repo.search_images.assert_called_with(query="cat", user_id=user_id, limit=3, after=None)
+
+    # Next page resumes strictly after the last item
+    mock_media_repo.search_images.return_value = images[2:]
+    page = await media_service.search_images("cat", user_id=user_id, limit=2, cursor=page.next_cursor)
+
+    assert page.next_cursor is None
+    mock_media_repo.search_images.assert_called_with(
+        query="cat", user_id=user_id, limit=3, after=(images[1].created_at, images[1].id)
+    )
+
+@pytest.mark.asyncio
+async def test_search_images_invalid_cursor(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+    """
+    Test that a tampered cursor is rejected before hitting the DB.
+    """
+    with pytest.raises(ValidationException):
+        await media_service.search_images("cat", cursor="not-a-cursor")
+
+    mock_media_repo.search_images.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_attach_tags_owner_success(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+    """
+    Test bulk tag attach: duplicate IDs collapse, tags are normalized, one commit.
+    """
+    # Arrange
+    user_id = uuid4()
+    image_id = uuid4()
+    mock_media_repo.count_owned_images.return_value = 1
+    mock_media_repo.attach_tags.return_value = [TagRow(name="cats", image_count=1)]
+    data = TagsUpdate(image_ids=[image_id, image_id], tags=[" Cats ", "cats"])
+
+    # Act
+    result = await media_service.attach_tags(user_id, data)
+
+    # Assert
+    assert result == [TagRead(name="cats", image_count=1)]
+    mock_media_repo.attach_tags.assert_called_once_with(image_ids=[image_id], tags=["cats"])
+    mock_media_repo.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_attach_tags_not_owner(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+    """
+    Test that tagging fails as a whole if any image is not the user's.
+    """
+    # Arrange
+    mock_media_repo.count_owned_images.return_value = 1
+    data = TagsUpdate(image_ids=[uuid4(), uuid4()], tags=["cats"])
+
+    # Act & Assert
+    with pytest.raises(PermissionDeniedException):
+        await media_service.attach_tags(uuid4(), data)
+
+    mock_media_repo.attach_tags.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_delete_images_batch(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+    """
+    Test batch delete: one set-based repo call and one commit, no inline GC.
+    """
+    # Arrange
+    user_id = uuid4()
+    image_ids = [uuid4(), uuid4()]
+    mock_media_repo.count_owned_images.return_value = 2
+
+    # Act
+    result = await media_service.delete_images(user_id, ImageBatchDelete(image_ids=image_ids))
+
+    # Assert
+    assert result.deleted == 2
+    mock_media_repo.delete_images.assert_called_once_with(user_id=user_id, image_ids=image_ids)
+    mock_media_repo.commit.assert_called_once()
+    mock_media_repo.delete_orphaned_files.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_delete_images_batch_not_owner(media_service: MediaService, mock_media_repo: AsyncMock) -> None:
+    """
+    Test that batch delete is rejected as a whole if any image is not the user's.
+    """
+    # Arrange
+    mock_media_repo.count_owned_images.return_value = 0
+
+    # Act & Assert
+    with pytest.raises(PermissionDeniedException):
+        await media_service.delete_images(uuid4(), ImageBatchDelete(image_ids=[uuid4()]))
+
+    mock_media_repo.delete_images.assert_not_called()
+    mock_media_repo.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_uploads_store_once(tmp_path: Path, mock_media_repo: AsyncMock) -> None:
+    """
+    Stress test: many concurrent uploads of the same new file.
+    Disk/Pillow work must happen once and every upload must succeed.
+    """
+    # Arrange: a fake DB where the file appears once registered
+    files: dict[str, File] = {}
+
+    async def get_file_by_hash(file_hash: str) -> File | None:
+        await asyncio.sleep(0)
+        return files.get(file_hash)
+
+    async def register_image(**kwargs: Any) -> ImageRow:
+        return image_row(files[kwargs["file_hash"]], kwargs["filename"])
+
+    async def save_file(**kwargs: Any) -> None:
+        files.setdefault(kwargs["file_hash"], File(
+            hash=kwargs["file_hash"],
+            size_bytes=kwargs["size_bytes"],
+            mime_type=kwargs["mime_type"],
+            path=kwargs["path"],
+            created_at=datetime.now(UTC),
+        ))
+
+    mock_media_repo.get_file_by_hash.side_effect = get_file_by_hash
+    mock_media_repo.save_file.side_effect = save_file
+    mock_media_repo.register_image.side_effect = register_image
+    mock_media_repo.link_image.side_effect = register_image
+    generate_thumbnail = AsyncMock()
+
+    def make_service() -> MediaService:
+        with patch("backend.apps.media.services.media_service.settings") as mock_settings:
+            mock_settings.MAX_UPLOAD_SIZE = 1024 * 1024
+            service = MediaService(mock_media_repo, storage=open_storage(tmp_path))
+        service._validate_file_type = AsyncMock(return_value="image/png")  # type: ignore
+        service._generate_thumbnail = generate_thumbnail  # type: ignore
+        return service
+
+    def make_upload() -> AsyncMock:
+        upload = AsyncMock()
+        upload.filename = "same.png"
+        upload.read.side_effect = [b"identical bytes", b""]
+        return upload
+
+    # Act
+    results = await asyncio.gather(
+        *(make_service().upload_image(uuid4(), make_upload()) for _ in range(20))
+    )
+
+    # Assert
+    assert len({result.file.hash for result in results}) == 1
+    generate_thumbnail.assert_called_once()
+    assert mock_media_repo.register_image.call_count + mock_media_repo.link_image.call_count == 20
+    assert list((tmp_path / "temp").iterdir()) == []
+    assert len([p for p in (tmp_path / "storage").rglob("*") if p.is_file()]) == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_break_followers(tmp_path: Path) -> None:
+    """
+    The first upload of a file is cancelled while its blob is being stored.
+    The store runs on its own session, so it completes and the uploads that joined it still succeed.
+    """
+    # Arrange: one repository per request plus the store's own, a shared fake DB
+    files: dict[str, File] = {}
+    thumbnail_started = asyncio.Event()
+    release_thumbnail = asyncio.Event()
+
+    async def save_file(**kwargs: Any) -> None:
+        files.setdefault(kwargs["file_hash"], File(
+            hash=kwargs["file_hash"],
+            size_bytes=kwargs["size_bytes"],
+            mime_type=kwargs["mime_type"],
+            path=kwargs["path"],
+            created_at=datetime.now(UTC),
+        ))
+
+    async def register_image(**kwargs: Any) -> ImageRow:
+        return image_row(files[kwargs["file_hash"]], kwargs["filename"])
+
+    async def generate_thumbnail(original_path: Path, file_hash: str) -> None:
+        thumbnail_started.set()
+        await release_thumbnail.wait()
+
+    def make_repo() -> AsyncMock:
+        repo = AsyncMock(spec=IMediaRepository)
+        repo.get_file_by_hash.side_effect = lambda file_hash: files.get(file_hash)
+        repo.save_file.side_effect = save_file
+        repo.register_image.side_effect = register_image
+        detach_to(repo, store_repo)
+        return repo
+
+    store_repo = AsyncMock(spec=IMediaRepository)
+    store_repo.get_file_by_hash.side_effect = lambda file_hash: files.get(file_hash)
+    store_repo.save_file.side_effect = save_file
+
+    def make_upload(repo: AsyncMock) -> Any:
+        with patch("backend.apps.media.services.media_service.settings") as mock_settings:
+            mock_settings.MAX_UPLOAD_SIZE = 1024 * 1024
+            service = MediaService(repo, storage=open_storage(tmp_path))
+        service._validate_file_type = AsyncMock(return_value="image/png")  # type: ignore
+        service._generate_thumbnail = AsyncMock(side_effect=generate_thumbnail)  # type: ignore
+
+        upload = AsyncMock()
+        upload.filename = "same.png"
+        upload.read.side_effect = [b"identical bytes", b""]
+        return service.upload_image(uuid4(), upload)
+
+    leader_repo = make_repo()
+    follower_repos = [make_repo() for _ in range(3)]
+
+    leader = asyncio.create_task(make_upload(leader_repo))
+    await thumbnail_started.wait()
+    followers = [asyncio.create_task(make_upload(repo)) for repo in follower_repos]
+    await asyncio.sleep(0.05)  # followers join the flight
+
+    # Act
+    leader.cancel()
+    await asyncio.sleep(0)
+    release_thumbnail.set()
+    results = await asyncio.gather(*followers)
+
+    # Assert
+    assert leader.cancelled()
+    leader_repo.register_image.assert_not_called()
+    assert len({result.file.hash for result in results}) == 1
+    store_repo.lock_file_hash.assert_awaited_once()
+    store_repo.save_file.assert_awaited_once()
+    store_repo.commit.assert_awaited_once()
+    for repo in follower_repos:
+        repo.lock_file_hash.assert_not_called()
+        repo.register_image.assert_awaited_once()
+        repo.commit.assert_awaited_once()
+    assert len([p for p in (tmp_path / "storage").rglob("*") if p.is_file()]) == 1
+    assert list((tmp_path / "temp").iterdir()) == []
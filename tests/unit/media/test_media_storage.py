@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+from backend.apps.media.storage import MediaStorage, open_storage
+from backend.core.exceptions import NotFoundException
+
+FILE_HASH = "ab" * 32
+
+
+def test_open_storage_is_shared_per_root(tmp_path: Path) -> None:
+    """
+    Storage is built (and its directories created) once per root, not per request.
+    """
+    storage = open_storage(tmp_path)
+
+    assert open_storage(tmp_path) is storage
+    assert storage.temp_dir.is_dir()
+    assert storage.storage_dir.is_dir()
+
+
+@pytest.mark.asyncio
+async def test_find_original_resolves_extension_and_legacy(tmp_path: Path) -> None:
+    """
+    Originals are found with their extension; extensionless legacy blobs are still served.
+    """
+    storage = MediaStorage(tmp_path)
+    storage.shard_dir(FILE_HASH).mkdir(parents=True)
+
+    legacy = storage.original_path(FILE_HASH)
+    legacy.write_bytes(b"legacy")
+    assert await storage.find_original(FILE_HASH) == legacy
+
+    current = storage.original_path(FILE_HASH, ".png")
+    current.write_bytes(b"current")
+    assert await storage.find_original(FILE_HASH) == current
+    assert current == tmp_path / "storage" / "ab" / "ab" / f"{FILE_HASH}.png"
+
+
+@pytest.mark.asyncio
+async def test_find_missing_file_raises_not_found(tmp_path: Path) -> None:
+    """
+    Missing blobs are reported as 404 without creating any directories.
+    """
+    storage = MediaStorage(tmp_path)
+
+    with pytest.raises(NotFoundException):
+        await storage.find_original(FILE_HASH)
+    with pytest.raises(NotFoundException):
+        await storage.find_thumbnail(FILE_HASH)
+
+    assert list(tmp_path.iterdir()) == []
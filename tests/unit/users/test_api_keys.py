@@ -0,0 +1,136 @@
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from backend.apps.users.contracts.api_key_repository import IApiKeyRepository
+from backend.apps.users.contracts.user_repository import IUserRepository
+from backend.apps.users.schemas.api_key import ApiKeyPrincipal
+from backend.apps.users.services.api_key_service import ApiKeyIndex, ApiKeyService
+from backend.core.config import settings
+from backend.core.exceptions import AuthException, PermissionDeniedException, ValidationException
+from backend.core.security import create_access_token, hash_token
+from backend.database.models.users import User
+from backend.dependencies.auth import get_current_principal, get_current_principal_optional
+
+API_KEY = "pl_test-key"
+
+# --- Mocks ---
+
+@pytest.fixture
+def mock_user_repo() -> AsyncMock:
+    return AsyncMock(spec=IUserRepository)
+
+@pytest.fixture
+def mock_api_key_repo() -> AsyncMock:
+    repo = AsyncMock(spec=IApiKeyRepository)
+    repo.commit = AsyncMock()
+    return repo
+
+@pytest.fixture
+def principal() -> ApiKeyPrincipal:
+    return ApiKeyPrincipal(id=uuid4(), key_id=uuid4(), name="shop-cdn", scopes=frozenset({"media:write"}))
+
+@pytest.fixture
+def container(principal: ApiKeyPrincipal) -> MagicMock:
+    index = ApiKeyIndex()
+    index.replace({hash_token(API_KEY): principal})
+    return MagicMock(api_keys=index)
+
+def make_user() -> User:
+    return User(id=uuid4(), email="svc@example.com", hashed_password="hash", is_active=True,
+                is_superuser=False, created_at=datetime.now(UTC))
+
+# --- Tests ---
+
+def test_index_looks_up_by_digest(principal: ApiKeyPrincipal) -> None:
+    """
+    Test that keys are matched by their digest and the owner set follows reloads.
+    """
+    index = ApiKeyIndex()
+    index.replace({hash_token(API_KEY): principal})
+
+    assert index.lookup(API_KEY) is principal
+    assert index.lookup(hash_token(API_KEY)) is None
+    assert index.has_owner(principal.id)
+
+    index.replace({})
+    assert index.lookup(API_KEY) is None
+    assert not index.has_owner(principal.id)
+
+@pytest.mark.asyncio
+async def test_api_key_with_scope_skips_user_lookup(
+    mock_user_repo: AsyncMock, container: MagicMock, principal: ApiKeyPrincipal
+) -> None:
+    """
+    Test that a valid key resolves to its owner without a JWT or a DB lookup.
+    """
+    dependency = get_current_principal("media:write")
+
+    result = await dependency(api_key=API_KEY, token=None, user_repository=mock_user_repo, container=container)
+
+    assert result is principal
+    mock_user_repo.get_by_id.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_api_key_rejections(mock_user_repo: AsyncMock, container: MagicMock) -> None:
+    """
+    Test that an unknown key is 401 and a key without the route's scope is 403.
+    """
+    with pytest.raises(AuthException):
+        await get_current_principal("media:write")(
+            api_key="pl_unknown", token=None, user_repository=mock_user_repo, container=container
+        )
+    with pytest.raises(PermissionDeniedException):
+        await get_current_principal("media:read")(
+            api_key=API_KEY, token=None, user_repository=mock_user_repo, container=container
+        )
+
+@pytest.mark.asyncio
+async def test_headless_mode_ignores_jwt(
+    mock_user_repo: AsyncMock, container: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Test that bearer tokens are not accepted in headless mode.
+    """
+    monkeypatch.setattr(settings, "APP_MODE", "HEADLESS")
+    token = create_access_token(subject=uuid4())
+
+    with pytest.raises(AuthException):
+        await get_current_principal("media:read")(
+            api_key=None, token=token, user_repository=mock_user_repo, container=container
+        )
+    optional = await get_current_principal_optional("media:read")(
+        api_key=None, token=token, user_repository=mock_user_repo, container=container
+    )
+    assert optional is None
+    mock_user_repo.get_by_id.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_issue_key_stores_digest_only(mock_api_key_repo: AsyncMock, mock_user_repo: AsyncMock) -> None:
+    """
+    Test that the plain key is returned once and only its digest reaches the repository.
+    """
+    # Arrange
+    owner = make_user()
+    mock_user_repo.get_by_email.return_value = owner
+    service = ApiKeyService(mock_api_key_repo, mock_user_repo)
+
+    # Act
+    api_key = await service.issue_key(name="shop-cdn", owner_email=owner.email, scopes=["media:write", "media:read"])
+
+    # Assert
+    assert api_key.startswith("pl_")
+    mock_api_key_repo.create.assert_called_once_with(
+        name="shop-cdn", key_hash=hash_token(api_key), user_id=owner.id, scopes=["media:read", "media:write"]
+    )
+    mock_api_key_repo.commit.assert_called_once()
+    mock_user_repo.create.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_issue_key_rejects_unknown_scope(mock_api_key_repo: AsyncMock, mock_user_repo: AsyncMock) -> None:
+    service = ApiKeyService(mock_api_key_repo, mock_user_repo)
+
+    with pytest.raises(ValidationException):
+        await service.issue_key(name="shop-cdn", owner_email="svc@example.com", scopes=["admin"])
+    mock_api_key_repo.create.assert_not_called()
@@ -0,0 +1,83 @@
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from backend.apps.users.contracts.user_repository import IUserRepository
+from backend.core.cache import TTLCache
+from backend.core.exceptions import AuthException
+from backend.core.security import create_access_token
+from backend.database.models.users import User
+from backend.dependencies.auth import get_current_user
+
+# --- Mocks ---
+
+@pytest.fixture
+def mock_user_repo() -> AsyncMock:
+    return AsyncMock(spec=IUserRepository)
+
+@pytest.fixture
+def container() -> MagicMock:
+    return MagicMock(user_cache=TTLCache(maxsize=100, ttl=60))
+
+def make_user(is_active: bool = True) -> User:
+    return User(id=uuid4(), email="test@example.com", hashed_password="hash", is_active=is_active,
+                is_superuser=False, created_at=datetime.now(UTC))
+
+# --- Tests ---
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached(mock_user_repo: AsyncMock, container: MagicMock) -> None:
+    """
+    Test that repeated requests of an active user cost one lookup in total.
+    """
+    # Arrange
+    user = make_user()
+    mock_user_repo.get_by_id.return_value = user
+    token = create_access_token(subject=user.id)
+
+    # Act
+    first = await get_current_user(token=token, user_repository=mock_user_repo, container=container)
+    second = await get_current_user(token=token, user_repository=mock_user_repo, container=container)
+
+    # Assert
+    assert first.id == user.id
+    assert second is first
+    mock_user_repo.get_by_id.assert_called_once_with(user_id=user.id, primary=True)
+
+@pytest.mark.asyncio
+async def test_invalidated_user_is_reloaded(mock_user_repo: AsyncMock, container: MagicMock) -> None:
+    """
+    Test that an evicted (changed) user is looked up again and a deactivation takes effect.
+    """
+    # Arrange
+    user = make_user()
+    mock_user_repo.get_by_id.return_value = user
+    token = create_access_token(subject=user.id)
+    await get_current_user(token=token, user_repository=mock_user_repo, container=container)
+
+    # Act: user deactivated elsewhere, the user_changed notification evicts it
+    mock_user_repo.get_by_id.return_value = make_user(is_active=False)
+    container.user_cache.pop(user.id)
+
+    # Assert
+    with pytest.raises(AuthException):
+        await get_current_user(token=token, user_repository=mock_user_repo, container=container)
+    assert container.user_cache.get(user.id) is None
+
+@pytest.mark.asyncio
+async def test_uncached_lookup_may_use_replica(mock_user_repo: AsyncMock) -> None:
+    """
+    Test that with the cache disabled nothing outlives the request, so the lookup may use the replica.
+    """
+    # Arrange
+    user = make_user()
+    mock_user_repo.get_by_id.return_value = user
+    token = create_access_token(subject=user.id)
+    container = MagicMock(user_cache=TTLCache(maxsize=100, ttl=0))
+
+    # Act
+    await get_current_user(token=token, user_repository=mock_user_repo, container=container)
+
+    # Assert
+    mock_user_repo.get_by_id.assert_called_once_with(user_id=user.id, primary=False)
@@ -1,13 +1,18 @@
-from datetime import UTC, datetime, timedelta
-from unittest.mock import AsyncMock, MagicMock
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock
 from uuid import uuid4
 
 import pytest
 from backend.apps.users.contracts.token_repository import ITokenRepository
 from backend.apps.users.contracts.user_repository import IUserRepository
-from backend.apps.users.schemas.user import UserCreate
+from backend.apps.users.schemas.token import TokenRotation
+from backend.apps.users.schemas.user import UserCreate, UserResponse
 from backend.apps.users.services.auth_service import AuthService
-from backend.core.exceptions import AuthException, BusinessLogicException
+from backend.core.exceptions import AuthException, BusinessLogicException, TooManyRequestsException
+from backend.core.ratelimit import LoginThrottle
+from backend.core.security import hash_token
 from backend.database.models.users import User
 from sqlalchemy.exc import IntegrityError
 
@@ -100,6 +105,59 @@ async def test_authenticate_success(auth_service: AuthService, mock_user_repo: A
     # Assert
     assert result is not None
     assert result.email == "test@example.com"
+    mock_user_repo.update_password_hash.assert_not_called() # hash is current
+
+@pytest.mark.asyncio
+async def test_authenticate_rehashes_outdated_hash(auth_service: AuthService, mock_user_repo: AsyncMock) -> None:
+    """
+    Test that a hash with an outdated cost is upgraded on successful login.
+    """
+    # Arrange
+    from backend.core.security import verify_password
+    from passlib.hash import bcrypt
+    legacy_hash = bcrypt.using(rounds=4).hash("password123")
+    user = User(id=uuid4(), email="test@example.com", hashed_password=legacy_hash, is_active=True,
+                is_superuser=False, created_at=datetime.now(UTC))
+    mock_user_repo.get_by_email.return_value = user
+
+    # Act
+    result = await auth_service.authenticate_user("test@example.com", "password123")
+
+    # Assert
+    assert result is not None
+    mock_user_repo.update_password_hash.assert_called_once()
+    new_hash = mock_user_repo.update_password_hash.call_args.kwargs["hashed_password"]
+    assert new_hash != legacy_hash
+    assert verify_password("password123", new_hash)
+    mock_user_repo.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_on_hashing_pool(
+    mock_user_repo: AsyncMock, mock_token_repo: AsyncMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Test that hashing runs on the dedicated pool, not on the event loop thread.
+    """
+    # Arrange
+    threads: list[str] = []
+
+    def fake_hash(password: str) -> str:
+        threads.append(threading.current_thread().name)
+        return "hashed"
+
+    monkeypatch.setattr("backend.apps.users.services.auth_service.get_password_hash", fake_hash)
+    mock_user_repo.create.return_value = User(id=uuid4(), email="test@example.com", hashed_password="hashed",
+                                              is_active=True, is_superuser=False, created_at=datetime.now(UTC))
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-hash") as pool:
+        service = AuthService(mock_user_repo, mock_token_repo, hashing_pool=pool)
+
+        # Act
+        await service.register_user(UserCreate(email="test@example.com", password="password123"))
+
+    # Assert
+    assert len(threads) == 1
+    assert threads[0].startswith("password-hash")
 
 @pytest.mark.asyncio
 async def test_authenticate_wrong_password(auth_service: AuthService, mock_user_repo: AsyncMock) -> None:
@@ -116,49 +174,106 @@ async def test_authenticate_wrong_password(auth_service: AuthService, mock_user_
     assert result is None
 
 @pytest.mark.asyncio
-async def test_refresh_token_success(
-    auth_service: AuthService, 
-    mock_token_repo: AsyncMock, 
-    mock_user_repo: AsyncMock
-) -> None:
+async def test_refresh_token_success(auth_service: AuthService, mock_token_repo: AsyncMock) -> None:
+    """
+    Test rotation: the old digest is consumed and the new one issued in one repository call.
+    """
     # Arrange
-    valid_token = MagicMock()
-    valid_token.expires_at = datetime.now(UTC) + timedelta(days=1)
-    valid_token.user_id = uuid4()
-    
-    mock_token_repo.get_by_token.return_value = valid_token
-    
-    # FIX: Use real object
-    user = User(
-        id=valid_token.user_id, 
-        email="test@example.com", 
-        is_active=True,
-        is_superuser=False,
-        created_at=datetime.now(UTC),
-        hashed_password="hash"
-    )
-    mock_user_repo.get_by_id.return_value = user
+    user_id = uuid4()
+    mock_token_repo.rotate.return_value = TokenRotation(user_id=user_id, expired=False, is_active=True, rotated=True)
 
     # Act
     result = await auth_service.refresh_token("some_refresh_token")
 
     # Assert
     assert result.access_token is not None
-    assert result.refresh_token is not None
-    mock_token_repo.delete.assert_called_with("some_refresh_token")
-    mock_token_repo.create.assert_called_once()
+    kwargs = mock_token_repo.rotate.call_args.kwargs
+    assert kwargs["token_hash"] == hash_token("some_refresh_token")
+    assert kwargs["new_token_hash"] == hash_token(result.refresh_token)
+    mock_token_repo.commit.assert_called_once()
+    mock_token_repo.create.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_refresh_token_expired(auth_service: AuthService, mock_token_repo: AsyncMock) -> None:
+    """
+    Test that an expired token is consumed (committed) without issuing a new pair.
+    """
     # Arrange
-    expired_token = MagicMock()
-    expired_token.expires_at = datetime.now(UTC) - timedelta(days=1) # Expired
-    
-    mock_token_repo.get_by_token.return_value = expired_token
+    mock_token_repo.rotate.return_value = TokenRotation(user_id=uuid4(), expired=True, is_active=True, rotated=False)
 
     # Act & Assert
     with pytest.raises(AuthException) as exc:
         await auth_service.refresh_token("expired_token")
-    
+
     assert "expired" in str(exc.value)
-    mock_token_repo.delete.assert_called_with("expired_token")
+    mock_token_repo.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_refresh_token_reused(auth_service: AuthService, mock_token_repo: AsyncMock) -> None:
+    """
+    Test that a token already rotated (e.g. by a concurrent request) is rejected.
+    """
+    # Arrange
+    mock_token_repo.rotate.return_value = None
+
+    # Act & Assert
+    with pytest.raises(AuthException):
+        await auth_service.refresh_token("used_token")
+
+    mock_token_repo.commit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_stored_as_digest(auth_service: AuthService, mock_token_repo: AsyncMock) -> None:
+    """
+    Test that only the SHA-256 digest of a new refresh token reaches the repository.
+    """
+    # Arrange
+    user = UserResponse(id=uuid4(), email="test@example.com", is_active=True, is_superuser=False,
+                        created_at=datetime.now(UTC))
+
+    # Act
+    tokens = await auth_service.create_tokens(user)
+
+    # Assert
+    stored = mock_token_repo.create.call_args.kwargs["token_hash"]
+    assert stored == hash_token(tokens.refresh_token)
+    assert stored != tokens.refresh_token
+
+@pytest.mark.asyncio
+async def test_purge_expired_tokens(auth_service: AuthService, mock_token_repo: AsyncMock) -> None:
+    # Arrange
+    mock_token_repo.delete_expired.return_value = 3
+
+    # Act
+    deleted = await auth_service.purge_expired_tokens(batch_size=100)
+
+    # Assert
+    assert deleted == 3
+    assert mock_token_repo.delete_expired.call_args.kwargs["limit"] == 100
+    mock_token_repo.commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_throttled_login_skips_lookup_and_hashing(
+    mock_user_repo: AsyncMock, mock_token_repo: AsyncMock
+) -> None:
+    """
+    Test that once the account is over its limit, attempts are rejected before any DB query or hashing.
+    """
+    # Arrange
+    throttle = LoginThrottle(
+        account_burst=2, account_per_minute=1, ip_burst=100, ip_per_minute=100, backoff_after=5, backoff_max=60
+    )
+    service = AuthService(mock_user_repo, mock_token_repo, throttle=throttle)
+    service._run_hashing = AsyncMock()  # type: ignore
+    mock_user_repo.get_by_email.return_value = None
+
+    for _ in range(2):
+        assert await service.authenticate_user("victim@example.com", "guess", client_ip="10.0.0.1") is None
+
+    # Act & Assert
+    with pytest.raises(TooManyRequestsException) as exc:
+        await service.authenticate_user("victim@example.com", "guess", client_ip="10.0.0.1")
+
+    assert exc.value.headers == {"Retry-After": str(exc.value.extra["retry_after"])}
+    assert mock_user_repo.get_by_email.call_count == 2
+    service._run_hashing.assert_not_called()